@@ -0,0 +1,86 @@
+"""measure per-call cost of normalizing function inputs before hashing
+
+compares unnormalized hashing, the binder compiled at decoration time, and
+the uncompiled get_function_input_hash() path
+
+usage: python benchmarks/bench_argument_binding.py
+"""
+
+import timeit
+
+import toolcache
+from toolcache import hash_utils
+
+import bench_utils
+
+
+def f(a, b, c=3, *, d=4):
+    pass
+
+
+calls = {
+    'positional': ((1, 2), {}),
+    'keywords': ((), {'a': 1, 'b': 2, 'd': 5}),
+    'mixed': ((1,), {'b': 2, 'c': 6}),
+}
+
+
+def benchmark_argument_binding(number=50000, repeat=5):
+    """return dict mapping (call, path) to best ns per call"""
+
+    unnormalized = toolcache.MemoryCache(
+        old_f=f, hash_mode='fast', normalize_hash_inputs=False
+    )
+    compiled = toolcache.MemoryCache(
+        old_f=f, hash_mode='fast', normalize_hash_inputs=True
+    )
+
+    def uncompiled(args, kwargs):
+        return hash_utils.get_function_input_hash(
+            f_hash=hash_utils.compute_hash_fast,
+            argspec=compiled.old_f_argspec,
+            args=args,
+            kwargs=kwargs,
+        )
+
+    paths = {
+        'unnormalized': lambda args, kwargs: unnormalized.compute_entry_hash(
+            args, kwargs
+        ),
+        'compiled': lambda args, kwargs: compiled.compute_entry_hash(
+            args, kwargs
+        ),
+        'uncompiled': uncompiled,
+    }
+
+    results = {}
+    for call, (args, kwargs) in calls.items():
+        for path, function in paths.items():
+            times = timeit.repeat(
+                lambda: function(args, kwargs), number=number, repeat=repeat
+            )
+            results[(call, path)] = min(times) / number * 1e9
+    return results, list(paths)
+
+
+def run(quick=False):
+    """return benchmark records of hashing cost with normalized inputs"""
+    if quick:
+        results, paths = benchmark_argument_binding(number=5000, repeat=3)
+    else:
+        results, paths = benchmark_argument_binding()
+    return [
+        bench_utils.create_record('argument_binding', ns, call=call, path=path)
+        for (call, path), ns in results.items()
+    ]
+
+
+def print_results(results, paths):
+    print(('{:<14}' + '{:>16}' * len(paths)).format('ns per call', *paths))
+    for call in calls:
+        row = [results[(call, path)] for path in paths]
+        print(('{:<14}' + '{:>16.0f}' * len(paths)).format(call, *row))
+
+
+if __name__ == '__main__':
+    print_results(*benchmark_argument_binding())
@@ -0,0 +1,106 @@
+"""measure cache throughput when shared by multiple threads or processes
+
+each worker performs a mix of hits and misses on a shared cache, results
+are total elapsed time divided by total operations of all workers
+
+usage: python benchmarks/bench_contention.py
+"""
+
+import multiprocessing
+import tempfile
+import threading
+import time
+
+import toolcache
+
+import bench_utils
+
+
+def _run_operations(cache, worker, n_operations, n_keys):
+    """perform n_operations loads, saving entries that miss"""
+    for i in range(n_operations):
+        entry_hash = str((i * 7 + worker) % n_keys)
+        if cache.load_entry(entry_hash) is None:
+            cache.save_entry(entry_hash, i)
+
+
+def benchmark_threads(safety, n_threads, n_operations, n_keys=1000):
+    """return ns per operation of threads sharing one MemoryCache"""
+
+    cache = toolcache.MemoryCache(safety=safety)
+    threads = [
+        threading.Thread(
+            target=_run_operations, args=(cache, t, n_operations, n_keys)
+        )
+        for t in range(n_threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return elapsed / (n_threads * n_operations) * 1e9
+
+
+def _process_worker(cache_dir, worker, n_operations, n_keys):
+    cache = toolcache.DiskCache(cache_dir=cache_dir, safety='process')
+    _run_operations(cache, worker, n_operations, n_keys)
+
+
+def benchmark_processes(n_processes, n_operations, n_keys=200):
+    """return ns per operation of processes sharing one DiskCache directory"""
+
+    context = multiprocessing.get_context('spawn')
+    cache_dir = tempfile.mkdtemp()
+    processes = [
+        context.Process(
+            target=_process_worker, args=(cache_dir, p, n_operations, n_keys)
+        )
+        for p in range(n_processes)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    return elapsed / (n_processes * n_operations) * 1e9
+
+
+def run(quick=False):
+    """return benchmark records of multi-thread and multi-process throughput"""
+    records = []
+    n_operations = 5000 if quick else 100000
+    for safety in ['thread', 'striped']:
+        for n_threads in [1, 4, 8]:
+            ns = benchmark_threads(safety, n_threads, n_operations)
+            records.append(
+                bench_utils.create_record(
+                    'thread_contention',
+                    ns,
+                    cachetype='memory',
+                    safety=safety,
+                    n_threads=n_threads,
+                )
+            )
+
+    # process startup is included in measurements
+    n_operations = 200 if quick else 2000
+    for n_processes in [1, 4]:
+        ns = benchmark_processes(n_processes, n_operations)
+        records.append(
+            bench_utils.create_record(
+                'process_contention',
+                ns,
+                cachetype='disk',
+                safety='process',
+                n_processes=n_processes,
+            )
+        )
+    return records
+
+
+if __name__ == '__main__':
+    for record in run():
+        print(bench_utils.get_record_key(record), '%.0f ns' % record['ns_per_op'])
@@ -0,0 +1,62 @@
+"""measure hit and miss latency of decorated functions for each cachetype
+
+usage: python benchmarks/bench_decorator.py
+"""
+
+import itertools
+
+import toolcache
+
+import bench_utils
+
+
+cachetypes = ['memory', 'disk', 'null', 'sqlite', 'log']
+
+
+def f(a):
+    return a
+
+
+def benchmark_decorator(cachetype, number, repeat):
+    """return dict mapping 'hit' and 'miss' to best ns per call"""
+    results = {}
+
+    # null caches never hit
+    if cachetype != 'null':
+        hit_f = toolcache.cache(cachetype)(f)
+        hit_f(1)
+        results['hit'] = bench_utils.time_per_call(
+            lambda: hit_f(1), number=number, repeat=repeat
+        )
+
+    # every call uses a new arg, so every call is a miss followed by a save
+    miss_f = toolcache.cache(cachetype)(f)
+    counter = itertools.count()
+    results['miss'] = bench_utils.time_per_call(
+        lambda: miss_f(next(counter)), number=number, repeat=repeat
+    )
+
+    return results
+
+
+def run(quick=False):
+    """return benchmark records of decorator latency for each cachetype"""
+    records = []
+    for cachetype in cachetypes:
+        if cachetype == 'memory':
+            number = 2000 if quick else 50000
+        else:
+            number = 200 if quick else 2000
+        results = benchmark_decorator(cachetype, number=number, repeat=3)
+        for outcome, ns in results.items():
+            records.append(
+                bench_utils.create_record(
+                    'decorator', ns, cachetype=cachetype, outcome=outcome
+                )
+            )
+    return records
+
+
+if __name__ == '__main__':
+    for record in run():
+        print(bench_utils.get_record_key(record), '%.0f ns' % record['ns_per_op'])
@@ -0,0 +1,120 @@
+"""measure DiskCache save and load throughput by entry count and payload size
+
+also counts file system calls per operation, including misses and the opening
+of a cache directory that already contains entries
+
+usage: python benchmarks/bench_disk_throughput.py
+"""
+
+import os
+
+import toolcache
+
+import bench_utils
+
+
+def benchmark_disk_throughput(n_entries, payload_size):
+    """return dicts mapping operation to best ns and to syscalls per entry"""
+
+    cache = toolcache.DiskCache()
+    payload = os.urandom(payload_size)
+    entry_hashes = ['entry_' + str(i) for i in range(n_entries)]
+
+    def miss_all():
+        for entry_hash in entry_hashes:
+            cache.load_entry(entry_hash)
+
+    def save_all():
+        for entry_hash in entry_hashes:
+            cache.save_entry(entry_hash, payload)
+
+    def load_all():
+        for entry_hash in entry_hashes:
+            cache.load_entry(entry_hash)
+
+    def check_all():
+        for entry_hash in entry_hashes:
+            cache.exists_in_cache(entry_hash)
+
+    def open_cache():
+        toolcache.DiskCache(cache_dir=cache.cache_dir, max_size=n_entries)
+
+    def open_indexed_cache():
+        indexed_cache = toolcache.DiskCache(
+            cache_dir=cache.cache_dir, max_size=n_entries, metadata_index=True
+        )
+        indexed_cache.close()
+
+    def build_index():
+        indexed_cache = toolcache.DiskCache(
+            cache_dir=cache.cache_dir, metadata_index=True
+        )
+        indexed_cache.rescan()
+        indexed_cache.close()
+
+    operations = {
+        'miss': miss_all,
+        'save': save_all,
+        'load': load_all,
+        'exists': check_all,
+        'open': open_cache,
+        'open_indexed': open_indexed_cache,
+    }
+
+    # entries must be missing before misses, and indexed before indexed opens
+    setups = {'miss': cache.delete_all_entries, 'open_indexed': build_index}
+
+    # count syscalls on first run of each operation, before timing repeats
+    syscalls = {}
+    for operation, function in operations.items():
+        if operation in setups:
+            setups[operation]()
+        counts = bench_utils.count_syscalls(function, n_entries)
+        syscalls[operation] = sum(counts.values())
+
+    times = {}
+    for operation, function in operations.items():
+        if operation in setups:
+            setups[operation]()
+        times[operation] = bench_utils.time_per_item(
+            function, n_entries, repeat=3
+        )
+    cache.delete_all_entries()
+    return times, syscalls
+
+
+def run(quick=False):
+    """return benchmark records of DiskCache throughput"""
+    if quick:
+        configurations = [(100, 100), (1000, 100), (100, 100000)]
+    else:
+        configurations = [
+            (100, 100),
+            (1000, 100),
+            (10000, 100),
+            (1000, 10000),
+            (100, 1000000),
+        ]
+    records = []
+    for n_entries, payload_size in configurations:
+        times, syscalls = benchmark_disk_throughput(n_entries, payload_size)
+        for operation, ns in times.items():
+            record = bench_utils.create_record(
+                'disk_throughput',
+                ns,
+                operation=operation,
+                n_entries=n_entries,
+                payload_size=payload_size,
+            )
+            record['syscalls_per_op'] = syscalls[operation]
+            records.append(record)
+    return records
+
+
+if __name__ == '__main__':
+    for record in run():
+        print(
+            bench_utils.get_record_key(record),
+            '%.0f ns' % record['ns_per_op'],
+            '%.1f syscalls' % record['syscalls_per_op'],
+        )
@@ -0,0 +1,69 @@
+"""measure save_entry() latency of full caches for each eviction policy
+
+every measured save adds a new entry to a cache of max_size entries, so
+every save also evicts an entry
+
+usage: python benchmarks/bench_eviction.py
+"""
+
+import itertools
+
+import toolcache
+
+import bench_utils
+
+
+cachetypes = ['memory', 'disk']
+max_size_policies = ['lru', 'fifo', 'lfu']
+
+
+def benchmark_eviction(cachetype, max_size_policy, max_size, n_saves):
+    """return best ns per save to a full cache"""
+
+    CacheClass = toolcache.get_cache_class(cachetype)
+    cache = CacheClass(max_size=max_size, max_size_policy=max_size_policy)
+    counter = itertools.count()
+    for i in range(max_size):
+        cache.save_entry(str(next(counter)), i)
+
+    # access some entries so that lru and lfu orderings are non-trivial
+    for i in range(0, max_size, 3):
+        cache.load_entry(str(i))
+
+    def save_entries():
+        for i in range(n_saves):
+            cache.save_entry(str(next(counter)), i)
+
+    return bench_utils.time_per_item(save_entries, n_items=n_saves, repeat=3)
+
+
+def run(quick=False):
+    """return benchmark records of saves to full caches"""
+    records = []
+    for cachetype in cachetypes:
+        if cachetype == 'memory':
+            max_size, n_saves = (1000, 2000) if quick else (10000, 20000)
+        else:
+            max_size, n_saves = (100, 100) if quick else (1000, 1000)
+        for max_size_policy in max_size_policies:
+            ns = benchmark_eviction(
+                cachetype=cachetype,
+                max_size_policy=max_size_policy,
+                max_size=max_size,
+                n_saves=n_saves,
+            )
+            records.append(
+                bench_utils.create_record(
+                    'save_with_eviction',
+                    ns,
+                    cachetype=cachetype,
+                    max_size_policy=max_size_policy,
+                    max_size=max_size,
+                )
+            )
+    return records
+
+
+if __name__ == '__main__':
+    for record in run():
+        print(bench_utils.get_record_key(record), '%.0f ns' % record['ns_per_op'])
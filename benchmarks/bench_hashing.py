@@ -0,0 +1,67 @@
+"""measure per-call overhead of each hash mode for typical argument shapes
+
+usage: python benchmarks/bench_hashing.py
+"""
+
+import timeit
+
+from toolcache import hash_utils
+
+import bench_utils
+
+
+hash_modes = {
+    'json': hash_utils.compute_hash_json,
+    'json_digest': hash_utils.compute_hash_json_digest,
+    'fast': hash_utils.compute_hash_fast,
+    'native': hash_utils.compute_hash_native,
+}
+
+argument_shapes = {
+    'one int': ((12345,), {}),
+    'three scalars': ((1, 2.5, 'abc'), {}),
+    'kwargs': ((), {'start': 1000, 'end': 2000, 'label': 'daily'}),
+    'short list': (([1, 2, 3, 4, 5, 6, 7, 8],), {}),
+    'nested dict': (
+        ({'a': {'b': [1, 2, 3], 'c': 'd'}, 'e': [{'f': 1.5}]},),
+        {'verbose': False},
+    ),
+    'long str': (('x' * 10000,), {}),
+    'list of 1000 ints': ((list(range(1000)),), {}),
+}
+
+
+def benchmark_hash_modes(number=20000, repeat=5):
+    """return dict mapping (shape, mode) to best ns per call"""
+    results = {}
+    for shape, (args, kwargs) in argument_shapes.items():
+        for mode, f_hash in hash_modes.items():
+            times = timeit.repeat(
+                lambda: f_hash(*args, **kwargs), number=number, repeat=repeat
+            )
+            results[(shape, mode)] = min(times) / number * 1e9
+    return results
+
+
+def run(quick=False):
+    """return benchmark records of hashing cost per hash mode and arg shape"""
+    if quick:
+        results = benchmark_hash_modes(number=2000, repeat=3)
+    else:
+        results = benchmark_hash_modes()
+    return [
+        bench_utils.create_record('hash', ns, shape=shape, hash_mode=mode)
+        for (shape, mode), ns in results.items()
+    ]
+
+
+def print_results(results):
+    modes = list(hash_modes)
+    print(('{:<20}' + '{:>14}' * len(modes)).format('ns per call', *modes))
+    for shape in argument_shapes:
+        row = [results[(shape, mode)] for mode in modes]
+        print(('{:<20}' + '{:>14.0f}' * len(modes)).format(shape, *row))
+
+
+if __name__ == '__main__':
+    print_results(benchmark_hash_modes())
@@ -0,0 +1,84 @@
+"""measure latency of cache hits of decorated functions
+
+compares functools.lru_cache() to toolcache memory caches that use the
+decorator fast path, and to a configuration that uses the full load path
+
+usage: python benchmarks/bench_hit_latency.py
+"""
+
+import functools
+import timeit
+
+import toolcache
+
+import bench_utils
+
+
+def f(a, b=2):
+    return a * b
+
+
+def create_functions():
+    return {
+        'functools.lru_cache': functools.lru_cache(maxsize=None)(f),
+        'memory native': toolcache.cache('memory', hash_mode='native')(f),
+        'memory native no stats': toolcache.cache(
+            'memory', hash_mode='native', track_basic_stats=False
+        )(f),
+        'memory fast': toolcache.cache('memory', hash_mode='fast')(f),
+        'memory json': toolcache.cache('memory')(f),
+        'memory json with ttl': toolcache.cache('memory', ttl=3600)(f),
+    }
+
+
+def benchmark_hit_latency(number=100000, repeat=5):
+    """return dict mapping (function, call) to best ns per hit"""
+    calls = {'f(1)': ((1,), {}), 'f(1, b=3)': ((1,), {'b': 3})}
+    results = {}
+    for name, function in create_functions().items():
+        for call, (args, kwargs) in calls.items():
+            function(*args, **kwargs)
+            if kwargs:
+                statement = 'function(*args, **kwargs)'
+            else:
+                statement = 'function(*args)'
+            times = timeit.repeat(
+                statement,
+                globals={'function': function, 'args': args, 'kwargs': kwargs},
+                number=number,
+                repeat=repeat,
+            )
+            results[(name, call)] = min(times) / number * 1e9
+    return results
+
+
+def run(quick=False):
+    """return benchmark records of hit latency of decorated functions"""
+    if quick:
+        results = benchmark_hit_latency(number=10000, repeat=3)
+    else:
+        results = benchmark_hit_latency()
+    return [
+        bench_utils.create_record('hit_latency', ns, function=name, call=call)
+        for (name, call), ns in results.items()
+    ]
+
+
+def print_results(results):
+    names = list(dict.fromkeys(name for name, call in results))
+    calls = list(dict.fromkeys(call for name, call in results))
+    baseline = {call: results[(names[0], call)] for call in calls}
+    header = ''.join('{:>22}'.format(call) for call in calls)
+    print('{:<26}'.format('ns per hit (x lru_cache)') + header)
+    for name in names:
+        row = ''
+        for call in calls:
+            value = results[(name, call)]
+            row += '{:>22}'.format(
+                '%.0f (%.1fx)' % (value, value / baseline[call])
+            )
+        print('{:<26}'.format(name) + row)
+
+
+if __name__ == '__main__':
+    print_results(benchmark_hit_latency())
@@ -0,0 +1,99 @@
+"""helpers shared by benchmark modules
+
+every benchmark module defines run(quick=False), which returns a list of
+records created by create_record(), see run_benchmarks.py
+"""
+
+import collections
+import contextlib
+import time
+import timeit
+
+
+# file system functions counted by count_syscalls()
+_counted_os_functions = [
+    'stat',
+    'lstat',
+    'fstat',
+    'open',
+    'replace',
+    'rename',
+    'remove',
+    'unlink',
+    'mkdir',
+    'rmdir',
+    'utime',
+    'scandir',
+    'listdir',
+]
+
+
+def time_per_call(function, number, repeat):
+    """return best ns per call of function over repeat runs of number calls"""
+    times = timeit.repeat(function, number=number, repeat=repeat)
+    return min(times) / number * 1e9
+
+
+def time_per_item(function, n_items, repeat):
+    """return best ns per item of function that processes n_items per call"""
+    best = None
+    for r in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / n_items * 1e9
+
+
+def count_syscalls(function, n_items=1):
+    """return dict mapping file system call names to mean calls per item
+
+    counts calls made through the os module and open(), including calls made
+    indirectly by os.path and pathlib, calls made internally by C code such as
+    os.DirEntry.stat() are not counted
+    """
+    import builtins
+    import os
+
+    counts = collections.Counter()
+
+    def wrap(module, name):
+        original = getattr(module, name)
+        if module is os:
+            key = 'os.' + name
+        else:
+            key = name
+
+        def wrapper(*args, **kwargs):
+            counts[key] += 1
+            return original(*args, **kwargs)
+
+        setattr(module, name, wrapper)
+        return original
+
+    with contextlib.ExitStack() as stack:
+        for module, names in [(os, _counted_os_functions), (builtins, ['open'])]:
+            for name in names:
+                original = wrap(module, name)
+                stack.callback(setattr, module, name, original)
+        function()
+
+    return {name: count / n_items for name, count in sorted(counts.items())}
+
+
+def create_record(benchmark, ns_per_op, **params):
+    """create result record, lower ns_per_op is always better
+
+    benchmarks of io can add a syscalls_per_op key to records, which is
+    compared across runs like ns_per_op
+    """
+    return {'benchmark': benchmark, 'params': params, 'ns_per_op': ns_per_op}
+
+
+def get_record_key(record):
+    """return str that identifies record across runs"""
+    params = ','.join(
+        key + '=' + str(value) for key, value in sorted(record['params'].items())
+    )
+    return record['benchmark'] + '[' + params + ']'
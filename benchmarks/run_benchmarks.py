@@ -0,0 +1,150 @@
+"""run benchmark suite and write machine-readable results
+
+## Usage
+- run all benchmarks: `python benchmarks/run_benchmarks.py -o results.json`
+- fewer iterations: `python benchmarks/run_benchmarks.py --quick`
+- subset: `python benchmarks/run_benchmarks.py --only hashing decorator`
+- check for regressions: `python benchmarks/run_benchmarks.py
+  --compare baseline.json --threshold 0.25`, exits with status 1 if any
+  benchmark is more than 25% slower than in baseline.json
+"""
+
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import sys
+
+
+benchmark_modules = [
+    'hashing',
+    'argument_binding',
+    'hit_latency',
+    'decorator',
+    'eviction',
+    'disk_throughput',
+    'contention',
+]
+
+
+def run_benchmarks(names=None, quick=False):
+    """run benchmark modules and return results dict"""
+    import toolcache
+
+    import bench_utils
+
+    if names is None:
+        names = benchmark_modules
+    records = []
+    for name in names:
+        print('running', name, file=sys.stderr)
+        module = importlib.import_module('bench_' + name)
+        records.extend(module.run(quick=quick))
+
+    return {
+        'metadata': {
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'toolcache_version': toolcache.__version__,
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'quick': quick,
+        },
+        'results': {
+            bench_utils.get_record_key(record): record for record in records
+        },
+    }
+
+
+def compare_results(results, baseline, threshold):
+    """return list of (key, old_ns, new_ns) of benchmarks slower than baseline
+
+    ## Inputs
+    - results: dict of results returned by run_benchmarks()
+    - baseline: dict of results returned by an earlier run_benchmarks()
+    - threshold: float fraction of slowdown that counts as a regression
+    """
+    regressions = []
+    for key, record in results['results'].items():
+        old_record = baseline['results'].get(key)
+        if old_record is None:
+            continue
+        old_ns = old_record['ns_per_op']
+        new_ns = record['ns_per_op']
+        if new_ns > old_ns * (1 + threshold):
+            regressions.append((key, old_ns, new_ns))
+    return regressions
+
+
+def compare_syscalls(results, baseline):
+    """return list of (key, old, new) of benchmarks that make more syscalls
+
+    syscall counts are deterministic, so any increase counts as a regression
+    """
+    regressions = []
+    for key, record in results['results'].items():
+        old_record = baseline['results'].get(key)
+        if old_record is None:
+            continue
+        old_syscalls = old_record.get('syscalls_per_op')
+        new_syscalls = record.get('syscalls_per_op')
+        if old_syscalls is None or new_syscalls is None:
+            continue
+        if new_syscalls > old_syscalls:
+            regressions.append((key, old_syscalls, new_syscalls))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-o', '--output', help='path of json output file')
+    parser.add_argument(
+        '--only', nargs='+', choices=benchmark_modules, help='modules to run'
+    )
+    parser.add_argument(
+        '--quick', action='store_true', help='use fewer iterations'
+    )
+    parser.add_argument('--compare', help='path of baseline json results')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.25,
+        help='fraction of slowdown reported as regression',
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(names=args.only, quick=args.quick)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        for key, old_ns, new_ns in regressions:
+            print(
+                'regression: %s %.0f ns -> %.0f ns' % (key, old_ns, new_ns),
+                file=sys.stderr,
+            )
+        syscall_regressions = compare_syscalls(results, baseline)
+        for key, old_syscalls, new_syscalls in syscall_regressions:
+            print(
+                'regression: %s %.1f syscalls -> %.1f syscalls'
+                % (key, old_syscalls, new_syscalls),
+                file=sys.stderr,
+            )
+        if len(regressions) > 0 or len(syscall_regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    # allow running from any directory
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
@@ -0,0 +1,98 @@
+import asyncio
+import concurrent.futures
+import inspect
+import threading
+import time
+
+import pytest
+
+import toolcache
+
+
+cachetypes = ['memory', 'disk', 'sqlite', 'log', 'tiered']
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_async_decorator(cachetype):
+
+    n_calls = []
+
+    @toolcache.cache(cachetype)
+    async def f(a, b=2):
+        n_calls.append(a)
+        await asyncio.sleep(0)
+        return a * b
+
+    async def main():
+        return [await f(1), await f(1), await f(2, b=3), await f(1)]
+
+    assert inspect.iscoroutinefunction(f)
+    assert asyncio.run(main()) == [2, 2, 6, 2]
+    assert n_calls == [1, 2]
+    assert f.cache.stats['n_saves'] == 2
+    assert f.cache.stats['n_loads'] == 2
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_async_methods(cachetype):
+
+    cache = toolcache.get_cache_class(cachetype)()
+
+    async def main():
+        await cache.async_save_entry('a', {'x': 1})
+        assert await cache.async_exists('a')
+        assert await cache.async_load_entry('a') == {'x': 1}
+        await cache.async_delete_entry('a')
+        assert not await cache.async_exists('a')
+        assert await cache.async_load_entry('a') is None
+        with pytest.raises(Exception):
+            await cache.async_load_entry('a', must_exist=True)
+
+    asyncio.run(main())
+
+
+def test_async_disk_io_runs_in_executor():
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    cache = toolcache.DiskCache(async_executor=executor)
+    io_threads = []
+
+    old_load = cache._load
+
+    def slow_load(entry_hash):
+        io_threads.append(threading.get_ident())
+        time.sleep(0.2)
+        return old_load(entry_hash)
+
+    cache._load = slow_load
+    cache.save_entry('a', 1)
+
+    async def heartbeat(beats):
+        while True:
+            beats.append(time.time())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        beats = []
+        task = asyncio.create_task(heartbeat(beats))
+        await asyncio.sleep(0)
+        result = await cache.async_load_entry('a')
+        task.cancel()
+        return result, beats
+
+    result, beats = asyncio.run(main())
+    assert result == 1
+    assert io_threads[0] != threading.get_ident()
+    assert len(beats) > 5
+    executor.shutdown()
+
+
+def test_async_memory_io_runs_inline():
+
+    cache = toolcache.MemoryCache()
+
+    async def main():
+        await cache.async_save_entry('a', 1)
+        return await cache.async_load_entry('a')
+
+    assert asyncio.run(main()) == 1
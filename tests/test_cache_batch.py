@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+import toolcache
+
+
+cachetypes = ['memory', 'disk', 'sqlite', 'log', 'tiered']
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_batch_crud(cachetype):
+
+    cache = toolcache.get_cache_class(cachetype)()
+    entries = {'a': 1, 'b': [2, 3], 'c': {'x': 4}}
+
+    cache.save_many(entries)
+    assert cache.get_cache_size() == 3
+    assert cache.load_many(['a', 'b', 'c', 'd']) == entries
+    assert cache.exists_many(['a', 'd']) == {'a': True, 'd': False}
+    with pytest.raises(Exception):
+        cache.load_many(['a', 'd'], must_exist=True)
+
+    cache.save_many({'a': 5, 'e': 6})
+    assert cache.get_cache_size() == 4
+    assert cache.load_many(['a', 'e']) == {'a': 5, 'e': 6}
+
+    cache.delete_many(['a', 'b', 'd'])
+    assert cache.get_cache_size() == 2
+    assert cache.load_many(['a', 'b', 'c']) == {'c': {'x': 4}}
+
+    stats = cache.stats
+    assert stats['n_saves'] == 5
+    assert stats['n_deletes'] == 3
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_batch_stats(cachetype):
+
+    cache = toolcache.get_cache_class(cachetype)()
+    cache.save_many({'a': 1, 'b': 2})
+    cache.load_many(['a', 'b', 'c'])
+
+    stats = cache.stats
+    assert stats['n_checks'] == 3
+    assert stats['n_hits'] == 2
+    assert stats['n_misses'] == 1
+    assert stats['n_loads'] == 2
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_batch_eviction(cachetype):
+
+    cache = toolcache.get_cache_class(cachetype)(
+        max_size=4, max_size_policy='lru'
+    )
+    cache.save_many({'a': 1, 'b': 2, 'c': 3})
+    cache.load_many(['a'])
+
+    evictions = []
+    old_evict_to_size = cache.evict_to_size
+
+    def evict_to_size(target_size):
+        evictions.append(target_size)
+        return old_evict_to_size(target_size)
+
+    cache.evict_to_size = evict_to_size
+    cache.save_many({'d': 4, 'e': 5, 'f': 6})
+    assert evictions == [1]
+    assert cache.get_cache_size() == 4
+    assert cache.exists_many(['a', 'b', 'c']) == {
+        'a': True,
+        'b': False,
+        'c': False,
+    }
+
+    # batches larger than max_size keep their last entries
+    cache.save_many({str(i): i for i in range(10)})
+    assert sorted(cache.get_all_entry_hashes()) == ['6', '7', '8', '9']
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_batch_ttl(cachetype):
+
+    cache = toolcache.get_cache_class(cachetype)(ttl=0.1)
+    cache.save_many({'a': 1})
+    time.sleep(0.15)
+    cache.save_many({'b': 2})
+    assert cache.load_many(['a', 'b']) == {'b': 2}
+    assert cache.exists_many(['a', 'b']) == {'a': False, 'b': True}
+
+
+def test_batch_striped():
+
+    cache = toolcache.MemoryCache(safety='striped', n_lock_stripes=4)
+    cache.save_many({i: i * 2 for i in range(20)})
+    assert cache.load_many(range(20)) == {i: i * 2 for i in range(20)}
+    cache.delete_many(range(10))
+    assert cache.get_cache_size() == 10
+    stats = cache.stats
+    assert stats['n_saves'] == 20
+    assert stats['n_loads'] == 20
+    assert stats['n_deletes'] == 10
+
+
+def test_batch_uses_backend_hooks():
+
+    cache = toolcache.SQLiteCache()
+    n_saves = []
+    old_save = cache._save
+    cache._save = lambda *args, **kwargs: (
+        n_saves.append(1),
+        old_save(*args, **kwargs),
+    )
+    cache.save_many({str(i): i for i in range(100)})
+    assert n_saves == []
+    assert cache.get_cache_size() == 100
+    assert cache.rescan() == 100
+    assert len(cache.load_many(str(i) for i in range(100))) == 100
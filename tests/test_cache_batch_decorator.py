@@ -0,0 +1,110 @@
+import asyncio
+import inspect
+
+import pytest
+
+import toolcache
+
+
+cachetypes = ['memory', 'disk', 'sqlite', 'log', 'tiered']
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_batch_decorator(cachetype):
+
+    calls = []
+
+    @toolcache.cache(cachetype, batch_arg='ids')
+    def f(ids, scale=1):
+        calls.append(list(ids))
+        return [i * scale for i in ids]
+
+    assert f([1, 2, 3]) == [1, 2, 3]
+    assert f([2, 3, 4]) == [2, 3, 4]
+    assert f([4, 1]) == [4, 1]
+    assert calls == [[1, 2, 3], [4]]
+
+    # other args remain part of each element's hash
+    assert f([1, 2], scale=10) == [10, 20]
+    assert f(scale=10, ids=[2, 3]) == [20, 30]
+    assert calls == [[1, 2, 3], [4], [1, 2], [3]]
+
+    stats = f.cache.stats
+    assert stats['n_saves'] == 7
+    assert stats['n_hits'] == 5
+
+
+def test_batch_decorator_duplicates_and_empty():
+
+    calls = []
+
+    @toolcache.cache('memory', batch_arg='ids')
+    def f(ids):
+        calls.append(list(ids))
+        return [str(i) for i in ids]
+
+    assert f([1, 1, 2, 1]) == ['1', '1', '2', '1']
+    assert f([]) == []
+    assert f(iter([2, 3])) == ['2', '3']
+    assert calls == [[1, 2], [3]]
+
+
+def test_batch_decorator_cache_args():
+
+    calls = []
+
+    @toolcache.cache('memory', batch_arg='ids')
+    def f(ids):
+        calls.append(list(ids))
+        return ids
+
+    f([1, 2])
+    f([1, 2], cache_load=False)
+    f([3], cache_save=False)
+    f([3])
+    assert calls == [[1, 2], [1, 2], [3], [3]]
+
+
+def test_batch_decorator_wrong_output_length():
+
+    @toolcache.cache('memory', batch_arg='ids')
+    def f(ids):
+        return ids[:1]
+
+    with pytest.raises(Exception):
+        f([1, 2])
+    assert f.cache.get_cache_size() == 0
+
+
+def test_batch_decorator_invalid_arg():
+
+    with pytest.raises(Exception):
+
+        @toolcache.cache('memory', batch_arg='x')
+        def f(ids):
+            return ids
+
+    with pytest.raises(Exception):
+
+        @toolcache.cache('memory', batch_arg='ids')
+        def g(*ids):
+            return ids
+
+
+@pytest.mark.parametrize('cachetype', ['memory', 'disk'])
+def test_batch_decorator_async(cachetype):
+
+    calls = []
+
+    @toolcache.cache(cachetype, batch_arg='ids')
+    async def f(ids):
+        calls.append(list(ids))
+        await asyncio.sleep(0)
+        return [i + 1 for i in ids]
+
+    async def main():
+        return [await f([1, 2]), await f([2, 3])]
+
+    assert inspect.iscoroutinefunction(f)
+    assert asyncio.run(main()) == [[2, 3], [3, 4]]
+    assert calls == [[1, 2], [3]]
@@ -1,7 +1,10 @@
 import json
+import os
 import tempfile
+import time
 
 import toolcache
+from toolcache.cachetypes import disk_cache
 
 
 def test_persistence_of_disk_cache():
@@ -46,3 +49,146 @@ def test_custom_disk_io_functions():
     def f(a, b, c):
         return [a, b, c]
 
+
+
+def test_sharded_disk_cache():
+    cache_dir = tempfile.mkdtemp()
+
+    @toolcache.cache('disk', cache_dir=cache_dir, shard_levels=2)
+    def f(a):
+        return a
+
+    for i in range(20):
+        f(i)
+    assert f.cache.get_cache_size() == 20
+
+    entry_hash = f.cache.compute_entry_hash(args=[1])
+    expected_path = os.path.join(
+        cache_dir, entry_hash[:2], entry_hash[2:4], entry_hash + '.pycache'
+    )
+    assert os.path.isfile(expected_path)
+    assert f.cache.rescan() == 20
+
+    f.cache.delete_all_entries()
+    assert f.cache.get_cache_size() == 0
+    assert f.cache.rescan() == 0
+
+
+def test_sharded_custom_hash_names():
+
+    cache = toolcache.DiskCache(shard_levels=1, f_hash=lambda a: 'name' + a)
+    entry_hash = cache.compute_entry_hash(args=['_x'])
+    cache.save_entry(entry_hash, 'data')
+    assert cache.load_entry(entry_hash) == 'data'
+    assert cache.rescan() == 1
+
+
+def test_migrate_cache_dir_layout():
+    cache_dir = tempfile.mkdtemp()
+
+    @toolcache.cache('disk', cache_dir=cache_dir)
+    def f(a):
+        return a
+
+    for i in range(10):
+        f(i)
+
+    n_moved = disk_cache.migrate_cache_dir_layout(cache_dir, shard_levels=2)
+    assert n_moved == 10
+
+    @toolcache.cache('disk', cache_dir=cache_dir, shard_levels=2)
+    def f(a):
+        raise Exception('should load from cache')
+
+    assert f.cache.get_cache_size() == 10
+    assert f(3) == 3
+
+    n_moved = disk_cache.migrate_cache_dir_layout(
+        cache_dir, shard_levels=0, old_shard_levels=2
+    )
+    assert n_moved == 10
+    assert sorted(os.listdir(cache_dir)) == sorted(
+        f.cache._get_entry_name(entry_hash) + '.pycache'
+        for entry_hash in f.cache.get_all_entry_hashes()
+    )
+
+
+def test_disk_io_skips_redundant_stats(tmp_path, monkeypatch):
+
+    cache = toolcache.DiskCache(cache_dir=str(tmp_path), shard_levels=1)
+    cache.save_entry('a', 1)
+
+    n_stats = []
+    stat = os.stat
+
+    def counting_stat(*args, **kwargs):
+        n_stats.append(args)
+        return stat(*args, **kwargs)
+
+    monkeypatch.setattr(os, 'stat', counting_stat)
+    assert cache.load_entry('a') == 1
+    assert cache.load_entry('b') is None
+    cache.save_entry('a', 2)
+    assert n_stats == []
+    assert cache.stats['n_hits'] == 1
+    assert cache.stats['n_misses'] == 1
+
+
+def test_disk_recreates_removed_directories(tmp_path):
+    import shutil
+
+    cache = toolcache.DiskCache(cache_dir=str(tmp_path), shard_levels=1)
+    cache.save_entry('a', 1)
+    shutil.rmtree(os.path.dirname(cache._get_cache_path('a')))
+    cache.save_entry('a', 2)
+    assert cache.load_entry('a') == 2
+
+
+def test_disk_loads_update_access_times(tmp_path):
+
+    cache = toolcache.DiskCache(cache_dir=str(tmp_path))
+    lru_cache = toolcache.DiskCache(cache_dir=str(tmp_path), max_size=10)
+    cache.save_entry('a', 1)
+    path = cache._get_cache_path('a')
+
+    os.utime(path, (1000, 1000))
+    cache.load_entry('a')
+    assert os.path.getmtime(path) == 1000
+    lru_cache.load_entry('a')
+    assert os.path.getatime(path) > 1000
+    assert os.path.getmtime(path) == 1000
+
+
+def test_disk_loads_do_not_reset_age(tmp_path):
+
+    cache = toolcache.DiskCache(
+        cache_dir=str(tmp_path), ttl=0.5, max_size=10
+    )
+    cache.save_entry('a', 1)
+    cache.save_entry('b', 2)
+    time.sleep(0.3)
+    assert cache.load_entry('a') == 1
+
+    # age of loaded entry is kept when cache is reopened
+    reopened = toolcache.DiskCache(
+        cache_dir=str(tmp_path), ttl=0.5, max_size=10
+    )
+    time.sleep(0.3)
+    assert reopened.load_entry('a') is None
+    assert reopened.load_entry('b') is None
+
+
+def test_disk_reopen_orders_entries_by_access_time(tmp_path):
+
+    cache = toolcache.DiskCache(cache_dir=str(tmp_path))
+    for i, name in enumerate(['a', 'b', 'c']):
+        cache.save_entry(name, i)
+    os.utime(cache._get_cache_path('a'), (3000, 3000))
+    os.utime(cache._get_cache_path('b'), (1000, 1000))
+    os.utime(cache._get_cache_path('c'), (2000, 2000))
+
+    reopened = toolcache.DiskCache(cache_dir=str(tmp_path), max_size=2)
+    assert reopened.entry_access_times['b'] == 1000
+    reopened.save_entry('d', 3)
+    assert not reopened.exists_in_cache('b')
+    assert reopened.exists_in_cache('a')
@@ -0,0 +1,182 @@
+import os
+import socket
+import sqlite3
+import threading
+
+import pytest
+
+import toolcache
+from toolcache.cachetypes import disk_cache
+
+
+def open_cache(tmp_path, **kwargs):
+    return toolcache.DiskCache(
+        cache_dir=str(tmp_path), metadata_index=True, **kwargs
+    )
+
+
+def get_index_path(tmp_path):
+    return os.path.join(str(tmp_path), toolcache.DiskCache.metadata_index_filename)
+
+
+def test_metadata_index_skips_scan(tmp_path, monkeypatch):
+
+    cache = open_cache(tmp_path, shard_levels=1)
+    for i in range(10):
+        cache.save_entry(str(i), i)
+    cache.delete_entry('0')
+    cache.close()
+
+    def fail_scan(*args, **kwargs):
+        raise Exception('should not scan entry files')
+
+    monkeypatch.setattr(disk_cache, '_scan_entry_files', fail_scan)
+    reopened = open_cache(tmp_path, shard_levels=1, max_size=100)
+    assert reopened.get_cache_size() == 9
+    assert reopened.load_entry('5') == 5
+    assert not reopened.exists_in_cache('0')
+
+
+def test_metadata_index_persists_access_metadata(tmp_path):
+
+    cache = open_cache(tmp_path, max_size=3, max_size_policy='lfu')
+    for name in ['a', 'b', 'c']:
+        cache.save_entry(name, name)
+    for i in range(3):
+        cache.load_entry('a')
+        cache.load_entry('c')
+    cache.close()
+
+    reopened = open_cache(tmp_path, max_size=3, max_size_policy='lfu')
+    assert reopened.entry_access_counts == {'a': 3, 'b': 0, 'c': 3}
+    reopened.close()
+
+    reopened = open_cache(tmp_path, max_size=3)
+    reopened.save_entry('d', 'd')
+    assert not reopened.exists_in_cache('b')
+
+
+def test_metadata_index_persists_sizes(tmp_path, monkeypatch):
+
+    cache = open_cache(tmp_path, max_bytes=10**6)
+    cache.save_entry('a', list(range(1000)))
+    total_bytes = cache.get_cache_bytes()
+    cache.close()
+
+    def fail_getsize(path):
+        raise Exception('should use indexed size')
+
+    monkeypatch.setattr(os.path, 'getsize', fail_getsize)
+    reopened = open_cache(tmp_path, max_bytes=10**6)
+    assert reopened.get_cache_bytes() == total_bytes > 0
+
+
+def test_metadata_index_rebuilt_after_crash(tmp_path):
+
+    cache = open_cache(tmp_path)
+    cache.save_entry('a', 1)
+    cache.close()
+
+    # session of a process that exited without closing its index
+    connection = sqlite3.connect(get_index_path(tmp_path))
+    connection.execute(
+        'INSERT INTO sessions VALUES (?, ?, ?)',
+        ('crashed', os.getpid(), socket.gethostname()),
+    )
+    connection.commit()
+    connection.close()
+
+    # entry written without updating index
+    toolcache.DiskCache(cache_dir=str(tmp_path)).save_entry('b', 2)
+
+    reopened = open_cache(tmp_path)
+    assert sorted(reopened.get_all_entry_hashes()) == ['a', 'b']
+    reopened.close()
+    assert sorted(open_cache(tmp_path).get_all_entry_hashes()) == ['a', 'b']
+
+
+def test_metadata_index_not_rebuilt_for_open_sessions(tmp_path):
+
+    cache = open_cache(tmp_path)
+    cache.save_entry('a', 1)
+    other = open_cache(tmp_path)
+    other.save_entry('b', 2)
+    assert sorted(open_cache(tmp_path).get_all_entry_hashes()) == ['a', 'b']
+
+
+@pytest.mark.parametrize('damage', ['missing', 'corrupt', 'layout'])
+def test_metadata_index_recovery(tmp_path, damage):
+
+    cache = open_cache(tmp_path)
+    cache.save_entry('a', 1)
+    cache.save_entry('b', 2)
+    cache.close()
+
+    index_path = get_index_path(tmp_path)
+    if damage == 'missing':
+        for suffix in ['', '-wal', '-shm']:
+            if os.path.isfile(index_path + suffix):
+                os.remove(index_path + suffix)
+    elif damage == 'corrupt':
+        for suffix in ['-wal', '-shm']:
+            if os.path.isfile(index_path + suffix):
+                os.remove(index_path + suffix)
+        with open(index_path, 'wb') as f:
+            f.write(b'not a database' * 100)
+    elif damage == 'layout':
+        disk_cache.migrate_cache_dir_layout(str(tmp_path), shard_levels=1)
+
+    if damage == 'layout':
+        reopened = open_cache(tmp_path, shard_levels=1, max_size=10)
+    else:
+        reopened = open_cache(tmp_path, max_size=10)
+    assert sorted(reopened.get_all_entry_hashes()) == ['a', 'b']
+    assert reopened.load_entry('b') == 2
+
+
+def test_metadata_index_tracks_external_changes(tmp_path):
+
+    cache = open_cache(tmp_path)
+    cache.save_entry('a', 1)
+    os.remove(cache._get_cache_path('a'))
+    assert cache.load_entry('a') is None
+    cache.close()
+    assert open_cache(tmp_path).get_cache_size() == 0
+
+
+def test_metadata_index_batch_and_delete_all(tmp_path):
+
+    cache = open_cache(tmp_path)
+    cache.save_many({'a': 1, 'b': 2, 'c': 3})
+    cache.delete_many(['a'])
+    cache.close()
+
+    reopened = open_cache(tmp_path)
+    assert sorted(reopened.get_all_entry_hashes()) == ['b', 'c']
+    reopened.delete_all_entries()
+    reopened.close()
+    assert open_cache(tmp_path).get_cache_size() == 0
+
+
+def test_metadata_index_closes_connections_of_all_threads(tmp_path):
+
+    cache = open_cache(tmp_path)
+    index = cache._metadata_index
+
+    def save(name):
+        cache.save_entry(name, name)
+
+    threads = [
+        threading.Thread(target=save, args=(str(i),)) for i in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    connections = list(index._all_connections)
+    assert len(connections) == 4
+    cache.close()
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute('SELECT 1')
+    assert sorted(open_cache(tmp_path).get_all_entry_hashes()) == ['0', '1', '2']
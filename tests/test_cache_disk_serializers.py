@@ -0,0 +1,161 @@
+import json
+import pickle
+
+import pytest
+
+import toolcache
+from toolcache import serialize_utils
+
+
+data = {'a': [1, 2, 3], 'b': 'text', 'c': {'d': 4.5, 'e': None}}
+
+
+@pytest.mark.parametrize('file_format', ['pickle', 'json', 'msgpack'])
+@pytest.mark.parametrize('compression', [None, 'zlib', 'zstd', 'lz4'])
+def test_disk_serializers(file_format, compression, tmp_path):
+
+    if file_format == 'msgpack':
+        pytest.importorskip('msgpack')
+    if compression == 'zstd':
+        pytest.importorskip('zstandard')
+    if compression == 'lz4':
+        pytest.importorskip('lz4')
+
+    cache = toolcache.DiskCache(
+        cache_dir=str(tmp_path),
+        file_format=file_format,
+        compression=compression,
+        compression_threshold=0,
+    )
+    cache.save_entry('a', data)
+    assert cache.load_entry('a') == data
+
+    # reopened caches read the format from each file
+    reopened = toolcache.DiskCache(cache_dir=str(tmp_path))
+    assert reopened.load_entry('a') == data
+
+
+def test_disk_mixed_formats(tmp_path):
+
+    for file_format in ['pickle', 'json']:
+        cache = toolcache.DiskCache(cache_dir=str(tmp_path), file_format=file_format)
+        cache.save_entry(file_format, data)
+    zlib_cache = toolcache.DiskCache(cache_dir=str(tmp_path), compression='zlib')
+    zlib_cache.save_entry('zlib', data)
+
+    cache = toolcache.DiskCache(cache_dir=str(tmp_path), file_format='json')
+    assert cache.load_many(['pickle', 'json', 'zlib']) == {
+        'pickle': data,
+        'json': data,
+        'zlib': data,
+    }
+
+
+def test_disk_compression_threshold(tmp_path):
+
+    cache = toolcache.DiskCache(
+        cache_dir=str(tmp_path),
+        compression='zlib',
+        compression_threshold=1000,
+        max_bytes=10**9,
+    )
+    cache.save_entry('small', 'x' * 10)
+    cache.save_entry('large', 'x' * 100000)
+    assert cache.entry_weights['large'] < 1000
+    assert cache.load_entry('small') == 'x' * 10
+    assert cache.load_entry('large') == 'x' * 100000
+
+
+def test_disk_loads_legacy_files(tmp_path):
+
+    cache = toolcache.DiskCache(cache_dir=str(tmp_path))
+    with open(cache._get_cache_path('pickled'), 'wb') as f:
+        pickle.dump(data, f)
+    with open(cache._get_cache_path('json'), 'w') as f:
+        json.dump(data, f)
+    cache.rescan()
+    assert cache.load_entry('pickled') == data
+    assert cache.load_entry('json') == data
+
+
+def test_pickle_out_of_band_buffers():
+
+    np = pytest.importorskip('numpy')
+    array = np.arange(1000)
+    chunks = serialize_utils.serialize({'array': array})
+    assert any(memoryview(chunk).nbytes == array.nbytes for chunk in chunks)
+    loaded = serialize_utils.deserialize(bytearray(b''.join(chunks)))
+    assert (loaded['array'] == array).all()
+    assert loaded['array'].flags.writeable
+
+
+def test_register_serializer(tmp_path):
+
+    def dumps(value):
+        return [value.encode()]
+
+    def loads(view):
+        return bytes(view).decode()
+
+    toolcache.register_serializer('utf8_test', 200, dumps, loads)
+    with pytest.raises(Exception):
+        toolcache.register_serializer('other_test', 200, dumps, loads)
+
+    cache = toolcache.DiskCache(cache_dir=str(tmp_path), file_format='utf8_test')
+    cache.save_entry('a', 'text')
+    assert cache.load_entry('a') == 'text'
+    with open(cache._get_cache_path('a'), 'rb') as f:
+        assert f.read().endswith(b'text')
+
+
+def test_invalid_serializer_options():
+
+    with pytest.raises(Exception):
+        toolcache.DiskCache(file_format='unknown')
+    with pytest.raises(Exception):
+        toolcache.DiskCache(compression='unknown')
+
+
+def test_disk_verbose_save(capsys):
+
+    cache = toolcache.DiskCache(verbose=True)
+    cache.save_entry('a', 1)
+    assert 'saving to cache' in capsys.readouterr().out
+
+
+def test_disk_memory_map(tmp_path):
+
+    import mmap
+
+    payload = bytearray(b'x' * 100000)
+    cache = toolcache.DiskCache(cache_dir=str(tmp_path), memory_map=True)
+    cache.save_entry('a', {'buffer': pickle.PickleBuffer(payload), 'b': 1})
+    loaded = cache.load_entry('a')
+    assert loaded['b'] == 1
+    view = loaded['buffer']
+    assert view.readonly
+    assert isinstance(view.obj, mmap.mmap)
+    assert bytes(view) == bytes(payload)
+
+    # buffers are aligned within file
+    with open(cache._get_cache_path('a'), 'rb') as f:
+        assert f.read().find(bytes(payload)) % 64 == 0
+
+    # without memory_map, buffers are loaded into writable memory
+    cache = toolcache.DiskCache(cache_dir=str(tmp_path))
+    view = cache.load_entry('a')['buffer']
+    assert not view.readonly
+
+
+def test_disk_memory_map_numpy(tmp_path):
+
+    np = pytest.importorskip('numpy')
+    array = np.arange(10**6, dtype=float)
+    cache = toolcache.DiskCache(cache_dir=str(tmp_path), memory_map=True)
+    cache.save_entry('a', array)
+    loaded = cache.load_entry('a')
+    assert (loaded == array).all()
+    assert not loaded.flags.writeable
+    assert not loaded.flags.owndata
+    cache.delete_entry('a')
+    assert (loaded == array).all()
@@ -5,7 +5,7 @@ import pytest
 import toolcache
 
 
-cachetypes = ['memory', 'disk']
+cachetypes = ['memory', 'disk', 'sqlite', 'log', 'tiered']
 
 
 @pytest.mark.parametrize('cachetype', cachetypes)
@@ -0,0 +1,141 @@
+import pytest
+
+import toolcache
+
+
+def test_fast_hits_are_counted():
+
+    n_calls = []
+
+    @toolcache.cache('memory', hash_mode='native')
+    def f(a, b=1):
+        n_calls.append(a)
+        return a + b
+
+    assert f(1) == 2
+    assert f(1) == 2
+    assert f(1) == 2
+    assert f(2, b=3) == 5
+    assert f(2, b=3) == 5
+    assert n_calls == [1, 2]
+    assert f.cache._fast_hit_counter is not None
+    stats = f.cache.stats
+    assert stats['n_hashes'] == 5
+    assert stats['n_checks'] == 5
+    assert stats['n_hits'] == 3
+    assert stats['n_loads'] == 3
+    assert stats['n_misses'] == 2
+    assert stats['n_saves'] == 2
+
+
+@pytest.mark.parametrize('safety', ['thread', 'striped'])
+def test_stats_can_be_reset_in_place(safety):
+
+    @toolcache.cache('memory', hash_mode='native', safety=safety)
+    def f(a):
+        return a
+
+    f(1)
+    f(1)
+    f(1)
+    stats = f.cache.stats
+    assert stats is f.cache.stats
+    assert stats['n_hits'] == 2
+    for key in stats:
+        stats[key] = 0
+    f(1)
+    f(2)
+    assert f.cache.stats['n_hits'] == 1
+    assert f.cache.stats['n_misses'] == 1
+    assert f.cache.stats['n_hashes'] == 2
+
+
+@pytest.mark.parametrize(
+    'cache_kwargs',
+    [
+        {},
+        {'hash_mode': 'native'},
+        {'hash_mode': 'fast'},
+        {'hash_include_args': ['a']},
+        {'track_basic_stats': False},
+        {'safety': 'striped'},
+    ],
+)
+def test_fast_hit_path_configurations(cache_kwargs):
+
+    n_calls = []
+
+    @toolcache.cache('memory', **cache_kwargs)
+    def f(a, b=1):
+        n_calls.append(a)
+        return [a, b]
+
+    assert f(1) == [1, 1]
+    assert f(1) == [1, 1]
+    assert f(a=1) == [1, 1]
+    assert len(n_calls) <= 2
+    assert f.cache.get_cache_size() == len(n_calls)
+
+    # cache is cleared in place so the fast path sees deletions
+    f.cache.delete_all_entries()
+    assert f(1) == [1, 1]
+    assert f(1) == [1, 1]
+    assert f.cache.get_cache_size() == 1
+
+
+@pytest.mark.parametrize(
+    'cache_kwargs',
+    [
+        {'ttl': 100},
+        {'max_size': 10},
+        {'track_detailed_stats': True},
+        {'single_flight': True},
+        {'verbose': True},
+    ],
+)
+def test_fast_hit_path_disabled(cache_kwargs):
+
+    @toolcache.cache('memory', **cache_kwargs)
+    def f(a):
+        return a
+
+    f(1)
+    f(1)
+    assert f.cache._fast_hit_counter is None
+    assert f.cache.stats['n_hits'] == 1
+
+
+def test_native_hash_mode_unhashable_args():
+
+    n_calls = []
+
+    @toolcache.cache('memory', hash_mode='native')
+    def f(a):
+        n_calls.append(1)
+        return len(a)
+
+    assert f([1, 2]) == 2
+    assert f([1, 2]) == 2
+    assert f({'a': [1]}) == 1
+    assert f({'a': [1]}) == 1
+    assert len(n_calls) == 2
+    assert f.cache.stats['n_hits'] == 2
+
+
+def test_fast_hit_path_with_cache_args():
+
+    n_calls = []
+
+    @toolcache.cache('memory', hash_mode='native')
+    def f(a):
+        n_calls.append(a)
+        return a
+
+    assert f(1) == 1
+    assert f(1, cache_verbose=False) == 1
+    assert n_calls == [1]
+
+
+def test_native_hash_mode_requires_memory_cache():
+    with pytest.raises(Exception):
+        toolcache.DiskCache(hash_mode='native')
@@ -0,0 +1,135 @@
+import os
+import tempfile
+
+import pytest
+
+import toolcache
+
+
+def test_log_cache_zero_copy_bytes():
+    cache = toolcache.LogCache(zero_copy=True)
+    cache.save_entry('a', b'raw bytes')
+    loaded = cache.load_entry('a')
+    assert isinstance(loaded, memoryview)
+    assert loaded.readonly
+    assert bytes(loaded) == b'raw bytes'
+
+    cache = toolcache.LogCache()
+    cache.save_entry('a', b'raw bytes')
+    loaded = cache.load_entry('a')
+    assert type(loaded) is bytes
+    assert loaded == b'raw bytes'
+
+
+def test_log_cache_decorator_returns_bytes():
+
+    calls = []
+
+    @toolcache.cache('log')
+    def f(x):
+        calls.append(x)
+        return b'output ' + x
+
+    assert type(f(b'a')) is bytes
+    assert type(f(b'a')) is bytes
+    assert f(b'a') == b'output a'
+    assert calls == [b'a']
+
+
+def test_log_cache_out_of_band_buffers():
+    cache = toolcache.LogCache()
+    data = {'x': bytearray(b'x' * 1000), 'y': [1, 2, 3]}
+    cache.save_entry('a', data)
+    cache.save_entry('b', 'other')
+    assert cache.load_entry('a') == data
+    assert cache.load_entry('b') == 'other'
+
+
+def test_log_cache_persisted_index():
+    cache_dir = tempfile.mkdtemp()
+    cache = toolcache.LogCache(cache_dir=cache_dir)
+    for i in range(10):
+        cache.save_entry(str(i), i)
+    cache.flush()
+
+    # records written after flush are replayed from end of persisted index
+    cache.save_entry('10', 10)
+    cache.delete_entry('0')
+    cache._close_file()
+
+    cache = toolcache.LogCache(cache_dir=cache_dir)
+    assert cache.get_cache_size() == 10
+    assert not cache.exists_in_cache('0')
+    assert cache.load_entry('10') == 10
+
+    # recover from a missing index
+    os.remove(os.path.join(cache_dir, cache.index_filename))
+    cache = toolcache.LogCache(cache_dir=cache_dir)
+    assert cache.get_cache_size() == 10
+    assert cache.load_entry('5') == 5
+
+
+def test_log_cache_truncated_record():
+    cache_dir = tempfile.mkdtemp()
+    cache = toolcache.LogCache(cache_dir=cache_dir)
+    cache.save_entry('a', 'a' * 100)
+    cache.save_entry('b', 'b' * 100)
+    cache._close_file()
+
+    # simulate crash during write of last record
+    path = cache._get_segment_path(cache._active_segment)
+    with open(path, 'r+b') as file:
+        file.truncate(os.path.getsize(path) - 10)
+
+    cache = toolcache.LogCache(cache_dir=cache_dir)
+    assert cache.get_all_entry_hashes() == ['a']
+    cache.save_entry('c', 'c')
+    cache._close_file()
+    cache = toolcache.LogCache(cache_dir=cache_dir)
+    assert sorted(cache.get_all_entry_hashes()) == ['a', 'c']
+
+
+def test_log_cache_compaction():
+    cache_dir = tempfile.mkdtemp()
+    cache = toolcache.LogCache(
+        cache_dir=cache_dir, segment_size=1000, compaction_threshold=None
+    )
+    for i in range(100):
+        cache.save_entry(str(i), 'x' * 50)
+    for i in range(90):
+        cache.delete_entry(str(i))
+    n_segments = len(cache._segments)
+    creation_times = {
+        entry_name: record[4] for entry_name, record in cache._index.items()
+    }
+
+    assert cache.compact(min_dead_fraction=0.5) > 0
+    assert len(cache._segments) < n_segments
+    assert cache.get_cache_size() == 10
+    for i in range(90, 100):
+        assert cache.load_entry(str(i)) == 'x' * 50
+
+    # deleted entries should not be resurrected by a full scan
+    cache._close_file()
+    os.remove(os.path.join(cache_dir, cache.index_filename))
+    cache = toolcache.LogCache(cache_dir=cache_dir)
+    assert cache.get_cache_size() == 10
+
+    # copied records keep their creation times on disk
+    assert {
+        entry_name: record[4] for entry_name, record in cache._index.items()
+    } == creation_times
+
+
+def test_log_cache_rejects_process_safety():
+    with pytest.raises(Exception):
+        toolcache.LogCache(safety='process')
+
+
+def test_log_cache_automatic_compaction():
+    cache = toolcache.LogCache(segment_size=1000)
+    for i in range(100):
+        cache.save_entry(str(i), 'x' * 50)
+    for i in range(100):
+        cache.delete_entry(str(i))
+    assert len(cache._segments) <= 2
@@ -0,0 +1,123 @@
+import pytest
+
+import toolcache
+from toolcache import size_utils
+
+
+cachetypes = ['memory', 'disk', 'sqlite', 'log', 'tiered']
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+@pytest.mark.parametrize('policy', ['lru', 'fifo', 'lfu'])
+def test_max_bytes_custom_weights(cachetype, policy):
+
+    cache = toolcache.get_cache_class(cachetype)(
+        max_bytes=100, max_size_policy=policy, f_weigh=len
+    )
+    cache.save_entry('a', 'x' * 40)
+    cache.save_entry('b', 'x' * 40)
+    cache.load_entry('a')
+    assert cache.get_cache_bytes() == 80
+
+    cache.save_entry('c', 'x' * 40)
+    assert cache.get_cache_bytes() == 80
+    assert cache.get_cache_size() == 2
+    assert cache.exists_in_cache('c')
+    if policy == 'fifo':
+        assert not cache.exists_in_cache('a')
+    else:
+        assert not cache.exists_in_cache('b')
+
+    # overwriting an entry replaces its weight
+    cache.save_entry('c', 'x' * 10)
+    assert cache.get_cache_bytes() == 50
+    cache.delete_entry('c')
+    assert cache.get_cache_bytes() == 40
+    assert cache.stats['n_size_evictions'] == 1
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_max_bytes_default_weights(cachetype):
+
+    cache = toolcache.get_cache_class(cachetype)(max_bytes=10000)
+    for i in range(20):
+        cache.save_entry(str(i), b'x' * 1000)
+        assert cache.get_cache_bytes() <= 10000
+    assert 5 <= cache.get_cache_size() <= 10
+    assert cache.exists_in_cache('19')
+    assert not cache.exists_in_cache('0')
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_max_bytes_batch(cachetype):
+
+    cache = toolcache.get_cache_class(cachetype)(max_bytes=100, f_weigh=len)
+    cache.save_many({'a': 'x' * 30, 'b': 'x' * 30})
+    cache.save_many({'c': 'x' * 30, 'd': 'x' * 30})
+    assert cache.get_cache_bytes() == 90
+    assert cache.load_many(['a', 'b', 'c', 'd']).keys() == {'b', 'c', 'd'}
+    cache.delete_many(['b', 'c'])
+    assert cache.get_cache_bytes() == 30
+
+
+def test_max_bytes_disk_measures_files(tmp_path):
+
+    cache = toolcache.DiskCache(cache_dir=str(tmp_path), max_bytes=10**6)
+    cache.save_entry('a', list(range(1000)))
+    paths = list(tmp_path.glob('**/*.pycache'))
+    assert cache.get_cache_bytes() == paths[0].stat().st_size
+
+    # weights of existing entries are measured when reopening cache
+    reopened = toolcache.DiskCache(cache_dir=str(tmp_path), max_bytes=10**6)
+    assert reopened.get_cache_bytes() == cache.get_cache_bytes()
+
+
+def test_max_bytes_sqlite_reopen(tmp_path):
+
+    db_path = str(tmp_path / 'cache.sqlite')
+    cache = toolcache.SQLiteCache(db_path=db_path, max_bytes=10**6)
+    cache.save_entry('a', list(range(1000)))
+    reopened = toolcache.SQLiteCache(db_path=db_path, max_bytes=10**6)
+    assert reopened.get_cache_bytes() == cache.get_cache_bytes() > 0
+
+
+def test_get_cache_bytes_requires_max_bytes():
+
+    cache = toolcache.MemoryCache()
+    with pytest.raises(Exception):
+        cache.get_cache_bytes()
+
+
+def test_estimate_size():
+
+    assert size_utils.estimate_size(b'x' * 1000) > 1000
+    assert size_utils.estimate_size(['x' * 1000] * 10) < 2000
+    assert size_utils.estimate_size(['x' * 1000 + str(i) for i in range(10)]) > (
+        10000
+    )
+    assert size_utils.estimate_size({'a': {'b': b'x' * 1000}}) > 1000
+
+    class Item:
+        def __init__(self, data):
+            self.data = data
+
+    class SlotItem:
+        __slots__ = ['data']
+
+        def __init__(self, data):
+            self.data = data
+
+    assert size_utils.estimate_size(Item(b'x' * 1000)) > 1000
+    assert size_utils.estimate_size(SlotItem(b'x' * 1000)) > 1000
+
+    # buffers are sized by their nbytes
+    view = memoryview(b'x' * 1000)
+    assert size_utils.estimate_size(view) >= 1000
+
+
+def test_estimate_size_numpy():
+
+    np = pytest.importorskip('numpy')
+    array = np.zeros(10000)
+    assert size_utils.estimate_size(array) >= 80000
+    assert size_utils.estimate_size(array[::2]) >= 40000
@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+import pytest
+
+import toolcache
+
+
+cachetypes = ['memory', 'disk', 'sqlite', 'log', 'tiered']
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_none_outputs_are_cached(cachetype):
+
+    calls = []
+
+    @toolcache.cache(cachetype)
+    def f(a):
+        calls.append(a)
+        return None
+
+    assert f(1) is None
+    assert f(1) is None
+    assert calls == [1]
+    assert f.cache.stats['n_hits'] == 1
+
+
+def test_none_outputs_are_cached_native():
+
+    calls = []
+
+    @toolcache.cache('memory', hash_mode='native')
+    def f(a):
+        calls.append(a)
+
+    f(1)
+    f(1)
+    assert calls == [1]
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_load_entry_missing_sentinel(cachetype):
+
+    cache = toolcache.get_cache_class(cachetype)()
+    cache.save_entry('a', None)
+    assert cache.load_entry('a', default=toolcache.MISSING) is None
+    assert cache.load_entry('b', default=toolcache.MISSING) is toolcache.MISSING
+    assert cache.load_entry('b') is None
+    assert not toolcache.MISSING
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_negative_ttl_none(cachetype):
+
+    calls = []
+
+    @toolcache.cache(cachetype, negative_ttl=0.1)
+    def f(a):
+        calls.append(a)
+        if a > 0:
+            return a
+
+    assert f(0) is None
+    assert f(0) is None
+    assert f(1) == 1
+    assert calls == [0, 1]
+
+    # None outputs expire, other outputs do not
+    time.sleep(0.15)
+    assert f(0) is None
+    assert f(1) == 1
+    assert calls == [0, 1, 0]
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_negative_ttl_exceptions(cachetype):
+
+    calls = []
+
+    @toolcache.cache(cachetype, negative_ttl=0.1, negative_exceptions=KeyError)
+    def f(a):
+        calls.append(a)
+        if a == 0:
+            raise KeyError(a)
+        else:
+            raise ValueError(a)
+
+    for i in range(3):
+        with pytest.raises(KeyError):
+            f(0)
+        with pytest.raises(ValueError):
+            f(1)
+    assert calls == [0, 1, 1, 1]
+
+    time.sleep(0.15)
+    with pytest.raises(KeyError):
+        f(0)
+    assert calls == [0, 1, 1, 1, 0]
+
+
+def test_exceptions_not_cached_by_default():
+
+    calls = []
+
+    @toolcache.cache('memory')
+    def f(a):
+        calls.append(a)
+        raise KeyError(a)
+
+    for i in range(2):
+        with pytest.raises(KeyError):
+            f(0)
+    assert calls == [0, 0]
+
+
+def test_negative_ttl_single_flight():
+
+    calls = []
+
+    @toolcache.cache('memory', negative_ttl=10, single_flight=True)
+    def f(a):
+        calls.append(a)
+        raise KeyError(a)
+
+    for i in range(2):
+        with pytest.raises(KeyError):
+            f(0)
+    assert calls == [0]
+
+
+def test_negative_ttl_async():
+
+    calls = []
+
+    @toolcache.cache('disk', negative_ttl=10)
+    async def f(a):
+        calls.append(a)
+        if a == 0:
+            raise KeyError(a)
+
+    async def main():
+        for i in range(2):
+            with pytest.raises(KeyError):
+                await f(0)
+            assert await f(1) is None
+
+    asyncio.run(main())
+    assert calls == [0, 1]
+
+
+def test_negative_ttl_batch():
+
+    calls = []
+
+    @toolcache.cache('memory', batch_arg='ids', negative_ttl=0.1)
+    def f(ids):
+        calls.append(list(ids))
+        return [None if i == 0 else i for i in ids]
+
+    assert f([0, 1]) == [None, 1]
+    assert f([0, 1]) == [None, 1]
+    time.sleep(0.15)
+    assert f([0, 1]) == [None, 1]
+    assert calls == [[0, 1], [0]]
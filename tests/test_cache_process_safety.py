@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import tempfile
+
+import toolcache
+from toolcache import lock_utils
+
+
+n_processes = 4
+n_keys = 10
+n_iterations = 100
+
+
+def _create_entry_data(key, version):
+    return {'key': key, 'version': version, 'payload': [key] * 20000}
+
+
+def _disk_cache_worker(cache_dir, worker, errors):
+    cache = toolcache.DiskCache(cache_dir=cache_dir, safety='process')
+    try:
+        for i in range(n_iterations):
+            key = 'key_' + str((i // 2 + worker) % n_keys)
+            if i % 2 == 0:
+                entry_data = _create_entry_data(key, version=worker)
+                cache.save_entry(key, entry_data)
+            elif cache.exists_in_cache(key):
+                entry_data = cache.load_entry(key)
+                expected = _create_entry_data(key, entry_data['version'])
+                if entry_data != expected:
+                    errors.put('inconsistent entry: ' + key)
+    except Exception as e:
+        errors.put(repr(e))
+
+
+def _file_lock_worker(lock_path, counter_path):
+    lock = lock_utils.FileLock(lock_path)
+    for i in range(n_iterations):
+        with lock:
+            with open(counter_path, 'r') as f:
+                count = int(f.read())
+            with open(counter_path, 'w') as f:
+                f.write(str(count + 1))
+
+
+def test_file_lock_across_processes():
+    tmpdir = tempfile.mkdtemp()
+    lock_path = os.path.join(tmpdir, 'counter.lock')
+    counter_path = os.path.join(tmpdir, 'counter')
+    with open(counter_path, 'w') as f:
+        f.write('0')
+
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(
+            target=_file_lock_worker, args=(lock_path, counter_path)
+        )
+        for p in range(n_processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    with open(counter_path, 'r') as f:
+        assert int(f.read()) == n_processes * n_iterations
+
+
+def test_disk_cache_multi_process_stress():
+    cache_dir = tempfile.mkdtemp()
+
+    context = multiprocessing.get_context('spawn')
+    errors = context.Queue()
+    processes = [
+        context.Process(
+            target=_disk_cache_worker, args=(cache_dir, worker, errors)
+        )
+        for worker in range(n_processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    found_errors = []
+    while not errors.empty():
+        found_errors.append(errors.get())
+    assert found_errors == []
+
+    # no temporary files should be left behind
+    cache = toolcache.DiskCache(cache_dir=cache_dir, safety='process')
+    assert cache.get_cache_size() == n_keys
+    leftover = [
+        filename for filename in os.listdir(cache_dir) if filename.endswith('.tmp')
+    ]
+    assert leftover == []
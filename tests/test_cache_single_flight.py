@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import toolcache
+
+
+def test_single_flight_threads():
+
+    n_threads = 8
+    barrier = threading.Barrier(n_threads)
+    n_calls = []
+
+    @toolcache.cache('memory', single_flight=True)
+    def f(a):
+        n_calls.append(a)
+        time.sleep(0.1)
+        return a * 2
+
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(f(5))
+
+    threads = [threading.Thread(target=worker) for t in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [10] * n_threads
+    assert n_calls == [5]
+    stats = f.cache.stats
+    assert stats['n_in_flight'] == 0
+    assert stats['n_saves'] == 1
+    assert stats['n_coalesced'] + stats['n_hits'] == n_threads - 1
+    assert stats['n_coalesced'] > 0
+
+
+def test_single_flight_distinct_entries():
+
+    n_calls = []
+
+    @toolcache.cache('memory', single_flight=True)
+    def f(a):
+        n_calls.append(a)
+        time.sleep(0.05)
+        return a
+
+    threads = [threading.Thread(target=f, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(n_calls) == [0, 1, 2, 3]
+    assert f.cache.stats['n_coalesced'] == 0
+
+
+def test_single_flight_exceptions_propagate():
+
+    n_threads = 4
+    barrier = threading.Barrier(n_threads)
+    n_calls = []
+
+    @toolcache.cache('memory', single_flight=True)
+    def f(a):
+        n_calls.append(a)
+        time.sleep(0.1)
+        raise ValueError(a)
+
+    errors = []
+
+    def worker():
+        barrier.wait()
+        try:
+            f(1)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for t in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == n_threads
+    assert len(n_calls) + f.cache.stats['n_coalesced'] == n_threads
+    assert f.cache.get_cache_size() == 0
+
+    # failed computations are not remembered
+    n_before = len(n_calls)
+    with pytest.raises(ValueError):
+        f(1)
+    assert len(n_calls) == n_before + 1
+
+
+def test_single_flight_disabled_by_default():
+
+    @toolcache.cache('memory')
+    def f(a):
+        return a
+
+    f(1)
+    assert not f.cache.single_flight
+    assert 'n_coalesced' not in f.cache.stats
+
+
+def test_single_flight_async():
+
+    n_calls = []
+
+    @toolcache.cache('memory', single_flight=True)
+    async def f(a):
+        n_calls.append(a)
+        await asyncio.sleep(0.05)
+        return a * 2
+
+    async def main():
+        return await asyncio.gather(*[f(3) for i in range(10)])
+
+    assert asyncio.run(main()) == [6] * 10
+    assert n_calls == [3]
+    assert f.cache.stats['n_coalesced'] == 9
+    assert f.cache.stats['n_in_flight'] == 0
+
+
+def test_single_flight_async_exceptions_propagate():
+
+    n_calls = []
+
+    @toolcache.cache('memory', single_flight=True)
+    async def f(a):
+        n_calls.append(a)
+        await asyncio.sleep(0.05)
+        raise ValueError(a)
+
+    async def main():
+        return await asyncio.gather(
+            *[f(3) for i in range(5)], return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert n_calls == [3]
+    assert f.cache._async_flights == {}
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+import pytest
+
+import toolcache
+
+
+cachetypes = ['memory', 'disk', 'sqlite', 'log', 'tiered']
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_cache_size_does_not_check_entries(cachetype, monkeypatch):
+
+    @toolcache.cache(cachetype, max_size=100)
+    def f(a):
+        return a
+
+    for i in range(10):
+        f(i)
+
+    def f_exists(entry_hash):
+        raise Exception('_exists() should not be called')
+
+    monkeypatch.setattr(f.cache, '_exists', f_exists)
+    assert f.cache.get_cache_size() == 10
+    assert len(f.cache.get_all_entry_hashes()) == 10
+
+
+def test_disk_cache_rescan():
+    cache_dir = tempfile.mkdtemp()
+
+    @toolcache.cache('disk', cache_dir=cache_dir, max_size=10)
+    def f(a):
+        return a
+
+    f(1)
+    f(2)
+    f(3)
+    assert f.cache.get_cache_size() == 3
+
+    # modify cache directory outside of cache instance
+    removed_hash = f.cache.compute_entry_hash(args=[1])
+    os.remove(f.cache._get_cache_path(removed_hash))
+
+    @toolcache.cache('disk', cache_dir=cache_dir)
+    def g(a):
+        return a
+
+    g(4)
+    assert f.cache.get_cache_size() == 3
+
+    assert f.cache.rescan() == 3
+    assert f.cache.get_cache_size() == 3
+    assert removed_hash not in f.cache.get_all_entry_hashes()
+    assert removed_hash not in f.cache.eviction_engine
+    assert len(f.cache.eviction_engine) == 3
@@ -0,0 +1,127 @@
+import os
+import tempfile
+
+import pytest
+
+import toolcache
+
+
+def test_persistence_of_sqlite_cache():
+    db_path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite')
+
+    @toolcache.cache('sqlite', db_path=db_path)
+    def f(a, b, c):
+        return (a, b, c)
+
+    f(1, 2, 3)
+    f(4, 5, 6)
+    assert f.cache.get_cache_size() == 2
+
+    @toolcache.cache('sqlite', db_path=db_path)
+    def f(a, b, c):
+        raise Exception('should load from cache')
+
+    assert f.cache.get_cache_size() == 2
+    assert f(1, 2, 3) == (1, 2, 3)
+
+
+def test_sqlite_journal_mode():
+    cache = toolcache.SQLiteCache()
+    cursor = cache._execute('PRAGMA journal_mode')
+    assert cursor.fetchone()[0] == 'wal'
+
+
+def test_sqlite_batch_writes():
+    cache = toolcache.SQLiteCache()
+    with cache.batch_writes():
+        for i in range(100):
+            cache.save_entry(str(i), i)
+    assert cache.get_cache_size() == 100
+    assert cache.load_entry('42') == 42
+
+    with pytest.raises(ValueError):
+        with cache.batch_writes():
+            cache.save_entry('new', 'data')
+            raise ValueError()
+    assert not cache.exists_in_cache('new')
+    assert cache.get_cache_size() == 100
+
+
+@pytest.mark.parametrize('max_size_policy', ['lru', 'fifo', 'lfu'])
+def test_sqlite_eviction_in_sql(max_size_policy):
+    cache = toolcache.SQLiteCache(
+        max_size=10, max_size_policy=max_size_policy
+    )
+    for i in range(30):
+        cache.save_entry(str(i), i)
+    assert cache.get_cache_size() == 10
+    assert cache.stats['n_size_evictions'] == 20
+
+    # shrinking is performed as a single sql query
+    cache.evict_to_size(4)
+    assert cache.get_cache_size() == 4
+    assert cache.rescan() == 4
+
+
+def test_sqlite_buffered_access_updates():
+    cache = toolcache.SQLiteCache(max_size=3)
+    for name in ['a', 'b', 'c']:
+        cache.save_entry(name, name)
+    cache.save_entry('a', 'a2')
+    assert cache.get_cache_size() == 3
+
+    # loads do not write to database until an eviction or flush
+    total_changes = cache._get_connection().total_changes
+    for i in range(3):
+        assert cache.load_entry('a') == 'a2'
+    assert cache.load_many(['b']) == {'b': 'b'}
+    assert cache._get_connection().total_changes == total_changes
+
+    # buffered accesses determine eviction order
+    cache.save_entry('d', 'd')
+    assert sorted(cache.get_all_entry_hashes()) == ['a', 'b', 'd']
+    cursor = cache._execute(
+        'SELECT access_count FROM entries WHERE entry_hash = ?', ('a',)
+    )
+    assert cursor.fetchone()[0] == 3
+
+
+def test_sqlite_metadata_is_not_tracked_in_memory():
+    cache = toolcache.SQLiteCache(
+        max_size=10, ttl=100, track_detailed_stats=True
+    )
+    cache.save_entry('a', 1)
+    cache.load_entry('a')
+    assert cache.entry_creation_times is None
+    assert cache.entry_access_times is None
+    assert cache.entry_access_counts is None
+    assert cache.get_entry_access_count('a') == 1
+    assert cache.get_all_entry_access_counts() == {'a': 1}
+    assert 0 <= cache.get_entry_age('a') < 100
+    access_time = cache.get_entry_access_time('a')
+    assert access_time >= cache.get_entry_creation_time('a')
+    with pytest.raises(KeyError):
+        cache.get_entry_creation_time('b')
+
+
+def test_sqlite_close_closes_connections_of_all_threads():
+    import sqlite3
+    import threading
+
+    cache = toolcache.SQLiteCache()
+    threads = [
+        threading.Thread(target=cache.save_entry, args=(str(i), i))
+        for i in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    connections = list(cache._all_connections)
+    assert len(connections) == 4
+    cache.close()
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute('SELECT 1')
+    assert cache.get_cache_size() == 3
+    assert cache.load_entry('1') == 1
@@ -5,7 +5,7 @@ import pytest
 import toolcache
 
 
-cachetypes = ['memory', 'disk']
+cachetypes = ['memory', 'disk', 'sqlite', 'log']
 
 
 @pytest.mark.parametrize('cachetype', cachetypes)
@@ -136,6 +136,19 @@ def test_ttl_eviction_statistics(cachetype):
     assert f.cache.stats['n_ttl_evictions'] == 1
 
 
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_ttl_evictions_are_deleted_once(cachetype):
+
+    cache = toolcache.get_cache_class(cachetype)(ttl=0.05)
+    cache.save_entry('a', 1)
+    cache.save_entry('b', 2)
+    time.sleep(0.1)
+    assert cache.load_entry('a') is None
+    assert not cache.exists_in_cache('b')
+    assert cache.stats['n_ttl_evictions'] == 2
+    assert cache.stats['n_deletes'] == 2
+
+
 @pytest.mark.parametrize('cachetype', cachetypes)
 def test_size_eviction_statistics(cachetype):
 
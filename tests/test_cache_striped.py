@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+import toolcache
+
+
+def _run_threads(target, n_threads=8):
+    threads = [
+        threading.Thread(target=target, args=(t,)) for t in range(n_threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_striped_stats_are_aggregated():
+
+    @toolcache.cache('memory', safety='striped', n_lock_stripes=4)
+    def f(a):
+        return a
+
+    def worker(t):
+        for i in range(200):
+            f(i % 50)
+
+    _run_threads(worker)
+
+    stats = f.cache.stats
+    assert f.cache.get_cache_size() == 50
+    assert stats['n_hashes'] == 8 * 200
+    assert stats['n_checks'] == 8 * 200
+    assert stats['n_hits'] + stats['n_misses'] == 8 * 200
+    assert stats['n_hits'] == stats['n_loads']
+    assert stats['n_saves'] == stats['n_misses']
+
+
+@pytest.mark.parametrize(
+    'cache_kwargs', [{'max_size': 20}, {'ttl': 0.001}, {'max_size': 5, 'ttl': 1}]
+)
+def test_striped_eviction(cache_kwargs):
+
+    @toolcache.cache('memory', safety='striped', **cache_kwargs)
+    def f(a):
+        return a
+
+    def worker(t):
+        for i in range(500):
+            assert f((i * (t + 1)) % 100) == (i * (t + 1)) % 100
+
+    _run_threads(worker)
+
+    max_size = cache_kwargs.get('max_size')
+    if max_size is not None:
+        assert f.cache.get_cache_size() <= max_size
+        assert len(f.cache.eviction_engine) == f.cache.get_cache_size()
+
+
+def test_striped_requires_support():
+    with pytest.raises(Exception):
+        toolcache.DiskCache(safety='striped')
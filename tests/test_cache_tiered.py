@@ -0,0 +1,194 @@
+import time
+
+import pytest
+
+import toolcache
+
+
+def test_tiered_decorator(tmp_path):
+
+    calls = []
+
+    @toolcache.cache(
+        'tiered',
+        l1_max_size=2,
+        l2_kwargs={'cache_dir': str(tmp_path)},
+        track_basic_stats=True,
+    )
+    def f(a):
+        calls.append(a)
+        return a * 2
+
+    for a in [1, 2, 3]:
+        assert f(a) == a * 2
+    assert f.cache.l1.get_cache_size() == 2
+    assert f.cache.l2.get_cache_size() == 3
+
+    # 1 was evicted from l1, so it is served from l2 and promoted
+    assert f(1) == 2
+    assert f(1) == 2
+    assert calls == [1, 2, 3]
+    assert f.cache.stats['n_l1_hits'] == 1
+    assert f.cache.stats['n_l2_hits'] == 1
+    assert f.cache.get_cache_size() == 3
+
+    # entries persist in l2 across instances
+    @toolcache.cache('tiered', l2_kwargs={'cache_dir': str(tmp_path)})
+    def f(a):
+        raise Exception('should load from l2')
+
+    assert f(3) == 6
+
+
+def test_tiered_no_promotion():
+
+    cache = toolcache.TieredCache(l1_max_size=1, promote=False)
+    cache.save_entry('a', 1)
+    cache.save_entry('b', 2)
+    assert cache.load_entry('a') == 1
+    assert not cache.l1.exists_in_cache('a')
+    assert cache.stats['n_l2_hits'] == 1
+
+
+def test_tiered_write_back():
+
+    cache = toolcache.TieredCache(l1_max_size=2, write_mode='back')
+    cache.save_entry('a', 1)
+    cache.save_entry('b', 2)
+    assert cache.l2.get_cache_size() == 0
+    assert cache.get_cache_size() == 2
+
+    # evicted entries are written to l2
+    cache.save_entry('c', 3)
+    assert cache.l2.get_all_entry_hashes() == ['a']
+    assert cache.load_entry('a') == 1
+
+    cache.flush()
+    assert sorted(cache.l2.get_all_entry_hashes()) == ['a', 'b', 'c']
+
+    # deleted entries are not written back
+    cache.save_entry('d', 4)
+    cache.delete_entry('d')
+    cache.flush()
+    assert not cache.l2.exists_in_cache('d')
+
+
+def test_tiered_batch():
+
+    cache = toolcache.TieredCache(l1_max_size=2)
+    cache.save_many({'a': 1, 'b': 2, 'c': 3})
+    assert cache.load_many(['a', 'b', 'c', 'd']) == {'a': 1, 'b': 2, 'c': 3}
+    assert cache.stats['n_l1_hits'] == 2
+    assert cache.stats['n_l2_hits'] == 1
+    cache.delete_many(['a', 'b'])
+    assert cache.get_all_entry_hashes() == ['c']
+    cache.delete_all_entries()
+    assert cache.get_cache_size() == 0
+    assert cache.l2.get_cache_size() == 0
+
+
+def test_tiered_custom_l2():
+
+    l2 = toolcache.SQLiteCache()
+    cache = toolcache.TieredCache(l2_cache=l2, l1_max_size=1)
+    cache.save_entry('a', 1)
+    assert l2.load_entry('a') == 1
+    with pytest.raises(Exception):
+        toolcache.TieredCache(l2_cache=l2, l2_kwargs={})
+    with pytest.raises(Exception):
+        toolcache.TieredCache(write_mode='sideways')
+
+
+def test_tiered_ttl(tmp_path):
+
+    cache = toolcache.TieredCache(
+        l1_max_size=1, ttl=0.1, l2_kwargs={'cache_dir': str(tmp_path)}
+    )
+    cache.save_entry('a', 1)
+    cache.save_entry('b', 2)
+    time.sleep(0.06)
+
+    # promoted entries keep their age
+    assert cache.load_entry('a') == 1
+    reopened = toolcache.TieredCache(
+        ttl=0.1, l2_kwargs={'cache_dir': str(tmp_path)}
+    )
+    assert reopened.load_entry('b') == 2
+    time.sleep(0.06)
+    assert cache.load_entry('a') is None
+    assert reopened.load_entry('b') is None
+    assert cache.stats['n_ttl_evictions'] == 1
+
+
+def test_tiered_max_size_counts_l2_entries(tmp_path):
+
+    cache = toolcache.TieredCache(l2_kwargs={'cache_dir': str(tmp_path)})
+    for i in range(5):
+        cache.save_entry(str(i), i)
+
+    reopened = toolcache.TieredCache(
+        max_size=3, l2_kwargs={'cache_dir': str(tmp_path)}
+    )
+    reopened.save_entry('5', 5)
+    assert reopened.get_cache_size() == 3
+    assert reopened.exists_in_cache('5')
+
+
+def test_tiered_size_does_not_list_l2(tmp_path, monkeypatch):
+
+    cache = toolcache.TieredCache(
+        l1_max_size=2, max_size=100, l2_kwargs={'cache_dir': str(tmp_path)}
+    )
+    cache.save_entry('a', 1)
+
+    def fail_listing():
+        raise Exception('should not list l2 entries')
+
+    monkeypatch.setattr(cache.l2, 'get_all_entry_hashes', fail_listing)
+    for i in range(50):
+        cache.save_entry(str(i), i)
+    assert cache.get_cache_size() == 51
+    cache.delete_entry('a')
+    assert cache.get_cache_size() == 50
+    assert sorted(cache.get_all_entry_hashes()) == sorted(
+        str(i) for i in range(50)
+    )
+
+    # entries deleted from l2 by other instances are dropped when missed
+    cache.l2.delete_entry('0')
+    assert not cache.exists_in_cache('0')
+    assert cache.get_cache_size() == 49
+
+
+def test_tiered_get_cache_class():
+
+    assert toolcache.get_cache_class('tiered') is toolcache.TieredCache
+
+
+def test_tiered_async_l1_hits_are_not_offloaded(tmp_path):
+    import asyncio
+
+    cache = toolcache.TieredCache(
+        l1_max_size=1, l2_kwargs={'cache_dir': str(tmp_path)}
+    )
+    cache.save_entry('a', 1)
+    cache.save_entry('b', 2)
+    offloaded = []
+    run_in_executor = cache._run_in_executor
+
+    def record_offload(f, *args, **kwargs):
+        offloaded.append(f.__name__)
+        return run_in_executor(f, *args, **kwargs)
+
+    cache._run_in_executor = record_offload
+
+    async def main():
+        assert await cache.async_load_entry('b') == 2
+        assert await cache.async_exists('b')
+        assert offloaded == []
+        assert await cache.async_load_entry('a') == 1
+        assert offloaded == ['load_entry']
+
+    asyncio.run(main())
+    assert cache.stats['n_l1_hits'] == 1
+    assert cache.stats['n_l2_hits'] == 1
@@ -0,0 +1,91 @@
+import tempfile
+
+import pytest
+
+import toolcache
+from toolcache.cachetypes.base_cache import eviction_engines
+
+
+def test_lru_engine():
+    engine = eviction_engines.LRUEvictionEngine()
+    for entry_hash in ['a', 'b', 'c']:
+        engine.add(entry_hash)
+    assert engine.get_eviction() == 'a'
+    engine.access('a')
+    assert engine.get_eviction() == 'b'
+    engine.discard('b')
+    assert engine.get_eviction() == 'c'
+    assert len(engine) == 2
+    engine.clear()
+    assert engine.get_eviction() is None
+
+
+def test_fifo_engine():
+    engine = eviction_engines.FIFOEvictionEngine()
+    for entry_hash in ['a', 'b', 'c']:
+        engine.add(entry_hash)
+    engine.access('a')
+    assert engine.get_eviction() == 'a'
+    engine.add('a')
+    assert engine.get_eviction() == 'b'
+
+
+def test_lfu_engine():
+    engine = eviction_engines.LFUEvictionEngine()
+    for entry_hash in ['a', 'b', 'c']:
+        engine.add(entry_hash)
+    engine.access('a')
+    engine.access('a')
+    engine.access('b')
+    assert engine.get_eviction() == 'c'
+    engine.discard('c')
+    assert engine.get_eviction() == 'b'
+    engine.discard('b')
+    assert engine.get_eviction() == 'a'
+    engine.discard('a')
+    assert engine.get_eviction() is None
+
+
+@pytest.mark.parametrize('max_size_policy', ['lru', 'fifo', 'lfu'])
+def test_large_cache_eviction(max_size_policy):
+
+    @toolcache.cache('memory', max_size=1000, max_size_policy=max_size_policy)
+    def f(a):
+        return a
+
+    for i in range(3000):
+        f(i)
+    assert f.cache.get_cache_size() == 1000
+    assert f.cache.stats['n_size_evictions'] == 2000
+    assert len(f.cache.eviction_engine) == 1000
+
+
+@pytest.mark.parametrize('max_size_policy', ['lru', 'fifo', 'lfu'])
+def test_disk_cache_reopen_with_max_size(max_size_policy):
+    cache_dir = tempfile.mkdtemp()
+
+    @toolcache.cache(
+        'disk',
+        cache_dir=cache_dir,
+        max_size=3,
+        max_size_policy=max_size_policy,
+    )
+    def f(a):
+        return a
+
+    f(1)
+    f(2)
+    f(3)
+
+    @toolcache.cache(
+        'disk',
+        cache_dir=cache_dir,
+        max_size=3,
+        max_size_policy=max_size_policy,
+    )
+    def f(a):
+        return a
+
+    assert len(f.cache.eviction_engine) == 3
+    f(4)
+    assert f.cache.get_cache_size() == 3
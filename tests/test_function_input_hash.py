@@ -0,0 +1,69 @@
+import inspect
+
+import pytest
+
+import toolcache
+from toolcache import hash_utils
+
+
+def f_plain(a, b, c=3):
+    pass
+
+
+def f_varargs(a, b=2, *args, d, e=5, **kwargs):
+    pass
+
+
+def f_kwonly(*, a, b=2):
+    pass
+
+
+calls = {
+    f_plain: [((1, 2), {}), ((1,), {'b': 2}), ((), {'a': 1, 'b': 2, 'c': 4})],
+    f_varargs: [
+        ((1,), {'d': 4}),
+        ((1, 2, 3, 4), {'d': 4, 'x': 6}),
+        ((), {'a': 1, 'd': 4, 'e': 6}),
+    ],
+    f_kwonly: [((), {'a': 1}), ((), {'a': 1, 'b': 3})],
+}
+
+subsets = [
+    {},
+    {'include_args': ['a']},
+    {'include_args': ['b', 'a']},
+    {'exclude_args': ['a']},
+    {'exclude_args': ['b', 'd']},
+]
+
+
+def _record_hash(*args, **kwargs):
+    return (args, sorted(kwargs.items()))
+
+
+@pytest.mark.parametrize('f', list(calls))
+@pytest.mark.parametrize('subset', subsets)
+def test_compiled_binder_matches_get_function_input_hash(f, subset):
+    argspec = inspect.getfullargspec(f)
+    hash_inputs = hash_utils.compile_function_input_hash(
+        f_hash=_record_hash, argspec=argspec, **subset
+    )
+    for args, kwargs in calls[f]:
+        expected = hash_utils.get_function_input_hash(
+            f_hash=_record_hash, argspec=argspec, args=args, kwargs=kwargs, **subset
+        )
+        assert hash_inputs(args, kwargs) == expected
+
+
+def test_normalized_decorator_uses_compiled_binder():
+
+    @toolcache.cache('memory', hash_include_args=['a', 'c'])
+    def f(a, b, c=3):
+        return a + b + c
+
+    assert f.cache._hash_function_inputs is not None
+    assert f(1, 2) == 6
+    assert f(a=1, b=5) == 6
+    assert f(1, 2, c=3) == 6
+    assert f(1, 2, 4) == 7
+    assert f.cache.stats['n_hits'] == 2
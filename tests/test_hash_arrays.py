@@ -0,0 +1,157 @@
+import subprocess
+import sys
+
+import pytest
+
+import toolcache
+from toolcache import hash_utils
+
+
+np = pytest.importorskip('numpy')
+
+hash_modes = ['json', 'json_digest', 'fast']
+
+
+def test_array_hash_depends_on_contents():
+    a = np.arange(1000, dtype=np.float64)
+    b = a.copy()
+    assert hash_utils.compute_array_hash(a) == hash_utils.compute_array_hash(b)
+    b[500] = -1
+    assert hash_utils.compute_array_hash(a) != hash_utils.compute_array_hash(b)
+
+
+def test_array_hash_depends_on_dtype_and_shape():
+    a = np.arange(12, dtype=np.int64)
+    hashes = {
+        hash_utils.compute_array_hash(a),
+        hash_utils.compute_array_hash(a.reshape(3, 4)),
+        hash_utils.compute_array_hash(a.reshape(4, 3)),
+        hash_utils.compute_array_hash(a.view(np.float64)),
+        hash_utils.compute_array_hash(a.astype(np.int32)),
+    }
+    assert len(hashes) == 5
+
+
+def test_non_contiguous_array_hash():
+    a = np.arange(100).reshape(10, 10)
+    view = a[::2, 1::3]
+    assert not view.flags.c_contiguous and not view.flags.f_contiguous
+    assert hash_utils.compute_array_hash(
+        view
+    ) == hash_utils.compute_array_hash(view.copy())
+    assert hash_utils.compute_array_hash(
+        a.T
+    ) == hash_utils.compute_array_hash(np.asfortranarray(a.T))
+
+
+def test_object_and_datetime_arrays():
+    a = np.array(['x', 1, None], dtype=object)
+    assert hash_utils.compute_array_hash(a) == hash_utils.compute_array_hash(
+        a.copy()
+    )
+    b = np.array(['2020-01-01', '2020-01-02'], dtype='datetime64[ns]')
+    assert hash_utils.compute_array_hash(b) == hash_utils.compute_array_hash(
+        b.copy()
+    )
+
+
+def test_approximate_array_hash():
+    a = np.zeros(10 ** 7, dtype=np.uint8)
+    exact = hash_utils.compute_array_hash(a)
+    approximate = hash_utils.compute_array_hash(a, approximate=True)
+    assert exact != approximate
+
+    # a change between sampled chunks is not detected
+    b = a.copy()
+    b[5000] = 1
+    assert hash_utils.compute_array_hash(b) != exact
+    assert hash_utils.compute_array_hash(b, approximate=True) == approximate
+
+    # a change within the first sampled chunk is detected
+    b[0] = 1
+    assert hash_utils.compute_array_hash(b, approximate=True) != approximate
+
+
+@pytest.mark.parametrize('hash_mode', hash_modes)
+def test_cache_array_arguments(hash_mode):
+
+    @toolcache.cache('memory', hash_mode=hash_mode)
+    def f(array, scale=1):
+        return float(array.sum()) * scale
+
+    a = np.arange(10)
+    assert f(a) == 45
+    assert f(a.copy()) == 45
+    assert f(a, scale=np.float64(2)) == 90
+    assert f(a + 1) == 55
+    assert f.cache.stats['n_hits'] == 1
+    assert f.cache.get_cache_size() == 3
+
+
+def test_array_hash_is_stable_across_processes():
+    code = (
+        'import numpy as np\n'
+        'from toolcache import hash_utils\n'
+        'a = np.array([[1.5, 2.5], [3.5, 4.5]])\n'
+        'print(hash_utils.compute_hash_json_digest(a, x=[a.T, a[:, 0]]))\n'
+        'print(hash_utils.compute_hash_fast(a, x=[a.T, a[:, 0]]))\n'
+    )
+    outputs = {
+        subprocess.check_output(
+            [sys.executable, '-c', code], env={'PYTHONHASHSEED': str(seed)}
+        )
+        for seed in range(3)
+    }
+    assert len(outputs) == 1
+
+
+def test_dataframe_hash():
+    pd = pytest.importorskip('pandas')
+
+    df = pd.DataFrame(
+        {'a': [1, 2, 3], 'b': ['x', 'y', 'z'], 'c': [1.5, 2.5, None]}
+    )
+    df_hash = hash_utils.compute_dataframe_hash(df)
+    assert hash_utils.compute_dataframe_hash(df.copy()) == df_hash
+    assert hash_utils.compute_dataframe_hash(df.iloc[::-1]) != df_hash
+    assert hash_utils.compute_dataframe_hash(
+        df.set_axis([3, 4, 5], axis=0)
+    ) != df_hash
+    assert hash_utils.compute_dataframe_hash(
+        df.rename(columns={'a': 'd'})
+    ) != df_hash
+    modified = df.copy()
+    modified.loc[1, 'b'] = 'w'
+    assert hash_utils.compute_dataframe_hash(modified) != df_hash
+
+    series_hash = hash_utils.compute_series_hash(df['b'])
+    assert hash_utils.compute_series_hash(df['b'].copy()) == series_hash
+    assert hash_utils.compute_series_hash(df['b'].rename('e')) != series_hash
+
+    @toolcache.cache('disk')
+    def f(df):
+        return len(df)
+
+    assert f(df) == 3
+    assert f(df.copy()) == 3
+    assert f.cache.stats['n_hits'] == 1
+
+
+@pytest.mark.parametrize('hash_mode', ['json_digest', 'fast'])
+def test_pandas_arguments_are_hashed(hash_mode):
+    pd = pytest.importorskip('pandas')
+
+    @toolcache.cache('memory', hash_mode=hash_mode)
+    def f(value):
+        return len(value)
+
+    for value in [
+        pd.Series([1, 2, 3]),
+        pd.Index(['a', 'b']),
+        pd.RangeIndex(4),
+        pd.DataFrame({'a': [1]}),
+    ]:
+        assert f(value) == len(value)
+        assert f(value.copy()) == len(value)
+    assert f.cache.stats['n_hits'] == 4
+    assert f.cache.stats['n_misses'] == 4
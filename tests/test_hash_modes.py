@@ -0,0 +1,236 @@
+import subprocess
+import sys
+
+import pytest
+
+import toolcache
+from toolcache import hash_utils
+
+
+cachetypes = ['memory', 'disk', 'sqlite', 'log', 'tiered']
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_fast_hash_mode(cachetype):
+
+    @toolcache.cache(cachetype, hash_mode='fast')
+    def f(a, b=None):
+        return [a, b]
+
+    assert f(1) == [1, None]
+    assert f(1) == [1, None]
+    assert f(1, b={'x': 1}) == [1, {'x': 1}]
+    assert f.cache.get_cache_size() == 2
+    assert f.cache.stats['n_hits'] == 1
+
+
+def test_fast_hash_distinguishes_types():
+    values = [
+        1,
+        1.0,
+        '1',
+        b'1',
+        True,
+        None,
+        [1],
+        (1,),
+        {1},
+        {1: None},
+        ['a', 'b'],
+        ['ab'],
+        [[1], 2],
+        [1, [2]],
+    ]
+    hashes = [hash_utils.compute_hash_fast(value) for value in values]
+    assert len(set(hashes)) == len(values)
+    assert hash_utils.compute_hash_fast(1, 2) != hash_utils.compute_hash_fast(
+        1, b=2
+    )
+
+
+def test_fast_hash_is_order_independent_for_mappings():
+    assert hash_utils.compute_hash_fast(
+        {'a': 1, 2: 'b'}, x=1, y=2
+    ) == hash_utils.compute_hash_fast({2: 'b', 'a': 1}, y=2, x=1)
+    assert hash_utils.compute_hash_fast(
+        {'a', 'b', 'c'}
+    ) == hash_utils.compute_hash_fast({'c', 'b', 'a'})
+
+
+def test_fast_hash_is_stable_across_processes():
+    code = (
+        'from toolcache import hash_utils;'
+        'print(hash_utils.compute_hash_fast("a", {"b", "c"}, d=[1.5, None]))'
+    )
+    outputs = {
+        subprocess.check_output(
+            [sys.executable, '-c', code],
+            env={'PYTHONHASHSEED': str(seed)},
+        )
+        for seed in range(3)
+    }
+    assert len(outputs) == 1
+
+
+hash_modes = ['json', 'json_digest', 'fast']
+
+stable_values_code = '''
+import collections
+import dataclasses
+import datetime
+import decimal
+import enum
+import pathlib
+
+import toolcache
+from toolcache import hash_utils
+
+
+class Color(enum.Enum):
+    RED = 'red'
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: tuple
+
+
+Pair = collections.namedtuple('Pair', ['a', 'b'])
+
+
+class Custom:
+    def __init__(self, key):
+        self.key = key
+
+    def __toolcache_hash__(self):
+        return {'key': self.key}
+
+
+values = [
+    ('a', b'b', ('c', 'd')),
+    {'e', 'f', ('g', 'h')},
+    frozenset([b'i', 'j']),
+    [{'k', 'l'}, datetime.datetime(2020, 1, 2, 3, 4, 5)],
+    datetime.date(2020, 1, 2),
+    datetime.timedelta(seconds=5),
+    decimal.Decimal('1.50'),
+    Color.RED,
+    Point(1, ('m', 'n')),
+    Pair('o', {'p'}),
+    pathlib.PurePosixPath('/q/r'),
+    Custom('s'),
+]
+for value in values:
+    for name in ['json', 'json_digest', 'fast']:
+        f_hash = getattr(hash_utils, 'compute_hash_' + name)
+        print(f_hash(value), f_hash(x=[value]))
+'''
+
+
+def test_canonical_hashes_are_stable_across_processes():
+    outputs = {
+        subprocess.check_output(
+            [sys.executable, '-c', stable_values_code],
+            env={'PYTHONHASHSEED': str(seed)},
+        )
+        for seed in range(4)
+    }
+    assert len(outputs) == 1
+
+
+@pytest.mark.parametrize('hash_mode', hash_modes)
+def test_canonical_hashes_distinguish_values(hash_mode):
+    import datetime
+    import decimal
+    import pathlib
+
+    f_hash = getattr(hash_utils, 'compute_hash_' + hash_mode)
+    values = [
+        (1, 2),
+        (2, 1),
+        {1, 2},
+        {1, 3},
+        b'ab',
+        b'ba',
+        datetime.datetime(2020, 1, 1),
+        datetime.datetime(2020, 1, 2),
+        decimal.Decimal('1.5'),
+        decimal.Decimal('2.5'),
+        pathlib.PurePosixPath('/a'),
+        pathlib.PurePosixPath('/b'),
+    ]
+    hashes = [f_hash(value) for value in values]
+    assert len(set(hashes)) == len(values)
+    assert f_hash({1, 2}) == f_hash({2, 1})
+    assert f_hash(decimal.Decimal('1.50')) == f_hash(decimal.Decimal('1.5'))
+
+
+@pytest.mark.parametrize('hash_mode', hash_modes)
+def test_nested_values_are_canonicalized(hash_mode):
+    import enum
+
+    class Color(enum.IntEnum):
+        RED = 1
+
+    f_hash = getattr(hash_utils, 'compute_hash_' + hash_mode)
+    values = [
+        [(1, 2)],
+        [[1, 2]],
+        {'a': (1, 2)},
+        {'a': [1, 2]},
+        [Color.RED],
+        [1],
+        {'a': {'b': (1,)}},
+        {'a': {'b': [1]}},
+    ]
+    hashes = [f_hash(value) for value in values]
+    assert len(set(hashes)) == len(values)
+    assert f_hash([(1, 2)]) == f_hash([(1, 2)])
+    assert f_hash(x=[{1, 2}]) == f_hash(x=[{2, 1}])
+
+
+@pytest.mark.parametrize('hash_mode', hash_modes)
+def test_dataclasses_of_different_types_differ(hash_mode):
+    import dataclasses
+
+    @dataclasses.dataclass
+    class A:
+        x: int
+
+    @dataclasses.dataclass
+    class B:
+        x: int
+
+    f_hash = getattr(hash_utils, 'compute_hash_' + hash_mode)
+    assert f_hash(A(1)) == f_hash(A(1))
+    assert f_hash(A(1)) != f_hash(A(2))
+    assert f_hash(A(1)) != f_hash(B(1))
+
+
+@pytest.mark.parametrize('hash_mode', hash_modes)
+def test_register_hash_function(hash_mode):
+
+    class Unhashable:
+        __hash__ = None
+
+        def __init__(self, key):
+            self.key = key
+
+    toolcache.register_hash_function(Unhashable, lambda value: value.key)
+
+    class Subclass(Unhashable):
+        pass
+
+    f_hash = getattr(hash_utils, 'compute_hash_' + hash_mode)
+    assert f_hash(Unhashable(1)) == f_hash(Unhashable(1))
+    assert f_hash(Unhashable(1)) != f_hash(Unhashable(2))
+    assert f_hash(Subclass(1)) != f_hash(Unhashable(1))
+
+    @toolcache.cache('memory', hash_mode=hash_mode)
+    def f(value):
+        return value.key
+
+    assert f(Unhashable(3)) == 3
+    assert f(Unhashable(3)) == 3
+    assert f.cache.stats['n_hits'] == 1
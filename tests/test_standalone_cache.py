@@ -3,7 +3,7 @@ import pytest
 import toolcache
 
 
-cachetypes = [toolcache.MemoryCache, toolcache.DiskCache]
+cachetypes = [toolcache.MemoryCache, toolcache.DiskCache, toolcache.SQLiteCache, toolcache.LogCache]
 
 
 @pytest.mark.parametrize('Cachetype', cachetypes)
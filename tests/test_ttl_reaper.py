@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+
+import toolcache
+
+
+cachetypes = ['memory', 'disk', 'sqlite', 'log', 'tiered']
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_evict_expired(cachetype):
+
+    @toolcache.cache(cachetype, ttl=0.2)
+    def f(a):
+        return a
+
+    for i in range(10):
+        f(i)
+    time.sleep(0.1)
+
+    # re-saving an entry should reset its deadline
+    f.cache.save_entry(f.cache.compute_entry_hash(args=[0]), 0)
+    time.sleep(0.15)
+
+    assert f.cache.evict_expired(max_evictions=4) == 4
+    assert f.cache.evict_expired() == 5
+    assert f.cache.stats['n_ttl_evictions'] == 9
+    assert f.cache.get_cache_size() == 1
+    time.sleep(0.1)
+    assert f.cache.get_cache_size() == 0
+    assert f.cache.stats['n_ttl_evictions'] == 10
+
+
+@pytest.mark.parametrize('cachetype', cachetypes)
+def test_ttl_reaper_thread(cachetype):
+
+    @toolcache.cache(
+        cachetype,
+        ttl=0.1,
+        ttl_reaper_interval=0.05,
+        ttl_reaper_batch_size=7,
+    )
+    def f(a):
+        return a
+
+    for i in range(50):
+        f(i)
+    assert f.cache._get_size() == 50
+    time.sleep(0.4)
+    assert f.cache._get_size() == 0
+    assert f.cache.stats['n_ttl_evictions'] == 50
+    f.cache.stop_ttl_reaper()
+    assert f.cache._ttl_reaper is None
+
+
+def test_ttl_reaper_async():
+
+    cache = toolcache.MemoryCache(ttl=0.1)
+
+    async def run():
+        task = asyncio.create_task(
+            cache.run_ttl_reaper_async(interval=0.05, batch_size=3)
+        )
+        for i in range(10):
+            cache.save_entry(i, i)
+        await asyncio.sleep(0.3)
+        task.cancel()
+
+    asyncio.run(run())
+    assert cache._get_size() == 0
+    assert cache.stats['n_ttl_evictions'] == 10
@@ -3,10 +3,16 @@
 from .cachetypes import (
     BaseCache,
     DiskCache,
+    LogCache,
     MemoryCache,
+    SQLiteCache,
+    TieredCache,
     get_cache_class,
+    MISSING,
 )
 from .cache_decorator import cache
+from .hash_utils import register_hash_function
+from .serialize_utils import register_serializer
 
 
 __version__ = '0.5.0'
@@ -14,7 +20,13 @@ __version__ = '0.5.0'
 __all__ = (
     'BaseCache',
     'DiskCache',
+    'LogCache',
     'MemoryCache',
+    'SQLiteCache',
+    'TieredCache',
     'get_cache_class',
+    'MISSING',
     'cache',
+    'register_hash_function',
+    'register_serializer',
 )
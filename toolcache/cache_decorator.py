@@ -14,10 +14,14 @@ if typing.TYPE_CHECKING:
 
 from . import cachetypes
 from . import spec
+from .cachetypes import MISSING
 
 
 def cache(
-    cachetype: spec.CachetypeSpec, add_cache_args: bool = True, **cache_kwargs
+    cachetype: spec.CachetypeSpec,
+    add_cache_args: bool = True,
+    batch_arg: typing.Optional[str] = None,
+    **cache_kwargs
 ) -> typing.Callable[[typing.Callable[P, R]], typing.Callable[P, R]]:
     """decorate function to add a cache
 
@@ -34,17 +38,29 @@ def cache(
     - cachetype: type of config to use, one of the following options
         - 'memory': cache stored in memory within a dict
         - 'disk': cache stored to disk in pickle object
+        - 'sqlite': cache stored in a single sqlite database file
+        - 'log': cache appended to memory-mapped log segment files
         - BaseCase instance: pass in an instance of a subclass of BaseCache
     - add_cache_kwargs: bool of whether to add args to function (see above)
+    - batch_arg: str name of arg that is a list of elements, the function
+      should return a list with one output per element, each element is
+      cached as its own entry and the function is only called on the
+      elements that are missing from the cache
 
     #### Miscellaneous Options
-    - safety: one of ['thread', 'process', None] for concurrency safety
+    - safety: one of ['thread', 'process', 'striped', None] for concurrency
+      safety, 'striped' uses a separate lock for each group of entries
+    - n_lock_stripes: int number of locks used if safety is 'striped'
     - verbose: bool of whether to be verbose
     - cache_name: str name of cache, used in verbose reporting statements
     - old_f: function being decorated by cache, None for standalone cache
+    - single_flight: bool of whether concurrent calls that miss on the same
+      entry should wait for a single computation of that entry
+    - async_executor: Executor used for blocking cache io of async functions
 
     #### Hash Options
-    - hash_mode: str of hash mode, either 'json' or 'json_digest'
+    - hash_mode: str of hash mode, one of 'json', 'json_digest', 'fast', or
+      'native', 'native' is only supported by MemoryCache
     - f_hash: function for computing hash
         - should take same args as decorated function
     - normalize_hash_inputs: bool of whether to normalize function args
@@ -57,8 +73,16 @@ def cache(
 
     #### Eviction Options
     - ttl: Timelength of maximum age of entries in cache
+    - negative_ttl: Timelength for which None outputs and exceptions are
+      cached, None to cache None outputs normally and not cache exceptions
+    - negative_exceptions: tuple of exception types cached by negative_ttl
     - max_size: int count of maximum number of entries in cache
     - max_size_policy: one of ['lru', 'fifo', 'lfu', None]
+    - max_bytes: int maximum total weight in bytes of entries in cache
+    - f_weigh: function that takes entry data and returns its weight in bytes
+    - ttl_reaper_interval: Timelength between passes of a background
+      thread that removes expired entries, None to only remove lazily
+    - ttl_reaper_batch_size: int max entries removed per reaper lock hold
 
     #### Statistic Tracking Options
     - track_basic_stats: bool of whether to track basic usage stats
@@ -70,6 +94,23 @@ def cache(
     #### DiskCache Options
     - cache_dir: str of path to store cache data, tmpdir if None
     - file_format: str of file format of output on disk (e.g. json)
+    - compression: str of compression of entries, 'zstd', 'lz4', or 'zlib'
+    - compression_threshold: int minimum size in bytes of compressed entries
+    - memory_map: bool of whether to load array buffers as views of mmaps
+    - shard_levels: int number of nested subdirectories to spread entries
+    - shard_width: int number of hash characters in each subdirectory name
+
+    #### SQLiteCache Options
+    - db_path: str of path of sqlite database file, tmpdir if None
+    - table_name: str name of table used to store entries
+    - journal_mode: str sqlite journal mode, default 'wal'
+
+    #### LogCache Options
+    - cache_dir: str of path to store segment files, tmpdir if None
+    - segment_size: int bytes after which a new segment file is started
+    - zero_copy: bool of whether to return bytes and pickle buffers as views,
+      default False
+    - compaction_threshold: float fraction of dead bytes triggering compaction
 
     ## Returns
     - decorated function that uses cache for saving and loading function outputs
@@ -86,6 +127,7 @@ def cache(
             old_f=f,
             cache_instance=cache_instance,
             add_cache_args=add_cache_args,
+            batch_arg=batch_arg,
         )
 
         return new_f
@@ -94,7 +136,10 @@ def cache(
 
 
 def _create_new_f(
-    old_f: typing.Callable[P, R], cache_instance, add_cache_args
+    old_f: typing.Callable[P, R],
+    cache_instance,
+    add_cache_args,
+    batch_arg=None,
 ) -> typing.Callable[P, R]:
     """create new function by decorating old_f to use cache_instance
 
@@ -102,62 +147,218 @@ def _create_new_f(
     - old_f: function to be decorated
     - cache_instance: BaseCache instance for function to use
     - add_cache_args: bool of whether to add cache control args to function
+    - batch_arg: str name of arg whose elements are cached individually
     """
 
+    is_coroutine = _iscoroutinefunction(old_f)
+
     if add_cache_args:
+        _check_cache_args(old_f)
+
+    if batch_arg is not None:
+        new_f = _create_batch_f(
+            old_f=old_f,
+            cache_instance=cache_instance,
+            add_cache_args=add_cache_args,
+            batch_arg=batch_arg,
+        )
+        new_f.cache = cache_instance  # type: ignore
+        return new_f
 
-        # ensure not overwriting args
-        import inspect
-
-        argspec = inspect.getfullargspec(old_f)
-        arg_names: list[str] = argspec.args + argspec.kwonlyargs
-        if argspec.varargs is not None:
-            arg_names.append(argspec.varargs)
-        if argspec.varkw is not None:
-            arg_names.append(argspec.varkw)
-
-        cache_args = ['cache_load', 'cache_save', 'cache_verbose']
-        for cache_arg in cache_args:
-            if cache_arg in arg_names:
-                raise Exception(
-                    'function already has arg '
-                    + str(cache_arg)
-                    + ', use add_cache_args=False'
+    if add_cache_args:
+
+        if is_coroutine:
+
+            @functools.wraps(old_f)
+            async def new_f(  # type: ignore
+                *args,
+                cache_load: bool = True,
+                cache_save: bool = True,
+                cache_verbose: typing.Optional[bool] = None,
+                **kwargs
+            ):
+                return await async_execute_with_cache(
+                    old_f=old_f,
+                    cache_instance=cache_instance,
+                    args=args,
+                    kwargs=kwargs,
                 )
 
-        @functools.wraps(old_f)
-        def new_f(
-            *args,
-            cache_load: bool = True,
-            cache_save: bool = True,
-            cache_verbose: typing.Optional[bool] = None,
-            **kwargs
-        ) -> R:
-            return execute_with_cache(
+        else:
+
+            @functools.wraps(old_f)
+            def new_f(
+                *args,
+                cache_load: bool = True,
+                cache_save: bool = True,
+                cache_verbose: typing.Optional[bool] = None,
+                **kwargs
+            ) -> R:
+                return execute_with_cache(
+                    old_f=old_f,
+                    cache_instance=cache_instance,
+                    args=args,
+                    kwargs=kwargs,
+                    # cache_load=cache_load,
+                    # cache_save=cache_save,
+                    # cache_verbose=cache_verbose,
+                )
+
+    else:
+
+        if is_coroutine:
+
+            @functools.wraps(old_f)
+            async def new_f(*args, **kwargs):  # type: ignore
+                return await async_execute_with_cache(
+                    old_f=old_f,
+                    cache_instance=cache_instance,
+                    args=args,
+                    kwargs=kwargs,
+                    cache_load=True,
+                    cache_save=True,
+                    cache_verbose=None,
+                )
+
+        else:
+
+            @functools.wraps(old_f)
+            def new_f(*args, **kwargs):
+                return execute_with_cache(
+                    old_f=old_f,
+                    cache_instance=cache_instance,
+                    args=args,
+                    kwargs=kwargs,
+                    cache_load=True,
+                    cache_save=True,
+                    cache_verbose=None,
+                )
+
+    # serve hits directly from entries dict if cache allows it
+    if not is_coroutine:
+        entries = cache_instance._get_fast_hit_entries()
+        if entries is not None:
+            new_f = _create_fast_hit_f(
                 old_f=old_f,
+                slow_f=new_f,
                 cache_instance=cache_instance,
-                args=args,
-                kwargs=kwargs,
-                # cache_load=cache_load,
-                # cache_save=cache_save,
-                # cache_verbose=cache_verbose,
+                entries=entries,
+                add_cache_args=add_cache_args,
             )
 
+    new_f.cache = cache_instance  # type: ignore
+
+    return new_f
+
+
+def _check_cache_args(old_f):
+    """ensure that adding cache args will not overwrite args of old_f"""
+    import inspect
+
+    argspec = inspect.getfullargspec(old_f)
+    arg_names: list[str] = argspec.args + argspec.kwonlyargs
+    if argspec.varargs is not None:
+        arg_names.append(argspec.varargs)
+    if argspec.varkw is not None:
+        arg_names.append(argspec.varkw)
+
+    cache_args = ['cache_load', 'cache_save', 'cache_verbose']
+    for cache_arg in cache_args:
+        if cache_arg in arg_names:
+            raise Exception(
+                'function already has arg '
+                + str(cache_arg)
+                + ', use add_cache_args=False'
+            )
+
+
+def _create_fast_hit_f(old_f, slow_f, cache_instance, entries, add_cache_args):
+    """create function that serves hits with a single probe of entries
+
+    configuration is resolved once here instead of during every call, misses
+    and calls that use cache args are delegated to slow_f
+
+    ## Inputs
+    - old_f: function to be decorated
+    - slow_f: decorated function that uses execute_with_cache()
+    - cache_instance: BaseCache instance for function to use
+    - entries: dict of entries as returned by _get_fast_hit_entries()
+    - add_cache_args: bool of whether function has cache control args
+    """
+    from . import hash_utils
+
+    # resolve how keys are computed
+    f_hash = cache_instance.f_hash
+    hash_function_inputs = cache_instance._hash_function_inputs
+    if cache_instance.normalize_hash_inputs:
+        if hash_function_inputs is None:
+            return slow_f
+        compute_key = hash_function_inputs
+    else:
+
+        def compute_key(args, kwargs):
+            return f_hash(*args, **kwargs)
+
+    args_are_key = (
+        f_hash is hash_utils.compute_hash_native
+        and not cache_instance.normalize_hash_inputs
+    )
+    # resolve stats tracking
+    count = None
+    if cache_instance._stats is not None:
+        count = cache_instance._get_fast_hit_counter().increment
+
+    if add_cache_args:
+        cache_args = frozenset(['cache_load', 'cache_save', 'cache_verbose'])
     else:
+        cache_args = frozenset()
+    get = entries.get
+
+    if args_are_key:
+
+        # same keys as hash_utils.compute_hash_native(), computed inline
+        kwargs_mark = hash_utils._kwargs_mark
 
         @functools.wraps(old_f)
         def new_f(*args, **kwargs):
-            return execute_with_cache(
-                old_f=old_f,
-                cache_instance=cache_instance,
-                args=args,
-                kwargs=kwargs,
-                cache_load=True,
-                cache_save=True,
-                cache_verbose=None,
-            )
+            if kwargs:
+                if not cache_args.isdisjoint(kwargs):
+                    return slow_f(*args, **kwargs)
+                key = args + (kwargs_mark,) + tuple(sorted(kwargs.items()))
+            else:
+                key = args
 
-    new_f.cache = cache_instance  # type: ignore
+            # unhashable args are handled by slow_f, as are misses
+            try:
+                value = get(key, MISSING)
+            except TypeError:
+                return slow_f(*args, **kwargs)
+            if value is MISSING:
+                return slow_f(*args, **kwargs)
+
+            if count is not None:
+                count()
+            return value
+
+    else:
+
+        @functools.wraps(old_f)
+        def new_f(*args, **kwargs):
+            if kwargs and not cache_args.isdisjoint(kwargs):
+                return slow_f(*args, **kwargs)
+            key = compute_key(args, kwargs)
+
+            # unhashable keys are handled by slow_f, as are misses
+            try:
+                value = get(key, MISSING)
+            except TypeError:
+                return slow_f(*args, **kwargs)
+            if value is MISSING:
+                return slow_f(*args, **kwargs)
+
+            if count is not None:
+                count()
+            return value
 
     return new_f
 
@@ -173,7 +374,8 @@ def execute_with_cache(
 ):
     """execute old_f with specified inputs and use cache if appropriate
 
-    TODO: might be worth it to create a totally separate decorator for async
+    if old_f is a coroutine function, a coroutine is returned that executes
+    old_f using async_execute_with_cache()
 
     ## Inputs
     - old_f: function to call
@@ -184,7 +386,16 @@ def execute_with_cache(
     - cache_save: bool of whether to save output to cache
     - cache_verbose: bool of whether to print cache operation info
     """
-    is_coroutine = _iscoroutinefunction(old_f)
+    if _iscoroutinefunction(old_f):
+        return async_execute_with_cache(
+            old_f=old_f,
+            args=args,
+            kwargs=kwargs,
+            cache_instance=cache_instance,
+            cache_load=cache_load,
+            cache_save=cache_save,
+            cache_verbose=cache_verbose,
+        )
 
     # set verbosity
     if cache_verbose is None:
@@ -195,67 +406,615 @@ def execute_with_cache(
         entry_hash = cache_instance.compute_entry_hash(args=args, kwargs=kwargs)
 
     # attempt to load from cache
-    loaded_from_cache = None
+    loaded_from_cache = MISSING
     if cache_load:
         loaded_from_cache = cache_instance.load_entry(
             entry_hash=entry_hash,
             verbose=cache_verbose,
             must_exist=False,
+            default=MISSING,
         )
+        if loaded_from_cache is not MISSING:
+            loaded_from_cache = _unwrap_negative_entry(loaded_from_cache)
 
     # retrieve output
-    if loaded_from_cache is not None:
+    if loaded_from_cache is not MISSING:
 
         # use output from cache
-        if is_coroutine:
+        output = loaded_from_cache
+
+    elif cache_save and cache_instance.single_flight:
+
+        output = _execute_single_flight(
+            old_f=old_f,
+            args=args,
+            kwargs=kwargs,
+            entry_hash=entry_hash,
+            cache_instance=cache_instance,
+            cache_verbose=cache_verbose,
+        )
+
+    else:
+
+        # compute output
+        try:
+            output = old_f(*args, **kwargs)
+        except cache_instance.negative_exceptions as e:
+            if cache_save:
+                _save_exception(cache_instance, entry_hash, e, cache_verbose)
+            raise
+
+        # save to cache
+        if cache_save:
+            cache_instance.save_entry(
+                entry_hash,
+                _wrap_output(cache_instance, output),
+                verbose=cache_verbose,
+            )
+
+    return output
+
+
+async def async_execute_with_cache(
+    old_f,
+    args,
+    kwargs,
+    cache_instance,
+    cache_load=True,
+    cache_save=True,
+    cache_verbose=None,
+):
+    """await coroutine function old_f with specified inputs and use cache
+
+    caches that perform blocking io run their loads and saves in an executor
+    so that the event loop is not blocked, see BaseCache.async_load_entry()
+
+    ## Inputs
+    - same as execute_with_cache()
+    """
+
+    # set verbosity
+    if cache_verbose is None:
+        cache_verbose = cache_instance.verbose
 
-            async def async_get_from_cache():
-                return loaded_from_cache
+    # compute entry_hash
+    if cache_load or cache_save:
+        entry_hash = cache_instance.compute_entry_hash(args=args, kwargs=kwargs)
 
-            output = async_get_from_cache()
+    # attempt to load from cache, in-memory caches are loaded directly
+    if cache_load:
+        if cache_instance._async_offload:
+            loaded_from_cache = await cache_instance.async_load_entry(
+                entry_hash=entry_hash,
+                verbose=cache_verbose,
+                must_exist=False,
+                default=MISSING,
+            )
         else:
-            output = loaded_from_cache
+            loaded_from_cache = cache_instance.load_entry(
+                entry_hash=entry_hash,
+                verbose=cache_verbose,
+                must_exist=False,
+                default=MISSING,
+            )
+        if loaded_from_cache is not MISSING:
+            loaded_from_cache = _unwrap_negative_entry(loaded_from_cache)
+        if loaded_from_cache is not MISSING:
+            return loaded_from_cache
+
+    if cache_save and cache_instance.single_flight:
+        return await _async_execute_single_flight(
+            old_f=old_f,
+            args=args,
+            kwargs=kwargs,
+            entry_hash=entry_hash,
+            cache_instance=cache_instance,
+            cache_verbose=cache_verbose,
+        )
+
+    # await result
+    try:
+        output = await old_f(*args, **kwargs)
+    except cache_instance.negative_exceptions as e:
+        if cache_save:
+            await _async_save_exception(
+                cache_instance, entry_hash, e, cache_verbose
+            )
+        raise
+
+    # save to cache
+    if cache_save:
+        await cache_instance.async_save_entry(
+            entry_hash,
+            _wrap_output(cache_instance, output),
+            verbose=cache_verbose,
+        )
+
+    return output
+
+
+#
+# # batch execution
+#
+
 
+def _create_batch_f(old_f, cache_instance, add_cache_args, batch_arg):
+    """create function that caches each element of batch_arg individually
+
+    ## Inputs
+    - old_f: function to be decorated, should return one output per element
+    - cache_instance: BaseCache instance for function to use
+    - add_cache_args: bool of whether to add cache control args to function
+    - batch_arg: str name of arg whose elements are cached individually
+    """
+    import inspect
+
+    signature = inspect.signature(old_f)
+    parameter = signature.parameters.get(batch_arg)
+    if parameter is None:
+        raise Exception('function does not have arg ' + str(batch_arg))
+    if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+        raise Exception('batch_arg cannot be a variadic arg')
+
+    if _iscoroutinefunction(old_f):
+        execute = async_execute_batch_with_cache
     else:
+        execute = execute_batch_with_cache
 
-        if is_coroutine:
+    if add_cache_args:
 
-            output = async_f_wrapper(
+        @functools.wraps(old_f)
+        def new_f(
+            *args,
+            cache_load: bool = True,
+            cache_save: bool = True,
+            cache_verbose: typing.Optional[bool] = None,
+            **kwargs
+        ):
+            return execute(
                 old_f=old_f,
                 args=args,
                 kwargs=kwargs,
-                cache_save=cache_save,
-                entry_hash=entry_hash,
                 cache_instance=cache_instance,
+                batch_arg=batch_arg,
+                signature=signature,
+                cache_load=cache_load,
+                cache_save=cache_save,
                 cache_verbose=cache_verbose,
             )
 
+    else:
+
+        @functools.wraps(old_f)
+        def new_f(*args, **kwargs):
+            return execute(
+                old_f=old_f,
+                args=args,
+                kwargs=kwargs,
+                cache_instance=cache_instance,
+                batch_arg=batch_arg,
+                signature=signature,
+            )
+
+    if _iscoroutinefunction(old_f):
+        new_f = _wrap_coroutine(new_f)
+
+    return new_f
+
+
+def _wrap_coroutine(f):
+    """wrap function that returns a coroutine as a coroutine function"""
+
+    @functools.wraps(f)
+    async def new_f(*args, **kwargs):
+        return await f(*args, **kwargs)
+
+    return new_f
+
+
+def _split_batch(args, kwargs, cache_instance, batch_arg, signature):
+    """compute bound arguments, elements, and entry hash of each element"""
+    bound = signature.bind(*args, **kwargs)
+    arguments = bound.arguments
+    elements = list(arguments[batch_arg])
+    entry_hashes = []
+    for element in elements:
+        arguments[batch_arg] = element
+        entry_hashes.append(
+            cache_instance.compute_entry_hash(
+                args=bound.args, kwargs=bound.kwargs
+            )
+        )
+    return bound, elements, entry_hashes
+
+
+def _get_missing_elements(elements, entry_hashes, loaded):
+    """return dict mapping hashes of missing entries to their elements"""
+    missing = {}
+    for element, entry_hash in zip(elements, entry_hashes):
+        if entry_hash not in loaded and entry_hash not in missing:
+            missing[entry_hash] = element
+    return missing
+
+
+def _unwrap_loaded_batch(loaded):
+    """unwrap negative entries of loaded batch, dropping expired entries"""
+    unwrapped = {}
+    for entry_hash, entry_data in loaded.items():
+        entry_data = _unwrap_negative_entry(entry_data)
+        if entry_data is not MISSING:
+            unwrapped[entry_hash] = entry_data
+    return unwrapped
+
+
+def _merge_batch(entry_hashes, loaded, missing, outputs):
+    """merge loaded and computed outputs into order of entry_hashes"""
+    outputs = list(outputs)
+    if len(outputs) != len(missing):
+        raise Exception(
+            'function with batch_arg must return one output per element, got '
+            + str(len(outputs))
+            + ' outputs for '
+            + str(len(missing))
+            + ' elements'
+        )
+    computed = dict(zip(missing.keys(), outputs))
+    merged = [
+        computed[entry_hash] if entry_hash in computed else loaded[entry_hash]
+        for entry_hash in entry_hashes
+    ]
+    return merged, computed
+
+
+def _wrap_batch_outputs(cache_instance, computed):
+    """wrap None outputs of batch in negative entries if using negative_ttl"""
+    if cache_instance.negative_ttl is None:
+        return computed
+    return {
+        entry_hash: _wrap_output(cache_instance, output)
+        for entry_hash, output in computed.items()
+    }
+
+
+def execute_batch_with_cache(
+    old_f,
+    args,
+    kwargs,
+    cache_instance,
+    batch_arg,
+    signature,
+    cache_load=True,
+    cache_save=True,
+    cache_verbose=None,
+):
+    """execute old_f on the elements of batch_arg missing from cache
+
+    if old_f is a coroutine function, a coroutine is returned that executes
+    old_f using async_execute_batch_with_cache()
+
+    ## Inputs
+    - batch_arg: str name of arg whose elements are cached individually
+    - signature: inspect.Signature of old_f
+    - other inputs are same as execute_with_cache()
+
+    ## Returns
+    - list of outputs, one per element of batch_arg
+    """
+    if _iscoroutinefunction(old_f):
+        return async_execute_batch_with_cache(
+            old_f=old_f,
+            args=args,
+            kwargs=kwargs,
+            cache_instance=cache_instance,
+            batch_arg=batch_arg,
+            signature=signature,
+            cache_load=cache_load,
+            cache_save=cache_save,
+            cache_verbose=cache_verbose,
+        )
+
+    # compute entry hash of each element
+    bound, elements, entry_hashes = _split_batch(
+        args, kwargs, cache_instance, batch_arg, signature
+    )
+
+    # load elements that exist in cache
+    if cache_load:
+        loaded = cache_instance.load_many(entry_hashes, verbose=cache_verbose)
+        loaded = _unwrap_loaded_batch(loaded)
+    else:
+        loaded = {}
+
+    # compute outputs of missing elements
+    missing = _get_missing_elements(elements, entry_hashes, loaded)
+    if len(missing) > 0:
+        bound.arguments[batch_arg] = list(missing.values())
+        outputs = old_f(*bound.args, **bound.kwargs)
+    else:
+        outputs = []
+    merged, computed = _merge_batch(entry_hashes, loaded, missing, outputs)
+
+    # save outputs of missing elements
+    if cache_save and len(computed) > 0:
+        computed = _wrap_batch_outputs(cache_instance, computed)
+        cache_instance.save_many(computed, verbose=cache_verbose)
+
+    return merged
+
+
+async def async_execute_batch_with_cache(
+    old_f,
+    args,
+    kwargs,
+    cache_instance,
+    batch_arg,
+    signature,
+    cache_load=True,
+    cache_save=True,
+    cache_verbose=None,
+):
+    """await coroutine function old_f on elements missing from cache
+
+    ## Inputs
+    - same as execute_batch_with_cache()
+    """
+
+    # compute entry hash of each element
+    bound, elements, entry_hashes = _split_batch(
+        args, kwargs, cache_instance, batch_arg, signature
+    )
+
+    # load elements that exist in cache
+    if not cache_load:
+        loaded = {}
+    elif cache_instance._async_offload:
+        loaded = await cache_instance._run_in_executor(
+            cache_instance.load_many, entry_hashes, verbose=cache_verbose
+        )
+    else:
+        loaded = cache_instance.load_many(entry_hashes, verbose=cache_verbose)
+    loaded = _unwrap_loaded_batch(loaded)
+
+    # compute outputs of missing elements
+    missing = _get_missing_elements(elements, entry_hashes, loaded)
+    if len(missing) > 0:
+        bound.arguments[batch_arg] = list(missing.values())
+        outputs = await old_f(*bound.args, **bound.kwargs)
+    else:
+        outputs = []
+    merged, computed = _merge_batch(entry_hashes, loaded, missing, outputs)
+
+    # save outputs of missing elements
+    if cache_save and len(computed) > 0:
+        computed = _wrap_batch_outputs(cache_instance, computed)
+        if cache_instance._async_offload:
+            await cache_instance._run_in_executor(
+                cache_instance.save_many, computed, verbose=cache_verbose
+            )
         else:
+            cache_instance.save_many(computed, verbose=cache_verbose)
 
-            # compute output
-            output = old_f(*args, **kwargs)
+    return merged
 
-            # save to cache
-            if cache_save:
-                cache_instance.save_entry(
-                    entry_hash, output, verbose=cache_verbose
-                )
 
-    return output
+#
+# # negative caching
+#
+
+
+class _NegativeEntry:
+    """None output or exception of function, stored with its own expiration"""
+
+    __slots__ = ('output', 'exception', 'expiration')
+
+    def __init__(self, output, exception, expiration):
+        self.output = output
+        self.exception = exception
+        self.expiration = expiration
+
+    def __getstate__(self):
+        return (self.output, self.exception, self.expiration)
+
+    def __setstate__(self, state):
+        self.output, self.exception, self.expiration = state
+
+
+def _wrap_output(cache_instance, output):
+    """wrap None output in a negative entry if using negative_ttl"""
+    if output is None and cache_instance.negative_ttl is not None:
+        import time
+
+        return _NegativeEntry(
+            None, None, time.time() + cache_instance.negative_ttl
+        )
+    else:
+        return output
+
+
+def _unwrap_negative_entry(entry_data):
+    """return output of loaded entry, MISSING if entry expired
+
+    raises the stored exception of entries that cache an exception
+    """
+    if type(entry_data) is not _NegativeEntry:
+        return entry_data
+
+    import time
+
+    if time.time() >= entry_data.expiration:
+        return MISSING
+    if entry_data.exception is not None:
+        import copy
+
+        # raise a copy so that tracebacks do not accumulate on stored entry
+        raise copy.copy(entry_data.exception)
+    return entry_data.output
 
 
-async def async_f_wrapper(
-    old_f, args, kwargs, cache_save, entry_hash, cache_instance, cache_verbose
+def _create_exception_entry(cache_instance, exception):
+    """create negative entry storing a copy of exception without traceback"""
+    import copy
+    import time
+
+    return _NegativeEntry(
+        None,
+        copy.copy(exception).with_traceback(None),
+        time.time() + cache_instance.negative_ttl,
+    )
+
+
+def _save_exception(cache_instance, entry_hash, exception, cache_verbose):
+    """save exception raised by function, unless it cannot be saved"""
+    try:
+        entry = _create_exception_entry(cache_instance, exception)
+        cache_instance.save_entry(entry_hash, entry, verbose=cache_verbose)
+    except Exception:
+        pass
+
+
+async def _async_save_exception(
+    cache_instance, entry_hash, exception, cache_verbose
 ):
+    """save exception raised by coroutine, unless it cannot be saved"""
+    try:
+        entry = _create_exception_entry(cache_instance, exception)
+        await cache_instance.async_save_entry(
+            entry_hash, entry, verbose=cache_verbose
+        )
+    except Exception:
+        pass
 
-    # await result
-    output = await old_f(*args, **kwargs)
 
-    # save to cache
-    if cache_save:
-        cache_instance.save_entry(entry_hash, output, verbose=cache_verbose)
+#
+# # single flight execution
+#
 
-    return output
+
+class _Flight:
+    """a computation of an entry that other threads can wait on"""
+
+    def __init__(self):
+        import threading
+
+        self.owner = threading.get_ident()
+        self.event = threading.Event()
+        self.output = None
+        self.exception = None
+
+    def wait(self):
+        self.event.wait()
+        if self.exception is not None:
+            raise self.exception
+        return self.output
+
+
+def _execute_single_flight(
+    old_f, args, kwargs, entry_hash, cache_instance, cache_verbose
+):
+    """compute entry, or wait for another thread already computing entry"""
+    import threading
+
+    stats = cache_instance._stats
+    flights = cache_instance._flights
+
+    # become leader of entry computation, or follow existing leader
+    with cache_instance._flights_lock:
+        flight = flights.get(entry_hash)
+        if flight is None:
+            flight = _Flight()
+            flights[entry_hash] = flight
+            is_leader = True
+            if stats is not None:
+                stats['n_in_flight'] += 1
+        else:
+            is_leader = False
+            if stats is not None:
+                stats['n_coalesced'] += 1
+
+    if not is_leader:
+        if flight.owner == threading.get_ident():
+            # recursive call made by the leader itself
+            return old_f(*args, **kwargs)
+        return flight.wait()
+
+    try:
+        try:
+            output = old_f(*args, **kwargs)
+        except cache_instance.negative_exceptions as e:
+            _save_exception(cache_instance, entry_hash, e, cache_verbose)
+            raise
+        cache_instance.save_entry(
+            entry_hash,
+            _wrap_output(cache_instance, output),
+            verbose=cache_verbose,
+        )
+        flight.output = output
+        return output
+    except BaseException as e:
+        flight.exception = e
+        raise
+    finally:
+        with cache_instance._flights_lock:
+            del flights[entry_hash]
+            if stats is not None:
+                stats['n_in_flight'] -= 1
+        flight.event.set()
+
+
+async def _async_execute_single_flight(
+    old_f, args, kwargs, entry_hash, cache_instance, cache_verbose
+):
+    """await entry, or await another task already computing entry
+
+    computations are only shared between tasks of the same event loop
+    """
+    import asyncio
+
+    stats = cache_instance._stats
+    flights = cache_instance._async_flights
+    loop = asyncio.get_running_loop()
+    key = (loop, entry_hash)
+
+    future = flights.get(key)
+    if future is not None:
+        if stats is not None:
+            with cache_instance._flights_lock:
+                stats['n_coalesced'] += 1
+        return await asyncio.shield(future)
+
+    future = loop.create_future()
+    flights[key] = future
+    if stats is not None:
+        with cache_instance._flights_lock:
+            stats['n_in_flight'] += 1
+    try:
+        try:
+            output = await old_f(*args, **kwargs)
+        except cache_instance.negative_exceptions as e:
+            await _async_save_exception(
+                cache_instance, entry_hash, e, cache_verbose
+            )
+            raise
+        await cache_instance.async_save_entry(
+            entry_hash,
+            _wrap_output(cache_instance, output),
+            verbose=cache_verbose,
+        )
+        future.set_result(output)
+        return output
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        # avoid warnings about unretrieved exceptions if there are no waiters
+        future.exception()
+        raise
+    finally:
+        del flights[key]
+        if stats is not None:
+            with cache_instance._flights_lock:
+                stats['n_in_flight'] -= 1
 
 
 def _iscoroutinefunction(function):
@@ -1,5 +1,8 @@
-from .base_cache import BaseCache
+from .base_cache import BaseCache, MISSING
 from .disk_cache import DiskCache
+from .log_cache import LogCache
 from .memory_cache import MemoryCache
+from .sqlite_cache import SQLiteCache
+from .tiered_cache import TieredCache
 from .cachetype_utils import get_cache_class
 
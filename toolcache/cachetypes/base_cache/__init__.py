@@ -1,2 +1,3 @@
 from .base_cache import BaseCache
+from .base_cache_crud import MISSING
 
@@ -18,12 +18,25 @@ class BaseCache(
     BaseCache is defined across multiple files using mixins for readability
     """
 
+    _supports_lock_striping = False
+
+    # whether async methods run blocking operations in an executor
+    _async_offload = False
+
+    # whether _weigh() measures stored entries without needing their data
+    _weighs_stored_entries = False
+
     def __init__(
         self,
         safety='thread',
+        n_lock_stripes=16,
         verbose=False,
         cache_name=None,
         old_f=None,
+        single_flight=False,
+        async_executor=None,
+        negative_ttl=None,
+        negative_exceptions=(Exception,),
         hash_mode=None,
         f_hash=None,
         normalize_hash_inputs=None,
@@ -32,6 +45,10 @@ class BaseCache(
         ttl=None,
         max_size=None,
         max_size_policy=None,
+        max_bytes=None,
+        f_weigh=None,
+        ttl_reaper_interval=None,
+        ttl_reaper_batch_size=1000,
         track_basic_stats=True,
         track_detailed_stats=False,
         track_creation_times=None,
@@ -43,13 +60,26 @@ class BaseCache(
         ## Inputs
 
         #### Miscellaneous Options
-        - safety: one of ['thread', 'process', None] for concurrency safety
+        - safety: one of ['thread', 'process', 'striped', None] for concurrency
+          safety, 'striped' is a thread safe mode where operations on different
+          entries use different locks, only supported by some cachetypes
+        - n_lock_stripes: int number of locks used if safety is 'striped'
         - verbose: bool of whether to be verbose
         - cache_name: str name of cache, used in verbose reporting statements
         - old_f: function being decorated by cache, None for standalone cache
+        - single_flight: bool of whether concurrent calls of a decorated
+          function that miss on the same entry should wait for a single
+          computation instead of each computing the entry
+        - async_executor: concurrent.futures.Executor used by async methods
+          of caches that perform blocking io, None uses the loop's default
+        - negative_ttl: Timelength for which decorated functions cache None
+          outputs and raised exceptions, None to cache None outputs like any
+          other output and to not cache exceptions
+        - negative_exceptions: tuple of exception types cached by negative_ttl
 
         #### Hash Options
-        - hash_mode: str of hash mode, either 'json' or 'json_digest'
+        - hash_mode: str of hash mode, one of 'json', 'json_digest', 'fast', or
+          'native', 'native' is only supported by MemoryCache
         - f_hash: function for computing hash
             - should take same args as decorated function
         - normalize_hash_inputs: bool of whether to normalize function args
@@ -63,7 +93,14 @@ class BaseCache(
         #### Eviction Options
         - ttl: Timelength of maximum age of entries in cache
         - max_size: int count of maximum number of entries in cache
-        - max_size_policy: one of ['lru', 'fifo', 'lfu', None]
+        - max_size_policy: one of ['lru', 'fifo', 'lfu', None], also used
+          to choose evictions when max_bytes is exceeded
+        - max_bytes: int maximum total weight in bytes of entries in cache
+        - f_weigh: function that takes entry data and returns its weight in
+          bytes, by default the cachetype measures or estimates weights
+        - ttl_reaper_interval: Timelength between passes of a background
+          thread that removes expired entries, None to only remove lazily
+        - ttl_reaper_batch_size: int max entries removed per reaper lock hold
 
         #### Statistic Tracking Options
         - track_basic_stats: bool of whether to track basic usage stats
@@ -90,6 +127,10 @@ class BaseCache(
             ttl=ttl,
             max_size=max_size,
             max_size_policy=max_size_policy,
+            max_bytes=max_bytes,
+            f_weigh=f_weigh,
+            ttl_reaper_interval=ttl_reaper_interval,
+            ttl_reaper_batch_size=ttl_reaper_batch_size,
         )
 
         # initialize stats
@@ -101,8 +142,22 @@ class BaseCache(
             track_access_counts=track_access_counts,
         )
 
+        self.async_executor = async_executor
+
+        # initialize coalescing of concurrent computations
+        self._initialize_single_flight(single_flight=single_flight)
+
+        # initialize caching of None outputs and exceptions
+        self._initialize_negative_caching(
+            negative_ttl=negative_ttl,
+            negative_exceptions=negative_exceptions,
+        )
+
         # initialize thread or process lock
         self._initialize_context_lock(safety=safety)
+        self._initialize_lock_stripes(
+            safety=safety, n_lock_stripes=n_lock_stripes
+        )
 
         # initialize hash config
         self._initialize_hash_config(
@@ -114,9 +169,47 @@ class BaseCache(
             f_hash=f_hash,
         )
 
+        # start background removal of expired entries
+        if ttl_reaper_interval is not None:
+            self.start_ttl_reaper()
+
+    def _initialize_single_flight(self, single_flight):
+        """initialize registry of computations that are currently in flight
+
+        see cache_decorator.execute_with_cache() for how this is used
+        """
+        self.single_flight = single_flight
+        if single_flight:
+            import threading
+
+            self._flights = {}
+            self._async_flights = {}
+            self._flights_lock = threading.Lock()
+            if self._stats is not None:
+                self._stats['n_in_flight'] = 0
+                self._stats['n_coalesced'] = 0
+
+    def _initialize_negative_caching(self, negative_ttl, negative_exceptions):
+        """initialize ttl used for None outputs and exceptions
+
+        see cache_decorator.execute_with_cache() for how this is used
+        """
+        if isinstance(negative_ttl, str):
+            import tooltime
+
+            negative_ttl = tooltime.timelength_to_seconds(negative_ttl)
+        self.negative_ttl = negative_ttl
+        if negative_ttl is None:
+            self.negative_exceptions = ()
+        elif isinstance(negative_exceptions, type):
+            self.negative_exceptions = (negative_exceptions,)
+        else:
+            self.negative_exceptions = tuple(negative_exceptions)
+
     def _initialize_context_lock(self, safety):
         """initialize context lock used for thread or process safety"""
-        if safety == 'thread':
+        self.safety = safety
+        if safety == 'thread' or safety == 'striped':
             import threading
 
             self.lock = threading.RLock()
@@ -133,4 +226,51 @@ class BaseCache(
             else:
                 self.lock = contextlib.suppress()
         else:
-            raise Exception('safety must be \'thread\', \'process\', or None')
+            raise Exception(
+                'safety must be \'thread\', \'process\', \'striped\', or None'
+            )
+
+    def _initialize_lock_stripes(self, safety, n_lock_stripes):
+        """initialize per-entry locks and stats used for lock striping
+
+        with lock striping, self.lock is only used for operations that involve
+        the whole cache, like eviction, while saves, loads, and deletes use the
+        lock and stats of the stripe that the entry hash belongs to
+        """
+        import contextlib
+
+        if safety == 'striped':
+            import threading
+
+            if not self._supports_lock_striping:
+                raise Exception(
+                    type(self).__name__ + ' does not support striped safety'
+                )
+            if n_lock_stripes < 1:
+                raise Exception('n_lock_stripes must be positive')
+            self._stripe_locks = [
+                threading.RLock() for s in range(n_lock_stripes)
+            ]
+            if self._stats is not None:
+                self._stripe_stats = [
+                    dict.fromkeys(self._stats, 0) for s in range(n_lock_stripes)
+                ]
+            else:
+                self._stripe_stats = None
+            self._structure_lock = threading.Lock()
+        else:
+            self._stripe_locks = None
+            self._stripe_stats = None
+            self._structure_lock = contextlib.nullcontext()
+        self._default_stripe = (self.lock, self._stats)
+
+    def _get_stripe(self, entry_hash):
+        """return (lock, stats) used for operations on entry"""
+        stripe_locks = self._stripe_locks
+        if stripe_locks is None:
+            return self._default_stripe
+        index = hash(entry_hash) % len(stripe_locks)
+        if self._stripe_stats is None:
+            return stripe_locks[index], None
+        else:
+            return stripe_locks[index], self._stripe_stats[index]
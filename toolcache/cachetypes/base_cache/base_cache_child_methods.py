@@ -22,11 +22,88 @@ class BaseCacheChildMethods:
         """get list of all entries in cache"""
         raise NotImplementedError('get_all_entry_hashes() not implemented')
 
+    def _get_size(self):
+        """get number of entries in cache
+
+        child classes should reimplement this using a live entry counter
+        """
+        return len(self._get_all())
+
+    def _rescan(self):
+        """rebuild any in-memory index of entries from the storage backend
+
+        child classes that keep an index of their entries should implement this
+        """
+        pass
+
     def _load(self, entry_hash):
         """load entry_data from cache"""
         raise NotImplementedError('_load() not implemented')
 
+    def _try_load(self, entry_hash, default):
+        """load entry_data from cache, or return default if entry is missing
+
+        child classes can reimplement this to attempt the load directly instead
+        of checking existence beforehand
+        """
+        if self._exists(entry_hash):
+            return self._load(entry_hash)
+        else:
+            return default
+
     def _delete(self, entry_hash):
         """remove single entry from cache"""
         raise NotImplementedError('_delete() not implemented')
 
+    def _weigh(self, entry_hash, entry_data):
+        """return weight in bytes of entry that has been saved
+
+        child classes that serialize entries can reimplement this to measure
+        the stored size instead of estimating the size of entry_data
+        """
+        from ... import size_utils
+
+        return size_utils.estimate_size(entry_data)
+
+    def _save_many(self, entries):
+        """save multiple entries to cache
+
+        child classes can reimplement this to perform bulk io
+
+        ## Inputs
+        - entries: dict mapping entry hashes to entry data
+        """
+        for entry_hash, entry_data in entries.items():
+            self._save(entry_hash=entry_hash, entry_data=entry_data)
+
+    def _load_many(self, entry_hashes):
+        """load data of multiple entries, omitting entries that do not exist
+
+        child classes can reimplement this to perform bulk io
+        """
+        from .base_cache_crud import MISSING
+
+        entries = {}
+        for entry_hash in entry_hashes:
+            entry_data = self._try_load(entry_hash, MISSING)
+            if entry_data is not MISSING:
+                entries[entry_hash] = entry_data
+        return entries
+
+    def _delete_many(self, entry_hashes):
+        """remove multiple entries from cache
+
+        child classes can reimplement this to perform bulk io
+        """
+        for entry_hash in entry_hashes:
+            self._delete(entry_hash)
+
+    def _get_fast_hit_entries(self):
+        """return dict of entries that decorators can read hits from directly
+
+        child classes that store entries in a dict can implement this to let
+        decorated functions skip load_entry() on hits, return None if loading
+        an entry does more than increment basic stats
+        """
+        return None
+
@@ -1,6 +1,22 @@
 import time
 
 
+class _Missing:
+    """sentinel that load_entry() can return for entries that do not exist"""
+
+    def __repr__(self):
+        return 'toolcache.MISSING'
+
+    def __bool__(self):
+        return False
+
+    def __reduce__(self):
+        return 'MISSING'
+
+
+MISSING = _Missing()
+
+
 class BaseCacheCRUD:
     """create, read, and delete operations for entries of BaseCache"""
 
@@ -12,12 +28,44 @@ class BaseCacheCRUD:
         - entry_data: data associated with entry
         """
 
-        with self.lock:
+        # saves to a size-limited cache hold the cache-wide lock, so that
+        # eviction and save are atomic even when using lock striping
+        if self.max_size is not None or self.max_bytes is not None:
+            with self.lock:
+                self._save_entry_with_eviction(entry_hash, entry_data, verbose)
+        else:
+            self._save_entry_to_stripe(entry_hash, entry_data, verbose)
 
-            # check max_size
-            max_size = self.max_size
-            if max_size is not None and self.get_cache_size() >= max_size:
-                self.evict_to_size(max_size - 1)
+    def _save_entry_with_eviction(self, entry_hash, entry_data, verbose):
+        """evict entries if cache is full, then save entry
+
+        weights are only known once an entry is saved, so entries are evicted
+        to satisfy max_bytes after the save
+        """
+
+        # check max_size
+        max_size = self.max_size
+        if (
+            max_size is not None
+            and (
+                self.eviction_engine is None
+                or entry_hash not in self.eviction_engine
+            )
+            and self.get_cache_size() >= max_size
+        ):
+            self.evict_to_size(max_size - 1)
+
+        self._save_entry_to_stripe(entry_hash, entry_data, verbose)
+
+        # check max_bytes
+        if self.max_bytes is not None:
+            self.evict_to_bytes(self.max_bytes, keep=[entry_hash])
+
+    def _save_entry_to_stripe(self, entry_hash, entry_data, verbose):
+        """save entry while holding the lock of its stripe"""
+
+        lock, stats = self._get_stripe(entry_hash)
+        with lock:
 
             # print summary
             if verbose is None:
@@ -29,14 +77,22 @@ class BaseCacheCRUD:
             self._save(entry_hash=entry_hash, entry_data=entry_data)
 
             # track stats
-            if self.stats is not None:
-                self.stats['n_saves'] += 1
-            if self.entry_creation_times is not None:
-                self.entry_creation_times[entry_hash] = time.time()
-            if self.entry_access_times is not None:
-                self.entry_access_times[entry_hash] = time.time()
-            if self.entry_access_counts is not None:
-                self.entry_access_counts.setdefault(entry_hash, 0)
+            self._track_save(entry_hash, stats, time.time())
+            if self.entry_weights is not None:
+                self._track_weight(entry_hash, entry_data)
+
+    def _track_save(self, entry_hash, stats, now):
+        """update eviction tracking and stats after entry is saved"""
+        self._track_eviction_save(entry_hash)
+        if stats is not None:
+            stats['n_saves'] += 1
+        if self.entry_creation_times is not None:
+            self.entry_creation_times[entry_hash] = now
+            self._track_expiry(entry_hash)
+        if self.entry_access_times is not None:
+            self.entry_access_times[entry_hash] = now
+        if self.entry_access_counts is not None:
+            self.entry_access_counts.setdefault(entry_hash, 0)
 
     def exists_in_cache(self, entry_hash=None, args=None, kwargs=None):
         """return whether entry exists in cache
@@ -62,33 +118,76 @@ class BaseCacheCRUD:
         # check whether exists
         exists = self._exists(entry_hash)
 
-        # check ttl vs age
+        # check ttl vs age, entry_too_old() evicts entries that are too old
         if exists and self.entry_too_old(entry_hash):
-            self.delete_entry(entry_hash)
             exists = False
 
         # track stats
-        if self.stats is not None:
-            with self.lock:
-                self.stats['n_checks'] += 1
+        lock, stats = self._get_stripe(entry_hash)
+        if stats is not None:
+            with lock:
+                stats['n_checks'] += 1
                 if exists:
-                    self.stats['n_hits'] += 1
+                    stats['n_hits'] += 1
                 else:
-                    self.stats['n_misses'] += 1
+                    stats['n_misses'] += 1
 
         return exists
 
     def get_all_entry_hashes(self):
         """get list of all hashes existing in cache"""
-        return [
-            entry_hash
-            for entry_hash in self._get_all()
-            if self.exists_in_cache(entry_hash)
-        ]
+        with self.lock:
+            self.evict_expired()
+            return list(self._get_all())
 
     def get_cache_size(self):
         """query size of cache"""
-        return len(self.get_all_entry_hashes())
+        with self.lock:
+            self.evict_expired()
+            return self._get_size()
+
+    def get_cache_bytes(self):
+        """query total weight in bytes of entries in cache
+
+        weights are only tracked by caches that use max_bytes
+        """
+        if self.entry_weights is None:
+            raise Exception('entry weights are only tracked when using max_bytes')
+        with self.lock:
+            self.evict_expired()
+            return self.total_bytes
+
+    def rescan(self):
+        """rebuild index of entries by scanning the full storage backend
+
+        use this when the backend might have been modified by other processes,
+        this checks every entry and returns the resulting number of entries
+        """
+        with self.lock:
+            self._rescan()
+            entry_hashes = [
+                entry_hash
+                for entry_hash in self._get_all()
+                if self.exists_in_cache(entry_hash)
+            ]
+            if self.eviction_engine is not None:
+                for entry_hash in list(self.eviction_engine):
+                    if not self._exists(entry_hash):
+                        self.eviction_engine.discard(entry_hash)
+                for entry_hash in entry_hashes:
+                    if entry_hash not in self.eviction_engine:
+                        self.eviction_engine.add(entry_hash)
+            if self.entry_weights is not None:
+                for entry_hash in list(self.entry_weights):
+                    if not self._exists(entry_hash):
+                        self._set_entry_weight(entry_hash, 0)
+                        del self.entry_weights[entry_hash]
+                self._track_stored_weights(
+                    entry_hash
+                    for entry_hash in entry_hashes
+                    if entry_hash not in self.entry_weights
+                )
+            return len(entry_hashes)
 
     def load_entry(
         self,
@@ -97,8 +196,9 @@ class BaseCacheCRUD:
         kwargs=None,
         verbose=None,
         must_exist=False,
+        default=None,
     ):
-        """load entry data from cache, or None if entry does not exist
+        """load entry data from cache, or default if entry does not exist
 
         should specify either entry_hash, or at least one of args and kwargs
 
@@ -108,6 +208,8 @@ class BaseCacheCRUD:
         - kwargs: list of keyword args to use to compute hash
         - verbose: bool of whether to print loading, if None uses self.verbose
         - must_exist: bool of whether to raise exception if entry does not exist
+        - default: value returned if entry does not exist, use
+          toolcache.MISSING to distinguish missing entries from cached None
         """
 
         # parse inputs
@@ -120,8 +222,15 @@ class BaseCacheCRUD:
                 kwargs = {}
             entry_hash = self.compute_entry_hash(args=args, kwargs=kwargs)
 
-        with self.lock:
-            if self.exists_in_cache(entry_hash):
+        lock, stats = self._get_stripe(entry_hash)
+        with lock:
+
+            # load data, entries whose age exceeds ttl are evicted as missing
+            entry_data = self._try_load(entry_hash, MISSING)
+            if entry_data is not MISSING and self.entry_too_old(entry_hash):
+                entry_data = MISSING
+
+            if entry_data is not MISSING:
 
                 # print summary
                 if verbose is None:
@@ -129,18 +238,21 @@ class BaseCacheCRUD:
                 if verbose:
                     self._print_load_summary(entry_hash)
 
-                # load data
-                entry_data = self._load(entry_hash)
-
                 # track stats
-                if self.stats is not None:
-                    self.stats['n_loads'] += 1
+                self._track_eviction_load(entry_hash)
+                if stats is not None:
+                    stats['n_checks'] += 1
+                    stats['n_hits'] += 1
+                    stats['n_loads'] += 1
 
             else:
+                if stats is not None:
+                    stats['n_checks'] += 1
+                    stats['n_misses'] += 1
                 if must_exist:
                     raise Exception('entry does not exist in cache')
                 else:
-                    entry_data = None
+                    entry_data = default
 
             # track stats
             if self.entry_access_times is not None:
@@ -151,22 +263,6 @@ class BaseCacheCRUD:
 
             return entry_data
 
-    async def async_load_entry(
-        self,
-        entry_hash=None,
-        args=None,
-        kwargs=None,
-        verbose=None,
-        must_exist=False,
-    ):
-        return self.load_entry(
-            entry_hash=entry_hash,
-            args=args,
-            kwargs=kwargs,
-            verbose=verbose,
-            must_exist=must_exist,
-        )
-
     def delete_entry(self, entry_hash=None, args=None, kwargs=None):
         """delete entry from cache
 
@@ -187,18 +283,27 @@ class BaseCacheCRUD:
                 kwargs = {}
             entry_hash = self.compute_entry_hash(args=args, kwargs=kwargs)
 
-        with self.lock:
+        lock, stats = self._get_stripe(entry_hash)
+        with lock:
             self._delete(entry_hash)
-            if self.stats is not None:
-                self.stats['n_deletes'] += 1
+            self._track_eviction_delete(entry_hash)
+            if stats is not None:
+                stats['n_deletes'] += 1
 
     def delete_all_entries(self):
         """delete all entries from cache"""
         with self.lock:
             size = self.get_cache_size()
             self._delete_all()
-            if self.stats is not None:
-                self.stats['n_deletes'] += size
+            if self.eviction_engine is not None:
+                with self._structure_lock:
+                    self.eviction_engine.clear()
+            if self.entry_weights is not None:
+                with self._structure_lock:
+                    self.entry_weights.clear()
+                    self.total_bytes = 0
+            if self._stats is not None:
+                self._stats['n_deletes'] += size
 
     def _delete_all(self):
         """clear all cache entries
@@ -208,6 +313,276 @@ class BaseCacheCRUD:
         for entry_hash in self.get_all_entry_hashes():
             self.delete_entry(entry_hash)
 
+    #
+    # # batch operations
+    #
+
+    def save_many(self, entries, verbose=None):
+        """save multiple entries to cache
+
+        the cache lock is taken once and eviction is performed once for the
+        whole batch, if more entries are given than fit in a size-limited
+        cache, only the last max_size entries are saved
+
+        ## Inputs
+        - entries: dict mapping entry hashes to entry data
+        - verbose: bool of whether to print saving, if None uses self.verbose
+        """
+        entries = dict(entries)
+        if len(entries) == 0:
+            return
+
+        with self._batch_lock():
+
+            # make room for new entries
+            max_size = self.max_size
+            if max_size is not None:
+                if len(entries) > max_size:
+                    entries = dict(list(entries.items())[-max_size:])
+                if self.eviction_engine is None:
+                    n_new = len(entries)
+                else:
+                    n_new = sum(
+                        entry_hash not in self.eviction_engine
+                        for entry_hash in entries
+                    )
+                if self.get_cache_size() + n_new > max_size:
+                    self.evict_to_size(max_size - n_new)
+
+            # print summary
+            if verbose is None:
+                verbose = self.verbose
+            if verbose:
+                for entry_hash in entries:
+                    self._print_save_summary(entry_hash)
+
+            # save data to cache
+            self._save_many(entries)
+
+            # track stats
+            now = time.time()
+            for entry_hash, entry_data in entries.items():
+                lock, stats = self._get_stripe(entry_hash)
+                self._track_save(entry_hash, stats, now)
+                if self.entry_weights is not None:
+                    self._track_weight(entry_hash, entry_data)
+
+            # check max_bytes
+            if self.max_bytes is not None:
+                self.evict_to_bytes(self.max_bytes, keep=entries.keys())
+
+    def load_many(self, entry_hashes, verbose=None, must_exist=False):
+        """load data of multiple entries from cache
+
+        the cache lock is taken once for the whole batch
+
+        ## Inputs
+        - entry_hashes: iterable of entry hashes
+        - verbose: bool of whether to print loading, if None uses self.verbose
+        - must_exist: bool of whether to raise exception if an entry is missing
+
+        ## Returns
+        - dict mapping entry hashes to entry data, missing entries are omitted
+        """
+        entry_hashes = list(dict.fromkeys(entry_hashes))
+
+        with self._batch_lock():
+
+            # load data, then drop entries whose age exceeds ttl
+            entries = self._load_many(entry_hashes)
+            if self.ttl is not None:
+                for entry_hash in list(entries.keys()):
+                    if self.entry_too_old(entry_hash):
+                        del entries[entry_hash]
+            if must_exist and len(entries) < len(entry_hashes):
+                raise Exception('entry does not exist in cache')
+
+            # print summary
+            if verbose is None:
+                verbose = self.verbose
+            if verbose:
+                for entry_hash in entries:
+                    self._print_load_summary(entry_hash)
+
+            # track stats
+            now = time.time()
+            for entry_hash in entry_hashes:
+                lock, stats = self._get_stripe(entry_hash)
+                hit = entry_hash in entries
+                if hit:
+                    self._track_eviction_load(entry_hash)
+                if stats is not None:
+                    stats['n_checks'] += 1
+                    if hit:
+                        stats['n_hits'] += 1
+                        stats['n_loads'] += 1
+                    else:
+                        stats['n_misses'] += 1
+                if self.entry_access_times is not None:
+                    self.entry_access_times[entry_hash] = now
+                if self.entry_access_counts is not None:
+                    self.entry_access_counts.setdefault(entry_hash, 0)
+                    self.entry_access_counts[entry_hash] += 1
+
+            return entries
+
+    def exists_many(self, entry_hashes):
+        """return dict mapping each entry hash to whether it exists in cache
+
+        the cache lock is taken once for the whole batch
+
+        ## Inputs
+        - entry_hashes: iterable of entry hashes
+        """
+        entry_hashes = list(dict.fromkeys(entry_hashes))
+
+        with self._batch_lock():
+            exists = {}
+            for entry_hash in entry_hashes:
+
+                # check whether exists and check ttl vs age
+                entry_exists = self._exists(entry_hash)
+                if entry_exists and self.entry_too_old(entry_hash):
+                    entry_exists = False
+                exists[entry_hash] = entry_exists
+
+                # track stats
+                lock, stats = self._get_stripe(entry_hash)
+                if stats is not None:
+                    stats['n_checks'] += 1
+                    if entry_exists:
+                        stats['n_hits'] += 1
+                    else:
+                        stats['n_misses'] += 1
+
+            return exists
+
+    def delete_many(self, entry_hashes):
+        """delete multiple entries from cache
+
+        the cache lock is taken once for the whole batch
+
+        ## Inputs
+        - entry_hashes: iterable of entry hashes
+        """
+        entry_hashes = list(dict.fromkeys(entry_hashes))
+        if len(entry_hashes) == 0:
+            return
+
+        with self._batch_lock():
+            self._delete_many(entry_hashes)
+            for entry_hash in entry_hashes:
+                self._track_eviction_delete(entry_hash)
+                lock, stats = self._get_stripe(entry_hash)
+                if stats is not None:
+                    stats['n_deletes'] += 1
+
+    def _batch_lock(self):
+        """return context that holds the cache lock and every stripe lock"""
+        if self._stripe_locks is None:
+            return self.lock
+        else:
+            import contextlib
+
+            stack = contextlib.ExitStack()
+            stack.enter_context(self.lock)
+            for lock in self._stripe_locks:
+                stack.enter_context(lock)
+            return stack
+
+    #
+    # # async operations
+    #
+
+    async def async_save_entry(self, entry_hash, entry_data, verbose=None):
+        """save entry data to cache without blocking the event loop
+
+        caches that perform blocking io run the save in self.async_executor,
+        see save_entry() for inputs
+        """
+        if self._async_offload:
+            await self._run_in_executor(
+                self.save_entry, entry_hash, entry_data, verbose=verbose
+            )
+        else:
+            self.save_entry(entry_hash, entry_data, verbose=verbose)
+
+    async def async_load_entry(
+        self,
+        entry_hash=None,
+        args=None,
+        kwargs=None,
+        verbose=None,
+        must_exist=False,
+        default=None,
+    ):
+        """load entry data from cache without blocking the event loop
+
+        caches that perform blocking io run the load in self.async_executor,
+        see load_entry() for inputs
+        """
+        if self._async_offload:
+            return await self._run_in_executor(
+                self.load_entry,
+                entry_hash=entry_hash,
+                args=args,
+                kwargs=kwargs,
+                verbose=verbose,
+                must_exist=must_exist,
+                default=default,
+            )
+        else:
+            return self.load_entry(
+                entry_hash=entry_hash,
+                args=args,
+                kwargs=kwargs,
+                verbose=verbose,
+                must_exist=must_exist,
+                default=default,
+            )
+
+    async def async_exists(self, entry_hash=None, args=None, kwargs=None):
+        """return whether entry exists in cache without blocking the event loop
+
+        see exists_in_cache() for inputs
+        """
+        if self._async_offload:
+            return await self._run_in_executor(
+                self.exists_in_cache,
+                entry_hash=entry_hash,
+                args=args,
+                kwargs=kwargs,
+            )
+        else:
+            return self.exists_in_cache(
+                entry_hash=entry_hash, args=args, kwargs=kwargs
+            )
+
+    async def async_delete_entry(self, entry_hash=None, args=None, kwargs=None):
+        """delete entry from cache without blocking the event loop
+
+        see delete_entry() for inputs
+        """
+        if self._async_offload:
+            await self._run_in_executor(
+                self.delete_entry,
+                entry_hash=entry_hash,
+                args=args,
+                kwargs=kwargs,
+            )
+        else:
+            self.delete_entry(entry_hash=entry_hash, args=args, kwargs=kwargs)
+
+    def _run_in_executor(self, f, *args, **kwargs):
+        """run blocking function in self.async_executor, return awaitable"""
+        import asyncio
+        import functools
+
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(
+            self.async_executor, functools.partial(f, *args, **kwargs)
+        )
+
     #
     # # introspection
     #
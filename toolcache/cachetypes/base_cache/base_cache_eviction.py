@@ -1,5 +1,10 @@
+import heapq
+import itertools
+import time
 import types
 
+from . import eviction_engines
+
 
 class BaseCacheEviction:
     def _initialize_eviction_policies(
@@ -7,6 +12,10 @@ class BaseCacheEviction:
         ttl,
         max_size,
         max_size_policy,
+        max_bytes=None,
+        f_weigh=None,
+        ttl_reaper_interval=None,
+        ttl_reaper_batch_size=1000,
     ):
         """initialize cache attributes related to eviction and stat tracking
 
@@ -20,9 +29,32 @@ class BaseCacheEviction:
             ttl = tooltime.timelength_to_seconds(ttl)
         self.ttl = ttl
 
+        # initialize expiry index, a heap of (deadline, counter, entry_hash)
+        self._expiry_heap = []
+        self._expiry_counter = itertools.count()
+        self._ttl_reaper = None
+        if isinstance(ttl_reaper_interval, str):
+            import tooltime
+
+            ttl_reaper_interval = tooltime.timelength_to_seconds(
+                ttl_reaper_interval
+            )
+        self.ttl_reaper_interval = ttl_reaper_interval
+        self.ttl_reaper_batch_size = ttl_reaper_batch_size
+
+        # set byte limit, weights are tracked only when limiting bytes
+        self.max_bytes = max_bytes
+        self.f_weigh = f_weigh
+        if max_bytes is None:
+            self.entry_weights = None
+        else:
+            self.entry_weights = {}
+        self.total_bytes = 0
+
         # set size limits and policy
         self.max_size = max_size
-        if self.max_size is None:
+        self.eviction_engine = None
+        if self.max_size is None and self.max_bytes is None:
             self.max_size_policy = None
         else:
             if max_size_policy is None:
@@ -32,17 +64,11 @@ class BaseCacheEviction:
                 self.get_cache_eviction = max_size_policy
             elif isinstance(max_size_policy, str):
                 max_size_policy = max_size_policy.lower()
-                if max_size_policy == 'lru':
-                    self.max_size_policy = max_size_policy
-                    self.get_cache_eviction = self.get_lru_eviction
-                elif max_size_policy == 'fifo':
-                    self.max_size_policy = max_size_policy
-                    self.get_cache_eviction = self.get_fifo_eviction
-                elif max_size_policy == 'lfu':
-                    self.max_size_policy = max_size_policy
-                    self.get_cache_eviction = self.get_lfu_eviction
-                else:
-                    raise Exception('max_size_policy: ' + str(max_size_policy))
+                self.eviction_engine = eviction_engines.create_eviction_engine(
+                    max_size_policy
+                )
+                self.max_size_policy = max_size_policy
+                self.get_cache_eviction = self.eviction_engine.get_eviction
             else:
                 raise Exception('max_size_policy: ' + str(max_size_policy))
 
@@ -51,21 +77,176 @@ class BaseCacheEviction:
         if self.ttl is None:
             return False
         if self.get_entry_age(entry_hash) >= self.ttl:
-            if self.verbose:
-                print('[cache]', self.cache_name, 'evicting old entry')
-            with self.lock:
-                self.delete_entry(entry_hash)
-                if self.stats is not None:
-                    self.stats['n_ttl_evictions'] += 1
+            self._evict_old_entry(entry_hash)
             return True
         else:
             return False
 
+    def _evict_old_entry(self, entry_hash):
+        """delete entry whose age exceeds ttl"""
+        if self.verbose:
+            print('[cache]', self.cache_name, 'evicting old entry')
+        lock, stats = self._get_stripe(entry_hash)
+        with lock:
+            self.delete_entry(entry_hash)
+            if stats is not None:
+                stats['n_ttl_evictions'] += 1
+
+    def evict_expired(self, max_evictions=None):
+        """remove entries whose age exceeds ttl, oldest first
+
+        uses the expiry index so that only expired entries are inspected
+
+        ## Inputs
+        - max_evictions: int maximum number of entries to evict, None for all
+
+        ## Returns
+        - int number of entries evicted
+        """
+        if self.ttl is None:
+            return 0
+
+        heap = self._expiry_heap
+        n_evicted = 0
+        with self.lock:
+            now = time.time()
+            while len(heap) > 0 and heap[0][0] <= now:
+                if max_evictions is not None and n_evicted >= max_evictions:
+                    break
+                with self._structure_lock:
+                    deadline, _, entry_hash = heapq.heappop(heap)
+
+                # skip index items made stale by re-saves or deletes
+                creation_time = self.entry_creation_times.get(entry_hash)
+                if creation_time is None or creation_time + self.ttl != deadline:
+                    continue
+                if not self._exists(entry_hash):
+                    continue
+
+                self._evict_old_entry(entry_hash)
+                n_evicted += 1
+
+        return n_evicted
+
+    def _track_expiry(self, entry_hash):
+        """add entry to expiry index using its current creation time"""
+        if self.ttl is None:
+            return
+        creation_time = self.entry_creation_times.get(entry_hash)
+        if creation_time is None:
+            return
+        with self._structure_lock:
+            heap = self._expiry_heap
+            item = (
+                creation_time + self.ttl,
+                next(self._expiry_counter),
+                entry_hash,
+            )
+            heapq.heappush(heap, item)
+
+            # rebuild index if it has accumulated too many stale items
+            if len(heap) > 2 * self._get_size() + 1000:
+                self._rebuild_expiry_index()
+
+    def _rebuild_expiry_index(self):
+        """rebuild expiry index from creation times of current entries"""
+        creation_times = self.entry_creation_times
+        heap = [
+            (creation_times[entry_hash] + self.ttl, e, entry_hash)
+            for e, entry_hash in enumerate(self._get_all())
+            if entry_hash in creation_times
+        ]
+        heapq.heapify(heap)
+        self._expiry_heap = heap
+        self._expiry_counter = itertools.count(len(heap))
+
+    #
+    # # background ttl reaper
+    #
+
+    def start_ttl_reaper(self, interval=None, batch_size=None):
+        """start daemon thread that periodically removes expired entries
+
+        the thread holds only a weak reference to the cache, and stops once the
+        cache is garbage collected or once stop_ttl_reaper() is called
+
+        ## Inputs
+        - interval: float seconds between reaper passes, default is ttl / 2
+        - batch_size: int max entries to evict per lock acquisition
+        """
+        import threading
+        import weakref
+
+        if self.ttl is None:
+            raise Exception('must use ttl in order to use ttl reaper')
+        if self._ttl_reaper is not None:
+            raise Exception('ttl reaper already running')
+        if interval is None:
+            interval = self.ttl_reaper_interval
+        if interval is None:
+            interval = self.ttl / 2.0
+        if batch_size is None:
+            batch_size = self.ttl_reaper_batch_size
+
+        stop_event = threading.Event()
+        cache_ref = weakref.ref(self)
+
+        def reaper():
+            while not stop_event.wait(interval):
+                cache = cache_ref()
+                if cache is None:
+                    break
+                cache._reap_expired(batch_size)
+                del cache
+
+        thread = threading.Thread(
+            target=reaper,
+            name='toolcache_ttl_reaper_' + str(self.cache_name),
+            daemon=True,
+        )
+        self._ttl_reaper = (thread, stop_event)
+        thread.start()
+
+    def stop_ttl_reaper(self):
+        """stop background ttl reaper thread"""
+        if self._ttl_reaper is not None:
+            thread, stop_event = self._ttl_reaper
+            stop_event.set()
+            thread.join()
+            self._ttl_reaper = None
+
+    async def run_ttl_reaper_async(self, interval=None, batch_size=None):
+        """run ttl reaper as asyncio task, e.g. asyncio.create_task(...)
+
+        ## Inputs
+        - interval: float seconds between reaper passes, default is ttl / 2
+        - batch_size: int max entries to evict per lock acquisition
+        """
+        import asyncio
+
+        if self.ttl is None:
+            raise Exception('must use ttl in order to use ttl reaper')
+        if interval is None:
+            interval = self.ttl_reaper_interval
+        if interval is None:
+            interval = self.ttl / 2.0
+        if batch_size is None:
+            batch_size = self.ttl_reaper_batch_size
+
+        while True:
+            await asyncio.sleep(interval)
+            while self.evict_expired(max_evictions=batch_size) >= batch_size:
+                await asyncio.sleep(0)
+
+    def _reap_expired(self, batch_size):
+        """evict all expired entries, releasing the lock between batches"""
+        while self.evict_expired(max_evictions=batch_size) >= batch_size:
+            pass
+
     def evict_to_size(self, target_size):
         """remove items from cache until cache reaches target size"""
 
         with self.lock:
-            print(self.get_cache_size)
 
             # compute number to evict
             n_to_evict = self.get_cache_size() - target_size
@@ -75,16 +256,105 @@ class BaseCacheEviction:
             # evict hashes
             for e in range(n_to_evict):
                 entry_hash = self.get_cache_eviction()
-                print("PEROFMRING DELETE", entry_hash)
+                if entry_hash is None:
+                    break
                 self.delete_entry(entry_hash)
-                if self.stats is not None:
-                    self.stats['n_size_evictions'] += 1
+                if self._stats is not None:
+                    self._stats['n_size_evictions'] += 1
 
-            print(self.get_cache_size)
+    def evict_to_bytes(self, target_bytes, keep=()):
+        """remove items from cache until total weight reaches target bytes
+
+        ## Inputs
+        - target_bytes: int total weight in bytes to reach
+        - keep: collection of entry hashes that should not be evicted, such as
+          entries that were just saved
+        """
+
+        with self.lock:
+            if self.total_bytes <= target_bytes:
+                return
+
+            # hide kept entries from eviction engine
+            engine = self.eviction_engine
+            if engine is not None:
+                keep = [entry_hash for entry_hash in keep if entry_hash in engine]
+                with self._structure_lock:
+                    for entry_hash in keep:
+                        engine.discard(entry_hash)
+
+            # evict hashes
+            try:
+                for e in range(len(self.entry_weights)):
+                    if self.total_bytes <= target_bytes:
+                        break
+                    entry_hash = self.get_cache_eviction()
+                    if entry_hash is None:
+                        break
+                    self.delete_entry(entry_hash)
+                    if self._stats is not None:
+                        self._stats['n_size_evictions'] += 1
+            finally:
+                if engine is not None:
+                    with self._structure_lock:
+                        for entry_hash in keep:
+                            engine.add(entry_hash)
+
+    def _track_weight(self, entry_hash, entry_data):
+        """record weight of entry after it is saved"""
+        if self.f_weigh is not None:
+            weight = self.f_weigh(entry_data)
+        else:
+            weight = self._weigh(entry_hash, entry_data)
+        self._set_entry_weight(entry_hash, weight)
+
+    def _track_stored_weights(self, entry_hashes):
+        """record weights of entries that were saved by other cache instances
+
+        entries are loaded to be weighed unless the cachetype can measure the
+        stored size of entries directly
+        """
+        for entry_hash in entry_hashes:
+            if self.f_weigh is None and self._weighs_stored_entries:
+                entry_data = None
+            else:
+                entry_data = self._load(entry_hash)
+            self._track_weight(entry_hash, entry_data)
+
+    def _set_entry_weight(self, entry_hash, weight):
+        """set weight of entry and update total weight of cache"""
+        with self._structure_lock:
+            old_weight = self.entry_weights.get(entry_hash, 0)
+            self.entry_weights[entry_hash] = weight
+            self.total_bytes += weight - old_weight
+
+    def _track_eviction_save(self, entry_hash):
+        """update eviction engine after entry is saved"""
+        if self.eviction_engine is not None:
+            with self._structure_lock:
+                self.eviction_engine.add(entry_hash)
+
+    def _track_eviction_load(self, entry_hash):
+        """update eviction engine after entry is loaded"""
+        if self.eviction_engine is not None:
+            with self._structure_lock:
+                self.eviction_engine.access(entry_hash)
+
+    def _track_eviction_delete(self, entry_hash):
+        """update eviction engine and entry weights after entry is deleted"""
+        if self.eviction_engine is not None:
+            with self._structure_lock:
+                self.eviction_engine.discard(entry_hash)
+        if self.entry_weights is not None:
+            with self._structure_lock:
+                self.total_bytes -= self.entry_weights.pop(entry_hash, 0)
 
     #
     # # specific eviction algorithms
     #
+    # these compute evictions by scanning all entries, the eviction engines in
+    # eviction_engines.py are used instead when evicting from a full cache
+    #
 
     def get_lru_eviction(self):
         """determine which entries to evict using lru algorithm"""
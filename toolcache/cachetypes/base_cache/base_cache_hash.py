@@ -50,6 +50,10 @@ class BaseCacheHash:
                 self.f_hash = hash_utils.compute_hash_json
             elif hash_mode == 'json_digest':
                 self.f_hash = hash_utils.compute_hash_json_digest
+            elif hash_mode == 'fast':
+                self.f_hash = hash_utils.compute_hash_fast
+            elif hash_mode == 'native':
+                self.f_hash = hash_utils.compute_hash_native
             else:
                 raise Exception('unknown hash mode: ' + str(hash_mode))
         else:
@@ -63,6 +67,17 @@ class BaseCacheHash:
         else:
             self.old_f_argspec = None
 
+        # compile binding of function args to names
+        if normalize_hash_inputs and self.old_f_argspec is not None:
+            self._hash_function_inputs = hash_utils.compile_function_input_hash(
+                f_hash=self.f_hash,
+                argspec=self.old_f_argspec,
+                include_args=hash_include_args,
+                exclude_args=hash_exclude_args,
+            )
+        else:
+            self._hash_function_inputs = None
+
     def compute_entry_hash(self, args=None, kwargs=None):
         """create hash for an entry give a set of args and kwargs
 
@@ -76,7 +91,9 @@ class BaseCacheHash:
         if kwargs is None:
             kwargs = {}
 
-        if self.normalize_hash_inputs:
+        if self._hash_function_inputs is not None:
+            entry_hash = self._hash_function_inputs(args, kwargs)
+        elif self.normalize_hash_inputs:
             entry_hash = hash_utils.get_function_input_hash(
                 argspec=self.old_f_argspec,
                 f_hash=self.f_hash,
@@ -88,8 +105,13 @@ class BaseCacheHash:
         else:
             entry_hash = self.f_hash(*args, **kwargs)
 
-        if self.stats is not None:
-            self.stats['n_hashes'] += 1
+        if self._stats is not None:
+            if self._stripe_stats is None:
+                self._stats['n_hashes'] += 1
+            else:
+                lock, stats = self._get_stripe(entry_hash)
+                with lock:
+                    stats['n_hashes'] += 1
 
         return entry_hash
 
@@ -1,3 +1,5 @@
+import itertools
+import threading
 import time
 
 
@@ -13,7 +15,7 @@ class BaseCacheStats:
 
         # initialize basic stats
         if track_basic_stats:
-            self.stats = {
+            self._stats = {
                 'n_hashes': 0,
                 'n_checks': 0,
                 'n_hits': 0,
@@ -25,7 +27,11 @@ class BaseCacheStats:
                 'n_ttl_evictions': 0,
             }
         else:
-            self.stats = None
+            self._stats = None
+
+        # counter of hits served by decorator without calling load_entry()
+        self._fast_hit_counter = None
+        self._n_counted_fast_hits = 0
 
         if self.ttl is not None:
             if track_creation_times is not None and not track_creation_times:
@@ -74,6 +80,50 @@ class BaseCacheStats:
             self.entry_access_counts = None
         self.track_access_counts = track_access_counts
 
+    @property
+    def stats(self):
+        """dict of basic usage stats, or None if not tracking basic stats
+
+        the same dict is returned each time, so it can be modified in place,
+        e.g. to reset counts. when using lock striping, stats of each stripe
+        are added to it when it is read, as are hits served by the decorator
+        fast path
+        """
+        stats = self._stats
+        if stats is None:
+            return None
+
+        # move counts of each stripe into stats
+        if self._stripe_stats is not None:
+            totals = dict.fromkeys(stats, 0)
+            for lock, stripe_stats in zip(
+                self._stripe_locks, self._stripe_stats
+            ):
+                with lock:
+                    for key, value in stripe_stats.items():
+                        totals[key] += value
+                        stripe_stats[key] = 0
+            with self.lock:
+                for key, value in totals.items():
+                    stats[key] += value
+
+        # each fast hit is a hash, a check, a hit, and a load
+        if self._fast_hit_counter is not None:
+            with self.lock:
+                n_fast_hits = self._fast_hit_counter.get_count()
+                n_new = n_fast_hits - self._n_counted_fast_hits
+                self._n_counted_fast_hits = n_fast_hits
+                for key in ['n_hashes', 'n_checks', 'n_hits', 'n_loads']:
+                    stats[key] += n_new
+
+        return stats
+
+    def _get_fast_hit_counter(self):
+        """return counter of hits served by the decorator fast path"""
+        if self._fast_hit_counter is None:
+            self._fast_hit_counter = HitCounter()
+        return self._fast_hit_counter
+
     def get_entry_creation_time(self, entry_hash):
         """get creation time of an individual entry"""
         if self.track_creation_times is None:
@@ -173,3 +223,24 @@ class BaseCacheStats:
         print('    - tracking creation times:', bool(self.track_creation_times))
         print('    - tracking access times:', bool(self.track_access_times))
         print('    - tracking access counts:', bool(self.track_access_counts))
+
+
+class HitCounter:
+    """counter whose increment() is a single atomic call
+
+    increment() is the __next__ of an itertools.count, which does not need a
+    lock, each call of get_count() also advances the count, so reads are
+    subtracted from it
+    """
+
+    def __init__(self):
+        self.increment = itertools.count().__next__
+        self._n_reads = 0
+        self._read_lock = threading.Lock()
+
+    def get_count(self):
+        """return number of times increment() has been called"""
+        with self._read_lock:
+            count = self.increment() - self._n_reads
+            self._n_reads += 1
+        return count
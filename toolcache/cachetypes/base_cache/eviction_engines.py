@@ -0,0 +1,173 @@
+"""eviction engines that select entries to evict in constant time
+
+each engine is updated incrementally as entries are saved, loaded, and deleted
+- add(): called when an entry is saved to the cache
+- access(): called when an entry is loaded from the cache
+- discard(): called when an entry is removed from the cache
+- get_eviction(): return hash of the next entry that should be evicted
+"""
+
+import collections
+
+
+class EvictionEngine:
+    """abstract class that eviction engines inherit from"""
+
+    def add(self, entry_hash):
+        """register entry that was saved to cache"""
+        raise NotImplementedError('add() not implemented')
+
+    def access(self, entry_hash):
+        """register entry that was loaded from cache"""
+        raise NotImplementedError('access() not implemented')
+
+    def discard(self, entry_hash):
+        """unregister entry that was removed from cache"""
+        raise NotImplementedError('discard() not implemented')
+
+    def get_eviction(self):
+        """return hash of next entry to evict, or None if engine is empty"""
+        raise NotImplementedError('get_eviction() not implemented')
+
+    def clear(self):
+        """unregister all entries"""
+        raise NotImplementedError('clear() not implemented')
+
+    def __len__(self):
+        raise NotImplementedError('__len__() not implemented')
+
+    def __contains__(self, entry_hash):
+        raise NotImplementedError('__contains__() not implemented')
+
+    def __iter__(self):
+        raise NotImplementedError('__iter__() not implemented')
+
+
+class LRUEvictionEngine(EvictionEngine):
+    """evict least recently used entry, using an ordered dict as linked list"""
+
+    def __init__(self):
+        self.order = collections.OrderedDict()
+
+    def add(self, entry_hash):
+        self.order[entry_hash] = None
+        self.order.move_to_end(entry_hash)
+
+    def access(self, entry_hash):
+        self.add(entry_hash)
+
+    def discard(self, entry_hash):
+        self.order.pop(entry_hash, None)
+
+    def get_eviction(self):
+        for entry_hash in self.order:
+            return entry_hash
+        return None
+
+    def clear(self):
+        self.order.clear()
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, entry_hash):
+        return entry_hash in self.order
+
+    def __iter__(self):
+        return iter(list(self.order))
+
+
+class FIFOEvictionEngine(LRUEvictionEngine):
+    """evict oldest entry, where re-saving an entry resets its age"""
+
+    def access(self, entry_hash):
+        if entry_hash not in self.order:
+            self.order[entry_hash] = None
+
+
+class LFUEvictionEngine(EvictionEngine):
+    """evict least frequently used entry, using buckets of access counts
+
+    ties between entries with equal counts are broken by least recent use
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.buckets = {}
+        self.min_count = None
+
+    def _move(self, entry_hash, old_count, new_count):
+        if old_count is not None:
+            bucket = self.buckets[old_count]
+            del bucket[entry_hash]
+            if not bucket:
+                del self.buckets[old_count]
+                if self.min_count == old_count:
+                    self.min_count = None
+        bucket = self.buckets.get(new_count)
+        if bucket is None:
+            bucket = self.buckets[new_count] = collections.OrderedDict()
+        bucket[entry_hash] = None
+        self.counts[entry_hash] = new_count
+        if self.min_count is None or new_count < self.min_count:
+            self.min_count = new_count
+
+    def add(self, entry_hash):
+        if entry_hash not in self.counts:
+            self._move(entry_hash, None, 1)
+
+    def access(self, entry_hash):
+        old_count = self.counts.get(entry_hash)
+        if old_count is None:
+            self._move(entry_hash, None, 1)
+        else:
+            self._move(entry_hash, old_count, old_count + 1)
+
+    def discard(self, entry_hash):
+        count = self.counts.pop(entry_hash, None)
+        if count is not None:
+            bucket = self.buckets[count]
+            del bucket[entry_hash]
+            if not bucket:
+                del self.buckets[count]
+                if self.min_count == count:
+                    self.min_count = None
+
+    def get_eviction(self):
+        if not self.counts:
+            return None
+        if self.min_count is None:
+            self.min_count = min(self.buckets.keys())
+        for entry_hash in self.buckets[self.min_count]:
+            return entry_hash
+        return None
+
+    def clear(self):
+        self.counts.clear()
+        self.buckets.clear()
+        self.min_count = None
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, entry_hash):
+        return entry_hash in self.counts
+
+    def __iter__(self):
+        return iter(list(self.counts))
+
+
+eviction_engine_classes = {
+    'lru': LRUEvictionEngine,
+    'fifo': FIFOEvictionEngine,
+    'lfu': LFUEvictionEngine,
+}
+
+
+def create_eviction_engine(max_size_policy):
+    """create eviction engine for given max_size_policy name"""
+    try:
+        EngineClass = eviction_engine_classes[max_size_policy]
+    except KeyError:
+        raise Exception('max_size_policy: ' + str(max_size_policy))
+    return EngineClass()
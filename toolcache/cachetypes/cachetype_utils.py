@@ -5,8 +5,11 @@ import typing
 from .. import spec
 from . import base_cache
 from . import disk_cache
+from . import log_cache
 from . import memory_cache
 from . import null_cache
+from . import sqlite_cache
+from . import tiered_cache
 
 
 def get_cache_class(
@@ -22,13 +25,20 @@ def get_cache_class(
             return memory_cache.MemoryCache
         elif cachetype == 'null':
             return null_cache.NullCache
+        elif cachetype == 'sqlite':
+            return sqlite_cache.SQLiteCache
+        elif cachetype == 'log':
+            return log_cache.LogCache
+        elif cachetype == 'tiered':
+            return tiered_cache.TieredCache
     elif inspect.isclass(cachetype) and issubclass(
         cachetype, base_cache.BaseCache
     ):
         return cachetype
 
     raise Exception(
-        'cachetype should be \'disk\', \'memory\''
+        'cachetype should be \'disk\', \'memory\', \'null\', \'sqlite\''
+        ', \'log\', \'tiered\''
         ', or a class that inherits from BaseCache'
         ', instead got: ' + str(cachetype)
     )
@@ -5,12 +5,25 @@ import time
 
 
 from . import base_cache
+from .. import serialize_utils
+
+
+_hex_chars = frozenset('0123456789abcdef')
 
 
 class DiskCache(base_cache.BaseCache):
-    """a DiskCache is a cache that saves its entries to disk as files"""
+    """a DiskCache is a cache that saves its entries to disk as files
+
+    entries are written to a temporary file and then atomically renamed, so
+    readers never observe a partially written entry
+    """
+
+    _async_offload = True
+    _weighs_stored_entries = True
 
     suffix = '.pycache'
+    lock_dirname = '.locks'
+    metadata_index_filename = '.metadata.sqlite'
 
     def __init__(
         self,
@@ -18,6 +31,12 @@ class DiskCache(base_cache.BaseCache):
         file_format=None,
         f_disk_save=None,
         f_disk_load=None,
+        shard_levels=0,
+        shard_width=2,
+        compression=None,
+        compression_threshold=64 * 1024,
+        memory_map=False,
+        metadata_index=False,
         **super_kwargs
     ):
         """initialize a DiskCache
@@ -27,11 +46,31 @@ class DiskCache(base_cache.BaseCache):
         ## Disk Cache Options
         - cache_dir: str of path where cache should reside, if None use tmpdir
         - file_format: str name of format used to save data
-            - one of 'pickle' or 'json'
+            - one of 'pickle', 'json', 'msgpack', or a name registered with
+              serialize_utils.register_serializer()
+            - files record their format, so entries saved in other formats
+              can still be loaded
         - f_disk_save: custom function for saving data to disk
             - function should take `entry_path` and `entry_data` as arguments
         - f_disk_load: custom function for loading data from disk
             - function should take `entry_path` as an argument
+        - shard_levels: int number of nested subdirectories to spread entries
+            - with 2 levels, entries are stored as `ab/cd/<hash>.pycache`
+            - use migrate_cache_dir_layout() to convert existing directories
+        - shard_width: int number of hash characters in each subdirectory name
+        - compression: str name of compression, one of 'zstd', 'lz4', 'zlib',
+          or None, 'zstd' and 'lz4' require the zstandard and lz4 packages
+        - compression_threshold: int minimum size in bytes of serialized
+          entries that are compressed
+        - memory_map: bool of whether to load entries using mmap, so that
+          numpy arrays and other pickle buffers of uncompressed entries are
+          loaded as read-only views of the file instead of being copied
+        - metadata_index: bool of whether to persist creation times, access
+          times, access counts, and sizes of entries in a sqlite index, so
+          that opening the cache does not scan and stat every entry file
+            - the index is rebuilt from file metadata if it is missing, or if
+              a process using it exited without closing it
+            - every cache instance using cache_dir should use the index
         - super_kwargs: kwargs passed on to BaseCache.__init__()
         """
 
@@ -42,14 +81,40 @@ class DiskCache(base_cache.BaseCache):
             cache_dir = tempfile.mkdtemp()
         self.cache_dir = cache_dir
 
+        # determine directory layout
+        if shard_levels < 0 or shard_width < 1:
+            raise Exception('invalid shard_levels or shard_width')
+        self.shard_levels = shard_levels
+        self.shard_width = shard_width
+
+        # build index of entries currently on disk, reading their metadata
+        # from the metadata index, or keeping the scanned directory entries so
+        # that metadata is read with one stat per file
+        self._known_dirs = set()
+        if metadata_index:
+            entry_metadata = self._open_metadata_index()
+            self._entry_index = set(entry_metadata.keys())
+        else:
+            self._metadata_index = None
+            entry_metadata = None
+            dir_entries = self._scan_dir_entries()
+            self._index_dir_entries(dir_entries)
+
         # determine file format
         if file_format is None:
             file_format = 'pickle'
-        if file_format not in ['json', 'pickle']:
+        if file_format not in serialize_utils.get_serializer_names():
             if f_disk_load is None or f_disk_save is None:
                 raise Exception('unsupported file format: ' + str(file_format))
         self.file_format = file_format
 
+        # determine compression
+        if compression is not None:
+            serialize_utils.get_compressor(compression)
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.memory_map = memory_map
+
         # set save data function
         if f_disk_save is not None:
             self.f_disk_save = f_disk_save
@@ -64,69 +129,365 @@ class DiskCache(base_cache.BaseCache):
 
         # set hash_mode
         hash_mode = super_kwargs.get('hash_mode')
-        if hash_mode is not None and hash_mode != 'json_digest':
-            raise Exception('need custom f_hash hash_mode=\'json_digest\'')
+        if hash_mode is not None and hash_mode not in ['json_digest', 'fast']:
+            raise Exception(
+                'need custom f_hash or hash_mode in '
+                + '[\'json_digest\', \'fast\']'
+            )
         elif super_kwargs.get('f_hash') is None:
             super_kwargs['hash_mode'] = 'json_digest'
 
         # run BaseCache init
         super().__init__(**super_kwargs)
 
-        # read access times and creation times from disk
-        for entry_hash in self.get_all_entry_hashes():
-            if self.track_access_times:
-                age = self.get_entry_access_time_from_disk(entry_hash)
-                self.entry_creation_times[entry_hash] = age
-            if self.track_creation_times:
-                age = self.get_entry_create_time_from_disk(entry_hash)
-                self.entry_creation_times[entry_hash] = age
+        # loads are recorded only if access times or counts are used
+        self._record_loads = (
+            self.track_access_times
+            or (
+                self.eviction_engine is not None
+                and self.max_size_policy != 'fifo'
+            )
+            or (self._metadata_index is not None and self.track_access_counts)
+        )
+
+        # read metadata of existing entries
+        with self.lock:
+            if entry_metadata is None:
+                if self._needs_entry_metadata():
+                    entry_metadata = self._read_file_metadata(dir_entries)
+                else:
+                    entry_metadata = {}
+            for entry_hash, metadata in entry_metadata.items():
+                creation_time, access_time, access_count, size = metadata
+                if self.track_access_times:
+                    self.entry_access_times[entry_hash] = access_time
+                if self.track_access_counts:
+                    self.entry_access_counts[entry_hash] = access_count
+                if self.track_creation_times:
+                    self.entry_creation_times[entry_hash] = creation_time
+                    self._track_expiry(entry_hash)
+
+        # register existing entries with eviction engine, oldest first
+        if self.eviction_engine is not None:
+            if self.max_size_policy == 'fifo':
+                entry_times = [
+                    (metadata[0], entry_hash)
+                    for entry_hash, metadata in entry_metadata.items()
+                ]
+            else:
+                entry_times = [
+                    (metadata[1], entry_hash)
+                    for entry_hash, metadata in entry_metadata.items()
+                ]
+            for _, entry_hash in sorted(entry_times):
+                self.eviction_engine.add(entry_hash)
+
+        # register sizes of existing entries
+        if self.entry_weights is not None:
+            if self.f_weigh is None:
+                unsized = []
+                for entry_hash, metadata in entry_metadata.items():
+                    if metadata[3] is None:
+                        unsized.append(entry_hash)
+                    else:
+                        self._set_entry_weight(entry_hash, metadata[3])
+                self._track_stored_weights(unsized)
+            else:
+                self._track_stored_weights(entry_metadata.keys())
+
+    def _open_metadata_index(self):
+        """open metadata index, rebuilding it from entry files if needed
+
+        ## Returns
+        - dict mapping entry names to tuples of (creation_time, access_time,
+          access_count, size)
+        """
+        import weakref
+
+        from .. import index_utils
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._metadata_index = index_utils.MetadataIndex(
+            path=os.path.join(self.cache_dir, self.metadata_index_filename),
+            layout={
+                'suffix': self.suffix,
+                'shard_levels': self.shard_levels,
+                'shard_width': self.shard_width,
+            },
+        )
+        weakref.finalize(self, self._metadata_index.close)
+        entry_metadata = self._metadata_index.open(
+            ['creation_time', 'access_time', 'access_count', 'size']
+        )
+        if entry_metadata is None:
+            entry_metadata = self._read_file_metadata(self._scan_dir_entries())
+            self._metadata_index.rebuild(entry_metadata)
+        return entry_metadata
+
+    def _needs_entry_metadata(self):
+        """return whether metadata of existing entries is used"""
+        return (
+            self.track_access_times
+            or self.track_creation_times
+            or self.eviction_engine is not None
+            or self.entry_weights is not None
+        )
+
+    def _read_file_metadata(self, dir_entries):
+        """return dict mapping entry names to metadata of scanned files
+
+        metadata tuples are (creation_time, access_time, access_count, size),
+        each file is stat'ed once, and files removed since being scanned are
+        dropped from the entry index
+
+        modification time is used as creation time, because entry files are
+        only modified when saved, and access time is set when entries are
+        loaded, change time cannot be used since setting access time changes it
+        """
+        len_suffix = len(self.suffix)
+        entry_metadata = {}
+        for dir_entry in dir_entries:
+            entry_name = dir_entry.name[:-len_suffix]
+            try:
+                stat = dir_entry.stat()
+            except FileNotFoundError:
+                self._entry_index.discard(entry_name)
+                continue
+            entry_metadata[entry_name] = (
+                stat.st_mtime,
+                max(stat.st_atime, stat.st_mtime),
+                0,
+                stat.st_size,
+            )
+        return entry_metadata
+
+    def close(self):
+        """write pending updates of metadata index and close it"""
+        if self._metadata_index is not None:
+            self._metadata_index.close()
 
     #
     # # crud operations
     #
 
+    def _initialize_context_lock(self, safety):
+        """initialize locks, using lock files if safety is 'process'
+
+        with process safety, writes to each shard of entries are serialized
+        across all processes using the cache directory, and whole-cache
+        operations like delete_all_entries() hold a cache-wide file lock
+        """
+        if safety == 'process':
+            import threading
+
+            from .. import lock_utils
+
+            lock_dir = os.path.join(self.cache_dir, self.lock_dirname)
+            self.lock = threading.RLock()
+            self.process_lock = lock_utils.FileLock(
+                os.path.join(lock_dir, 'cache.lock')
+            )
+            self._entry_locks = lock_utils.ShardedFileLocks(lock_dir)
+        else:
+            super()._initialize_context_lock(safety=safety)
+            self.process_lock = None
+            self._entry_locks = None
+
+    def _get_entry_lock(self, entry_name):
+        """return lock that serializes writes of an entry across processes"""
+        if self._entry_locks is None:
+            import contextlib
+
+            return contextlib.nullcontext()
+        else:
+            return self._entry_locks.get_lock(entry_name)
+
     def _save(self, entry_hash, entry_data):
 
-        # determine save path
         cache_path = self._get_cache_path(entry_hash)
+        self._make_parent_dir(cache_path)
+        entry_name = self._write_entry(entry_hash, cache_path, entry_data)
+        if self._metadata_index is not None:
+            self._metadata_index.record_saves([entry_name])
+
+    def _save_many(self, entries):
+
+        entry_names = []
+        for entry_hash, entry_data in entries.items():
+            cache_path = self._get_cache_path(entry_hash)
+            self._make_parent_dir(cache_path)
+            entry_names.append(
+                self._write_entry(entry_hash, cache_path, entry_data)
+            )
+        if self._metadata_index is not None:
+            self._metadata_index.record_saves(entry_names)
+
+    def _make_parent_dir(self, cache_path):
+        """create parent directory of cache_path if not already created"""
         parent_dir = os.path.dirname(cache_path)
-        if not os.path.isdir(parent_dir):
-            os.makedirs(parent_dir)
+        if parent_dir not in self._known_dirs:
+            os.makedirs(parent_dir, exist_ok=True)
+            self._known_dirs.add(parent_dir)
+
+    def _write_entry(self, entry_hash, cache_path, entry_data):
+        """write entry to cache_path, whose parent directory should exist
 
-        # save data
-        self.f_disk_save(cache_path=cache_path, entry_data=entry_data)
+        the write itself sets the modification time used as access time
 
-        # touch file so that modification time is proxy for access time
-        import pathlib
+        ## Returns
+        - str name of entry
+        """
 
-        pathlib.Path(cache_path).touch()
+        # save data to temporary file, then atomically move into place
+        entry_name = self._get_entry_name(entry_hash)
+        tmp_path = self._get_tmp_path(cache_path)
+        with self._get_entry_lock(entry_name):
+            try:
+                try:
+                    self.f_disk_save(
+                        cache_path=tmp_path, entry_data=entry_data
+                    )
+                except FileNotFoundError:
+                    # parent directory was removed since it was created
+                    self._known_dirs.discard(os.path.dirname(cache_path))
+                    self._make_parent_dir(cache_path)
+                    self.f_disk_save(
+                        cache_path=tmp_path, entry_data=entry_data
+                    )
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except FileNotFoundError:
+                    pass
+                raise
+        self._entry_index.add(entry_name)
+        return entry_name
 
     def _exists(self, entry_hash):
         cache_path = self._get_cache_path(entry_hash)
-        return os.path.isfile(cache_path)
+        exists = os.path.isfile(cache_path)
+
+        # keep index consistent with entries changed by other processes
+        if exists:
+            self._index_found_entry(self._get_entry_name(entry_hash))
+        else:
+            self._index_missing_entry(self._get_entry_name(entry_hash))
+
+        return exists
+
+    def _index_found_entry(self, entry_name):
+        """add entry found on disk to index, if written by another instance"""
+        if entry_name not in self._entry_index:
+            self._entry_index.add(entry_name)
+            if self._metadata_index is not None:
+                self._metadata_index.record_saves([entry_name])
+
+    def _index_missing_entry(self, entry_name):
+        """remove entry missing from disk from index"""
+        if entry_name in self._entry_index:
+            self._entry_index.discard(entry_name)
+            if self._metadata_index is not None:
+                self._metadata_index.record_delete(entry_name)
 
     def _get_all(self):
+        return list(self._entry_index)
+
+    def _get_size(self):
+        return len(self._entry_index)
+
+    def _rescan(self):
+        self._known_dirs.clear()
+        dir_entries = self._scan_dir_entries()
+        self._index_dir_entries(dir_entries)
+        if self._metadata_index is not None:
+            self._metadata_index.rebuild(self._read_file_metadata(dir_entries))
+
+    def _index_dir_entries(self, dir_entries):
+        """rebuild entry index from scanned directory entries of entry files"""
         len_suffix = len(self.suffix)
-        all_entries = [
-            os.path.basename(path)[:-len_suffix]
-            for path in self._get_all_entry_paths()
-        ]
-        return all_entries
+        self._entry_index = {
+            dir_entry.name[:-len_suffix] for dir_entry in dir_entries
+        }
 
     def _load(self, entry_hash):
         cache_path = self._get_cache_path(entry_hash)
         return self.f_disk_load(cache_path=cache_path)
 
+    def _try_load(self, entry_hash, default):
+
+        # attempt load directly instead of checking existence beforehand
+        entry_name = self._get_entry_name(entry_hash)
+        try:
+            entry_data = self._load(entry_hash)
+        except FileNotFoundError:
+            self._index_missing_entry(entry_name)
+            return default
+        except Exception:
+            if os.path.isfile(self._get_cache_path(entry_hash)):
+                raise
+            self._index_missing_entry(entry_name)
+            return default
+        self._index_found_entry(entry_name)
+
+        # record access in metadata index, or set access time of file while
+        # keeping its modification time, which is its creation time
+        if self._record_loads:
+            if self._metadata_index is not None:
+                self._metadata_index.record_access(entry_name)
+            else:
+                self._touch_entry_file(entry_hash)
+
+        return entry_data
+
+    def _touch_entry_file(self, entry_hash):
+        """set access time of entry file to now, keeping modification time"""
+        cache_path = self._get_cache_path(entry_hash)
+        creation_times = self.entry_creation_times
+        try:
+            if creation_times is not None and entry_hash in creation_times:
+                modification_time = creation_times[entry_hash]
+            else:
+                modification_time = os.stat(cache_path).st_mtime
+            os.utime(cache_path, (time.time(), modification_time))
+        except FileNotFoundError:
+            pass
+
+    def _weigh(self, entry_hash, entry_data):
+        size = os.path.getsize(self._get_cache_path(entry_hash))
+        if self._metadata_index is not None:
+            entry_name = self._get_entry_name(entry_hash)
+            self._metadata_index.record_size(entry_name, size)
+        return size
+
     def _delete(self, entry_hash):
+        entry_name = self._get_entry_name(entry_hash)
         cache_path = self._get_cache_path(entry_hash=entry_hash)
-        if os.path.isfile(cache_path):
-            os.remove(cache_path)
+        with self._get_entry_lock(entry_name):
+            try:
+                os.remove(cache_path)
+            except FileNotFoundError:
+                pass
+        self._entry_index.discard(entry_name)
+        if self._metadata_index is not None:
+            self._metadata_index.record_delete(entry_name)
 
     def _delete_all(self):
-        cache_paths = self._get_all_entry_paths()
-        for cache_path in cache_paths:
-            if os.path.isfile(cache_path):
-                os.remove(cache_path)
+        if self.process_lock is None:
+            import contextlib
+
+            process_lock = contextlib.nullcontext()
+        else:
+            process_lock = self.process_lock
+        with process_lock:
+            for cache_path in self._get_all_entry_paths():
+                try:
+                    os.remove(cache_path)
+                except FileNotFoundError:
+                    pass
+        self._entry_index.clear()
+        if self._metadata_index is not None:
+            self._metadata_index.clear()
 
     #
     # # disk io methods
@@ -139,51 +500,44 @@ class DiskCache(base_cache.BaseCache):
         - cache_path: str path at which to save entry_data
         - entry_data: data to save at cache_path
         """
-        if self.file_format == 'pickle':
-            import pickle
-
-            with open(cache_path, 'wb') as file:
-                pickle.dump(entry_data, file)
-        elif self.file_format == 'json':
-            json = self._get_json_module()
-
-            with open(cache_path, 'wb') as file:
-                file.write(json.dumps(entry_data))
-        else:
-            raise Exception('unknown file format: ' + str(self.file_format))
+        chunks = serialize_utils.serialize(
+            entry_data,
+            file_format=self.file_format,
+            compression=self.compression,
+            threshold=self.compression_threshold,
+        )
+        with open(cache_path, 'wb') as file:
+            file.writelines(chunks)
 
     def _default_f_disk_load(self, cache_path):
-        """default function for loading entries from disk"""
-        if self.file_format == 'pickle':
-            import pickle
-
-            with open(cache_path, 'rb') as file:
-                return pickle.load(file)
-        elif self.file_format == 'json':
-            json = self._get_json_module()
+        """default function for loading entries from disk
 
-            with open(cache_path, 'r') as file:
-                return json.loads(file.read())
-        else:
-            raise Exception('unknown file format: ' + str(self.file_format))
-
-    def _get_json_module(self):
-        try:
-            import orjson as json
-        except ImportError:
-            import json  # type: ignore
-        return json
+        the file is read into a single writable buffer that loaded arrays can
+        use without copies, or is mapped into memory if using memory_map
+        """
+        with open(cache_path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if self.memory_map and size > 0:
+                import mmap
+
+                # the map stays open until the loaded views are released
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = bytearray(size)
+                n_bytes = file.readinto(data)
+                if n_bytes < size:
+                    del data[n_bytes:]
+        return serialize_utils.deserialize(data)
 
     #
     # # introspection
     #
 
-    def _print_save_summary(self, entry_hash, entry_data):
+    def _print_save_summary(self, entry_hash):
         """print summary of entry being saved to disk
 
         ## Inputs
         - entry_hash: hash of entry to be saved
-        - entry_data: data of entry to be saved
         """
         print('[cache]', self.cache_name, 'saving to cache', self.cache_dir)
 
@@ -194,41 +548,189 @@ class DiskCache(base_cache.BaseCache):
     # # path processing methods
     #
 
-    def _get_cache_path(self, entry_hash):
-        """return file path associated with a particular entry_hash"""
+    def _get_entry_name(self, entry_hash):
+        """return str name of entry used in its file name and in entry index"""
         if isinstance(entry_hash, tuple):
             entry_hash = '__'.join(str(value) for value in entry_hash)
-        return os.path.join(self.cache_dir, str(entry_hash) + self.suffix)
+        return str(entry_hash)
+
+    def _get_cache_path(self, entry_hash):
+        """return file path associated with a particular entry_hash"""
+        entry_name = self._get_entry_name(entry_hash)
+        return _get_entry_path(
+            cache_dir=self.cache_dir,
+            entry_name=entry_name,
+            suffix=self.suffix,
+            shard_levels=self.shard_levels,
+            shard_width=self.shard_width,
+        )
+
+    def _get_tmp_path(self, cache_path):
+        """return unique temporary path used while writing an entry"""
+        import threading
+
+        directory, filename = os.path.split(cache_path)
+        tmp_filename = (
+            '.'
+            + filename
+            + '.'
+            + str(os.getpid())
+            + '.'
+            + str(threading.get_ident())
+            + '.tmp'
+        )
+        return os.path.join(directory, tmp_filename)
 
     def _get_all_entry_paths(self):
         """return list of file paths corresponding to entries in the cache"""
-        paths = []
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith(self.suffix):
-                cache_path = os.path.join(self.cache_dir, filename)
-                paths.append(cache_path)
-        return paths
+        return [dir_entry.path for dir_entry in self._scan_dir_entries()]
+
+    def _scan_dir_entries(self):
+        """return list of os.DirEntry objects of entry files in the cache"""
+        return _scan_entry_files(
+            directory=self.cache_dir,
+            suffix=self.suffix,
+            depth=self.shard_levels,
+        )
 
     #
     # # file-related time methods
     #
 
     def get_entry_age_from_disk(self, entry_hash):
-        """use file creation time to determine age of cache entry"""
+        """use file modification time to determine age of cache entry"""
         cache_path = self._get_cache_path(entry_hash)
-        return time.time() - os.path.getctime(cache_path)
+        return time.time() - os.path.getmtime(cache_path)
 
     def get_entry_access_time_from_disk(self, entry_hash):
-        """use file update time to determine age of cache entry
+        """use file access time to determine access time of cache entry
 
-        file update time is updated every time file is accessed
-        - this allows file update time to be a proxy for access time
+        file access time is set when entry is loaded, if loads are recorded
+        - modification time is kept, so it remains the entry's creation time
         """
         cache_path = self._get_cache_path(entry_hash)
-        return os.path.getmtime(cache_path)
+        stat = os.stat(cache_path)
+        return max(stat.st_atime, stat.st_mtime)
 
     def get_entry_creation_time_from_disk(self, entry_hash):
-        """use file creation time to determine creation time of cache entry"""
+        """use file modification time to determine creation time of entry"""
         cache_path = self._get_cache_path(entry_hash)
-        return os.path.getctime(cache_path)
+        return os.path.getmtime(cache_path)
+
 
+#
+# # directory layout functions
+#
+
+
+def _get_shard_prefix(entry_name, n_chars):
+    """return hex chars used to choose the shard directories of an entry
+
+    hashes computed using the json_digest hash mode are already md5 hex
+    digests and are used directly, other names are md5 hashed first
+    """
+    prefix = entry_name[:n_chars]
+    if len(prefix) == n_chars and _hex_chars.issuperset(prefix):
+        return prefix
+    else:
+        import hashlib
+
+        return hashlib.md5(entry_name.encode()).hexdigest()[:n_chars]
+
+
+def _get_entry_path(cache_dir, entry_name, suffix, shard_levels, shard_width):
+    """return file path of entry under a given directory layout"""
+    if shard_levels == 0:
+        return os.path.join(cache_dir, entry_name + suffix)
+    prefix = _get_shard_prefix(entry_name, shard_levels * shard_width)
+    shard_dirs = [
+        prefix[level * shard_width : (level + 1) * shard_width]
+        for level in range(shard_levels)
+    ]
+    return os.path.join(cache_dir, *shard_dirs, entry_name + suffix)
+
+
+def _scan_entry_paths(directory, suffix, depth):
+    """return paths of entry files stored depth subdirectories below directory
+
+    ## Inputs
+    - directory: str path of directory to scan
+    - suffix: str suffix of entry files
+    - depth: int number of shard directory levels below directory
+    """
+    return [
+        dir_entry.path
+        for dir_entry in _scan_entry_files(directory, suffix, depth)
+    ]
+
+
+def _scan_entry_files(directory, suffix, depth):
+    """return os.DirEntry objects of entry files below directory
+
+    the returned entries cache file metadata, so each file can be stat'ed at
+    most once, see _scan_entry_paths() for inputs
+    """
+    dir_entries = []
+    try:
+        iterator = os.scandir(directory)
+    except FileNotFoundError:
+        return dir_entries
+    with iterator:
+        for dir_entry in iterator:
+            if depth == 0:
+                if dir_entry.name.endswith(suffix) and dir_entry.is_file():
+                    dir_entries.append(dir_entry)
+            elif dir_entry.is_dir():
+                dir_entries.extend(
+                    _scan_entry_files(dir_entry.path, suffix, depth - 1)
+                )
+    return dir_entries
+
+
+def migrate_cache_dir_layout(
+    cache_dir,
+    shard_levels,
+    shard_width=2,
+    old_shard_levels=0,
+    suffix=DiskCache.suffix,
+):
+    """move entries of a cache directory into a different directory layout
+
+    for example, convert a flat directory of `<hash>.pycache` files created by
+    older versions into the `ab/cd/<hash>.pycache` layout used by a DiskCache
+    created with `shard_levels=2`
+
+    ## Inputs
+    - cache_dir: str path of cache directory
+    - shard_levels: int number of shard directory levels of new layout
+    - shard_width: int number of hash characters in each shard directory name
+    - old_shard_levels: int number of shard directory levels of old layout
+    - suffix: str suffix of entry files
+
+    ## Returns
+    - int number of entries moved
+    """
+    n_moved = 0
+    old_paths = _scan_entry_paths(cache_dir, suffix, old_shard_levels)
+    for old_path in old_paths:
+        entry_name = os.path.basename(old_path)[: -len(suffix)]
+        new_path = _get_entry_path(
+            cache_dir=cache_dir,
+            entry_name=entry_name,
+            suffix=suffix,
+            shard_levels=shard_levels,
+            shard_width=shard_width,
+        )
+        if new_path == old_path:
+            continue
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        os.replace(old_path, new_path)
+        n_moved += 1
+
+    # remove old shard directories that are now empty
+    if old_shard_levels > 0:
+        for root, dirnames, filenames in os.walk(cache_dir, topdown=False):
+            if root != cache_dir and len(os.listdir(root)) == 0:
+                os.rmdir(root)
+
+    return n_moved
@@ -0,0 +1,583 @@
+"""class specifying a cache that appends entries to memory-mapped log segments
+
+each record of a segment file has layout `header | key | payload`
+- header: magic, flags, creation time, key length, payload length
+- key: utf8 encoded entry name
+- payload: entry data, serialized according to flags
+
+records are never modified in place, deletes append a tombstone record and
+compaction rewrites the live records of segments that are mostly dead
+"""
+
+import os
+import pickle
+import struct
+import time
+
+from .. import serialize_utils
+from . import base_cache
+
+
+_header = struct.Struct('<4sBdIQ')
+_magic = b'TCLR'
+
+# record flags
+_PICKLE = 0
+_BYTES = 1
+_TOMBSTONE = 2
+_PICKLE_BUFFERS = 3
+
+_index_version = 1
+
+
+class LogCache(base_cache.BaseCache):
+    """a LogCache is a cache that appends its entries to log segment files
+
+    an in-memory index maps each entry to (segment, offset, length), entries are
+    read through mmap, and bytes or out-of-band pickle buffers (e.g. numpy
+    arrays) can be returned as zero-copy views of the mapped segment
+    """
+
+    _async_offload = True
+    _weighs_stored_entries = True
+
+    segment_prefix = 'segment_'
+    segment_suffix = '.log'
+    index_filename = 'index.pickle'
+
+    def __init__(
+        self,
+        cache_dir=None,
+        segment_size=64 * 1024 * 1024,
+        zero_copy=False,
+        compaction_threshold=0.5,
+        **super_kwargs
+    ):
+        """initialize a LogCache
+
+        for complete list of cache configuration options refer to BaseCache
+
+        ## Log Cache Options
+        - cache_dir: str of path where segments reside, if None use tmpdir
+        - segment_size: int bytes after which a new segment file is started
+        - zero_copy: bool of whether to return bytes payloads and out-of-band
+          pickle buffers as read-only views of the mapped segment files,
+          by default they are copied so that loads return the saved types
+        - compaction_threshold: float fraction of dead bytes in a segment that
+          triggers compaction, None to only compact when compact() is called
+        - super_kwargs: kwargs passed on to BaseCache.__init__()
+        """
+        if super_kwargs.get('safety') == 'process':
+            raise Exception(
+                'LogCache does not support process safety, each instance holds'
+                ' its own index of the segment files'
+            )
+
+        # determine cache directory
+        if cache_dir is None:
+            import tempfile
+
+            cache_dir = tempfile.mkdtemp()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.segment_size = segment_size
+        self.zero_copy = zero_copy
+        self.compaction_threshold = compaction_threshold
+
+        # state of segments
+        self._index = {}
+        self._segments = {}
+        self._maps = {}
+        self._active_segment = None
+        self._active_file = None
+        self._load_index()
+        self._register_exit_flush()
+
+        # set hash_mode
+        hash_mode = super_kwargs.get('hash_mode')
+        if hash_mode is not None and hash_mode not in ['json_digest', 'fast']:
+            raise Exception(
+                'need custom f_hash or hash_mode in [\'json_digest\', \'fast\']'
+            )
+        elif super_kwargs.get('f_hash') is None:
+            super_kwargs['hash_mode'] = 'json_digest'
+
+        # run BaseCache init
+        super().__init__(**super_kwargs)
+
+        # register creation times of existing entries, oldest first
+        with self.lock:
+            entries = sorted(self._index.items(), key=lambda item: item[1][4])
+            for entry_name, (_, _, _, _, creation_time) in entries:
+                if self.track_creation_times:
+                    self.entry_creation_times[entry_name] = creation_time
+                    self._track_expiry(entry_name)
+                if self.track_access_times:
+                    self.entry_access_times[entry_name] = creation_time
+                if self.eviction_engine is not None:
+                    self.eviction_engine.add(entry_name)
+            if self.entry_weights is not None:
+                self._track_stored_weights(name for name, _ in entries)
+
+    #
+    # # crud operations
+    #
+
+    def _save(self, entry_hash, entry_data):
+        entry_name = self._get_entry_name(entry_hash)
+
+        # serialize data
+        if isinstance(entry_data, bytes):
+            flags = _BYTES
+            chunks = [entry_data]
+        elif pickle.HIGHEST_PROTOCOL < 5:
+            flags = _PICKLE
+            chunks = [pickle.dumps(entry_data, protocol=pickle.HIGHEST_PROTOCOL)]
+        else:
+            buffers = []
+            pickled = pickle.dumps(
+                entry_data, protocol=5, buffer_callback=buffers.append
+            )
+            if len(buffers) == 0:
+                flags = _PICKLE
+                chunks = [pickled]
+            else:
+                flags = _PICKLE_BUFFERS
+                chunks = serialize_utils.get_pickle_buffer_chunks(
+                    pickled, buffers, offset=self._get_payload_offset(entry_name)
+                )
+
+        self._append_record(entry_name, flags, chunks)
+
+    def _exists(self, entry_hash):
+        return self._get_entry_name(entry_hash) in self._index
+
+    def _get_all(self):
+        return list(self._index.keys())
+
+    def _get_size(self):
+        return len(self._index)
+
+    def _rescan(self):
+        self._close_maps()
+        self._rebuild_index()
+
+    def _load(self, entry_hash):
+        entry_name = self._get_entry_name(entry_hash)
+        segment, offset, length, flags, _ = self._index[entry_name]
+        view = self._get_view(segment, offset, length)
+        if flags == _BYTES:
+            if self.zero_copy:
+                return view
+            else:
+                return bytes(view)
+        elif flags == _PICKLE:
+            return pickle.loads(view)
+        elif flags == _PICKLE_BUFFERS:
+            return serialize_utils.load_pickle_buffers(
+                view, offset, copy=not self.zero_copy
+            )
+        else:
+            raise Exception('unknown record flags: ' + str(flags))
+
+    def _weigh(self, entry_hash, entry_data):
+        return self._index[self._get_entry_name(entry_hash)][2]
+
+    def _delete(self, entry_hash):
+        entry_name = self._get_entry_name(entry_hash)
+        if entry_name in self._index:
+            self._append_record(entry_name, _TOMBSTONE, [])
+            self._maybe_compact()
+
+    def _delete_all(self):
+        self._close_file()
+        self._close_maps()
+        for segment in list(self._segments.keys()):
+            os.remove(self._get_segment_path(segment))
+        self._index = {}
+        self._segments = {}
+        self._active_segment = None
+        self.flush()
+
+    #
+    # # record io
+    #
+
+    def _get_entry_name(self, entry_hash):
+        """return str name of entry used as key of records"""
+        if isinstance(entry_hash, tuple):
+            entry_hash = '__'.join(str(value) for value in entry_hash)
+        return str(entry_hash)
+
+    def _append_record(self, entry_name, flags, chunks, creation_time=None):
+        """append record to active segment and update index"""
+        key = entry_name.encode()
+        if creation_time is None:
+            creation_time = time.time()
+
+        offset = self._get_payload_offset(entry_name)
+        segment = self._active_segment
+        segment_info = self._segments[segment]
+        length = sum(memoryview(chunk).nbytes for chunk in chunks)
+
+        # write record
+        file = self._active_file
+        file.write(_header.pack(_magic, flags, creation_time, len(key), length))
+        file.write(key)
+        for chunk in chunks:
+            file.write(chunk)
+        file.flush()
+        record_size = _header.size + len(key) + length
+        segment_info['size'] += record_size
+
+        # update index
+        old = self._index.pop(entry_name, None)
+        if old is not None:
+            self._segments[old[0]]['dead'] += _header.size + len(key) + old[2]
+        if flags == _TOMBSTONE:
+            segment_info['dead'] += record_size
+        else:
+            self._index[entry_name] = (
+                segment,
+                offset,
+                length,
+                flags,
+                creation_time,
+            )
+
+    def _get_payload_offset(self, entry_name):
+        """return offset in active segment of payload of next record of entry
+
+        a new segment is started if the active segment is full, so that
+        payloads can be serialized for the offset they will be written at
+        """
+        if (
+            self._active_segment is None
+            or self._segments[self._active_segment]['size'] >= self.segment_size
+        ):
+            self._start_segment()
+        segment_size = self._segments[self._active_segment]['size']
+        return segment_size + _header.size + len(entry_name.encode())
+
+    def _get_view(self, segment, offset, length):
+        """return memoryview of region of a segment file"""
+        import mmap
+
+        segment_map = self._maps.get(segment)
+        if segment_map is None or len(segment_map) < offset + length:
+            path = self._get_segment_path(segment)
+            with open(path, 'rb') as file:
+                segment_map = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            self._maps[segment] = segment_map
+        return memoryview(segment_map)[offset : offset + length]
+
+    #
+    # # segment management
+    #
+
+    def _get_segment_path(self, segment):
+        filename = self.segment_prefix + '%08d' % segment + self.segment_suffix
+        return os.path.join(self.cache_dir, filename)
+
+    def _start_segment(self):
+        """close active segment and start a new one"""
+        self._close_file()
+        if len(self._segments) == 0:
+            segment = 0
+        else:
+            segment = max(self._segments.keys()) + 1
+        self._segments[segment] = {'size': 0, 'dead': 0}
+        self._active_segment = segment
+        self._active_file = open(self._get_segment_path(segment), 'ab')
+
+    def _close_file(self):
+        if self._active_file is not None:
+            self._active_file.close()
+            self._active_file = None
+
+    def _close_maps(self, segments=None):
+        """close mmaps of segments, leaving any exported by zero-copy views"""
+        if segments is None:
+            segments = list(self._maps.keys())
+        for segment in segments:
+            segment_map = self._maps.pop(segment, None)
+            if segment_map is not None:
+                try:
+                    segment_map.close()
+                except BufferError:
+                    # views are still in use, map is closed when they are freed
+                    pass
+
+    def _maybe_compact(self):
+        """compact segments if they have accumulated enough dead records"""
+        if self.compaction_threshold is None:
+            return
+        for segment, segment_info in self._segments.items():
+            if (
+                segment != self._active_segment
+                and segment_info['dead']
+                >= self.compaction_threshold * segment_info['size']
+            ):
+                self.compact(min_dead_fraction=self.compaction_threshold)
+                return
+
+    def compact(self, min_dead_fraction=0.0):
+        """rewrite live records of mostly-dead segments, then remove segments
+
+        ## Inputs
+        - min_dead_fraction: float fraction of dead bytes a segment must have
+          in order to be compacted, 0.0 compacts every inactive segment
+
+        ## Returns
+        - int number of segments removed
+        """
+        with self.lock:
+            compacted = [
+                segment
+                for segment, segment_info in sorted(self._segments.items())
+                if segment != self._active_segment
+                and segment_info['size'] > 0
+                and segment_info['dead']
+                >= min_dead_fraction * segment_info['size']
+            ]
+            if len(compacted) == 0:
+                return 0
+
+            # group live records of compacted segments
+            live_records = {segment: [] for segment in compacted}
+            for entry_name, record in self._index.items():
+                if record[0] in live_records:
+                    live_records[record[0]].append((entry_name, record))
+
+            for segment in compacted:
+
+                # copy live records to active segment
+                for entry_name, record in live_records[segment]:
+                    _, offset, length, flags, creation_time = record
+                    view = self._get_view(segment, offset, length)
+                    data = bytes(view)
+                    del view
+                    self._copy_record(
+                        entry_name, flags, data, creation_time, offset
+                    )
+
+                # carry tombstones forward if older segments could resurrect
+                if segment != min(self._segments.keys()):
+                    for entry_name, flags in self._read_keys(segment):
+                        if flags == _TOMBSTONE and entry_name not in self._index:
+                            self._append_record(entry_name, _TOMBSTONE, [])
+
+                # remove segment
+                self._close_maps([segment])
+                os.remove(self._get_segment_path(segment))
+                del self._segments[segment]
+
+            self.flush()
+            return len(compacted)
+
+    def _copy_record(self, entry_name, flags, data, creation_time, old_offset):
+        """copy record to active segment, preserving its creation time"""
+        if flags == _PICKLE_BUFFERS:
+            # buffer alignment depends on offset, so records are re-serialized
+            entry_data = serialize_utils.load_pickle_buffers(
+                memoryview(data), old_offset
+            )
+            buffers = []
+            pickled = pickle.dumps(
+                entry_data, protocol=5, buffer_callback=buffers.append
+            )
+            chunks = serialize_utils.get_pickle_buffer_chunks(
+                pickled, buffers, offset=self._get_payload_offset(entry_name)
+            )
+        else:
+            chunks = [data]
+        self._append_record(entry_name, flags, chunks, creation_time)
+
+    def _read_keys(self, segment):
+        """yield (entry_name, flags) of each record of a segment"""
+        for entry_name, flags, _, _, _ in self._scan_segment(segment, 0):
+            yield entry_name, flags
+
+    def _scan_segment(self, segment, start):
+        """yield (entry_name, flags, offset, length, creation_time) of records
+
+        stops at the first incomplete or corrupt record, such as a record that
+        was partially written when a process crashed
+        """
+        path = self._get_segment_path(segment)
+        with open(path, 'rb') as file:
+            file.seek(start)
+            position = start
+            while True:
+                header = file.read(_header.size)
+                if len(header) < _header.size:
+                    break
+                magic, flags, creation_time, key_length, length = (
+                    _header.unpack(header)
+                )
+                if magic != _magic:
+                    break
+                key = file.read(key_length)
+                if len(key) < key_length:
+                    break
+                offset = position + _header.size + key_length
+                file.seek(length, os.SEEK_CUR)
+                if file.tell() > os.fstat(file.fileno()).st_size:
+                    break
+                position = offset + length
+                yield key.decode(), flags, offset, length, creation_time
+
+    #
+    # # persisted index
+    #
+
+    def flush(self):
+        """persist index so that future instances do not need a full scan"""
+        with self.lock:
+            index_data = {
+                'version': _index_version,
+                'segments': self._segments,
+                'entries': self._index,
+            }
+            path = os.path.join(self.cache_dir, self.index_filename)
+            tmp_path = path + '.tmp' + str(os.getpid())
+            with open(tmp_path, 'wb') as file:
+                pickle.dump(index_data, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+
+    def _register_exit_flush(self):
+        """persist index at interpreter exit if cache still exists"""
+        import atexit
+        import weakref
+
+        cache_ref = weakref.ref(self)
+
+        def flush_at_exit():
+            cache = cache_ref()
+            if cache is not None and os.path.isdir(cache.cache_dir):
+                cache.flush()
+
+        atexit.register(flush_at_exit)
+
+    def close(self):
+        """persist index and close all files"""
+        self.flush()
+        self._close_file()
+        self._close_maps()
+
+    def _list_segments(self):
+        """return sorted list of segment ids of segment files on disk"""
+        segments = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.startswith(self.segment_prefix) and filename.endswith(
+                self.segment_suffix
+            ):
+                number = filename[
+                    len(self.segment_prefix) : -len(self.segment_suffix)
+                ]
+                segments.append(int(number))
+        return sorted(segments)
+
+    def _load_index(self):
+        """load persisted index, replaying only records written after it"""
+        path = os.path.join(self.cache_dir, self.index_filename)
+        try:
+            with open(path, 'rb') as file:
+                index_data = pickle.load(file)
+            if index_data.get('version') != _index_version:
+                raise Exception('unknown index version')
+        except Exception:
+            self._rebuild_index()
+            return
+
+        # drop state of segments that no longer exist
+        on_disk = self._list_segments()
+        segments = {
+            segment: segment_info
+            for segment, segment_info in index_data['segments'].items()
+            if segment in on_disk
+        }
+        self._index = {
+            entry_name: record
+            for entry_name, record in index_data['entries'].items()
+            if record[0] in segments
+        }
+        self._segments = segments
+
+        # replay records appended after index was persisted
+        for segment in on_disk:
+            segment_info = self._segments.setdefault(
+                segment, {'size': 0, 'dead': 0}
+            )
+            start = segment_info['size']
+            actual_size = os.path.getsize(self._get_segment_path(segment))
+            if actual_size < start:
+                # segment was modified elsewhere, index cannot be trusted
+                self._rebuild_index()
+                return
+            elif actual_size > start:
+                self._replay_segment(segment, start)
+        self._resume_last_segment()
+
+    def _rebuild_index(self):
+        """rebuild index by scanning every segment"""
+        self._close_file()
+        self._index = {}
+        self._segments = {}
+        for segment in self._list_segments():
+            self._segments[segment] = {'size': 0, 'dead': 0}
+            self._replay_segment(segment, 0)
+        self._resume_last_segment()
+
+    def _replay_segment(self, segment, start):
+        """apply records of segment starting at start offset to index"""
+        segment_info = self._segments[segment]
+        end = start
+        for entry_name, flags, offset, length, creation_time in (
+            self._scan_segment(segment, start)
+        ):
+            record_size = _header.size + len(entry_name.encode()) + length
+            old = self._index.pop(entry_name, None)
+            if old is not None:
+                old_size = _header.size + len(entry_name.encode()) + old[2]
+                self._segments[old[0]]['dead'] += old_size
+            if flags == _TOMBSTONE:
+                segment_info['dead'] += record_size
+            else:
+                self._index[entry_name] = (
+                    segment,
+                    offset,
+                    length,
+                    flags,
+                    creation_time,
+                )
+            end = offset + length
+
+        # discard incomplete trailing record
+        path = self._get_segment_path(segment)
+        if os.path.getsize(path) > end:
+            with open(path, 'r+b') as file:
+                file.truncate(end)
+        segment_info['size'] = end
+
+    def _resume_last_segment(self):
+        """continue appending to last segment"""
+        self._close_file()
+        if len(self._segments) > 0:
+            segment = max(self._segments.keys())
+            self._active_segment = segment
+            self._active_file = open(self._get_segment_path(segment), 'ab')
+        else:
+            self._active_segment = None
+
+    #
+    # # introspection
+    #
+
+    def _print_save_summary(self, entry_hash):
+        print('[cache]', self.cache_name, 'saving to cache', self.cache_dir)
+
+    def _print_load_summary(self, entry_hash):
+        print('[cache]', self.cache_name, 'loading from cache', self.cache_dir)
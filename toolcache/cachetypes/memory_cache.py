@@ -6,7 +6,12 @@ from . import base_cache
 
 
 class MemoryCache(base_cache.BaseCache):
-    """a MemoryCache is a cache that stores its entries in a simple dict"""
+    """a MemoryCache is a cache that stores its entries in a simple dict
+
+    supports safety='striped', since individual dict operations are atomic
+    """
+
+    _supports_lock_striping = True
 
     def __init__(self, **super_kwargs):
         self.cache = {}
@@ -17,21 +22,56 @@ class MemoryCache(base_cache.BaseCache):
         if self.entry_creation_times is not None:
             self.entry_creation_times[entry_hash] = time.time()
 
+    def _save_many(self, entries):
+        self.cache.update(entries)
+        if self.entry_creation_times is not None:
+            self.entry_creation_times.update(dict.fromkeys(entries, time.time()))
+
     def _exists(self, entry_hash):
         return entry_hash in self.cache
 
     def _get_all(self):
         return list(self.cache.keys())
 
+    def _get_size(self):
+        return len(self.cache)
+
     def _load(self, entry_hash):
         if self.entry_access_times is not None:
             self.entry_access_times[entry_hash] = time.time()
         return self.cache[entry_hash]
 
+    def _load_many(self, entry_hashes):
+        cache = self.cache
+        entries = {
+            entry_hash: cache[entry_hash]
+            for entry_hash in entry_hashes
+            if entry_hash in cache
+        }
+        if self.entry_access_times is not None:
+            self.entry_access_times.update(dict.fromkeys(entries, time.time()))
+        return entries
+
     def _delete(self, entry_hash):
-        if entry_hash in self.cache:
-            del self.cache[entry_hash]
+        self.cache.pop(entry_hash, None)
 
     def _delete_all(self):
-        self.cache = {}
+        # clear in place, decorators can hold a reference to self.cache
+        self.cache.clear()
+
+    def _get_fast_hit_entries(self):
+        if (
+            self.ttl is not None
+            or self.max_size is not None
+            or self.max_bytes is not None
+            or self.single_flight
+            or self.negative_ttl is not None
+            or self.verbose
+            or self.safety == 'process'
+            or self.entry_access_times is not None
+            or self.entry_access_counts is not None
+            or type(self)._load is not MemoryCache._load
+        ):
+            return None
+        return self.cache
 
@@ -20,6 +20,9 @@ class NullCache(base_cache.BaseCache):
     def _exists(self, entry_hash):
         return False
 
+    def _get_all(self):
+        return []
+
     def _load(self, entry_hash):
         return None
 
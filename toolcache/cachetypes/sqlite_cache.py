@@ -0,0 +1,646 @@
+"""class specifying a cache that stores entries in a single sqlite file"""
+
+import contextlib
+import os
+import pickle
+import threading
+import time
+
+from . import base_cache
+from .base_cache import eviction_engines
+
+
+_eviction_orderings = {
+    'lru': 'access_time ASC',
+    'fifo': 'creation_time ASC',
+    'lfu': 'access_count ASC, access_time ASC',
+}
+
+# access updates are buffered and written in batches of this size
+_access_flush_size = 1000
+
+
+class SQLiteCache(base_cache.BaseCache):
+    """a SQLiteCache is a cache that saves its entries as rows of a sqlite db
+
+    entry data, creation times, access times, and access counts are stored in
+    indexed columns so that size queries and eviction are performed in sql
+
+    updates of access times and access counts are buffered in memory and
+    written in batches, before evictions, and when flush() or close() is called
+
+    creation times, access times, and access counts are not also tracked in
+    in-memory dicts, getters such as get_entry_creation_time() query the table
+    """
+
+    _async_offload = True
+    _weighs_stored_entries = True
+
+    def __init__(
+        self,
+        db_path=None,
+        table_name='entries',
+        journal_mode='wal',
+        **super_kwargs
+    ):
+        """initialize a SQLiteCache
+
+        for complete list of cache configuration options refer to BaseCache
+
+        ## SQLite Cache Options
+        - db_path: str of path of sqlite database file, if None use tmpdir
+        - table_name: str name of table used to store entries
+        - journal_mode: str sqlite journal mode, 'wal' allows readers to run
+          concurrently with a writer
+        - super_kwargs: kwargs passed on to BaseCache.__init__()
+        """
+
+        # determine database path
+        if db_path is None:
+            import tempfile
+
+            db_path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite')
+        self.db_path = db_path
+        self.table_name = table_name
+        self.journal_mode = journal_mode
+        self._connections = threading.local()
+        self._all_connections = []
+        self._all_connections_lock = threading.Lock()
+        self._generation = 0
+        self._pending_lock = threading.Lock()
+        self._pending_accesses = {}
+        self._create_tables()
+        self._n_entries = 0
+        self._rescan()
+
+        # set hash_mode
+        hash_mode = super_kwargs.get('hash_mode')
+        if hash_mode is not None and hash_mode not in ['json_digest', 'fast']:
+            raise Exception(
+                'need custom f_hash or hash_mode in [\'json_digest\', \'fast\']'
+            )
+        elif super_kwargs.get('f_hash') is None:
+            super_kwargs['hash_mode'] = 'json_digest'
+
+        # run BaseCache init
+        super().__init__(**super_kwargs)
+
+        # metadata of entries is stored in sql columns instead of in memory
+        self.entry_creation_times = None
+        self.entry_access_times = None
+        self.entry_access_counts = None
+
+        # perform eviction in sql instead of in memory
+        if self.max_size_policy in _eviction_orderings:
+            self.eviction_engine = SQLiteEvictionEngine(self)
+            self.get_cache_eviction = self.eviction_engine.get_eviction
+        self._track_access = (
+            self.max_size_policy in ['lru', 'lfu']
+            or self.track_access_times
+            or self.track_access_counts
+        )
+        if self._track_access:
+            self._register_exit_flush()
+
+        # register sizes of existing entries
+        if self.entry_weights is not None:
+            if self.f_weigh is None:
+                cursor = self._execute(
+                    'SELECT entry_hash, length(entry_data) FROM '
+                    + self.table_name
+                )
+                for entry_hash, weight in cursor.fetchall():
+                    self._set_entry_weight(entry_hash, weight)
+            else:
+                self._track_stored_weights(self._get_all())
+
+    #
+    # # connection management
+    #
+
+    def _get_connection(self):
+        """return connection to database, one connection is used per thread
+
+        connections of every thread are registered so that close() can close
+        them, a thread whose connection was closed opens a new one
+        """
+        connection = getattr(self._connections, 'connection', None)
+        if (
+            connection is None
+            or self._connections.generation != self._generation
+        ):
+            import sqlite3
+
+            connection = sqlite3.connect(
+                self.db_path,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            if self.journal_mode is not None:
+                connection.execute('PRAGMA journal_mode=' + self.journal_mode)
+                connection.execute('PRAGMA synchronous=NORMAL')
+            with self._all_connections_lock:
+                self._all_connections.append(connection)
+                self._connections.generation = self._generation
+            self._connections.connection = connection
+            self._connections.batch_depth = 0
+        return connection
+
+    def _execute(self, sql, parameters=()):
+        return self._get_connection().execute(sql, parameters)
+
+    def _create_tables(self):
+        table = self.table_name
+        self._execute(
+            'CREATE TABLE IF NOT EXISTS ' + table + ' ('
+            'entry_hash PRIMARY KEY, '
+            'entry_data BLOB, '
+            'creation_time REAL, '
+            'access_time REAL, '
+            'access_count INTEGER)'
+        )
+        for column in ['creation_time', 'access_time', 'access_count']:
+            self._execute(
+                'CREATE INDEX IF NOT EXISTS '
+                + table
+                + '_'
+                + column
+                + ' ON '
+                + table
+                + '('
+                + column
+                + ')'
+            )
+
+    @contextlib.contextmanager
+    def batch_writes(self):
+        """group writes made inside context into a single transaction
+
+        writes made by the current thread are committed when context exits
+        """
+        connection = self._get_connection()
+        if self._connections.batch_depth == 0:
+            connection.execute('BEGIN')
+        self._connections.batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._connections.batch_depth -= 1
+            if self._connections.batch_depth == 0:
+                connection.execute('ROLLBACK')
+                self._rescan()
+            raise
+        else:
+            self._connections.batch_depth -= 1
+            if self._connections.batch_depth == 0:
+                connection.execute('COMMIT')
+
+    def flush(self):
+        """write buffered updates of access times and access counts"""
+        with self._pending_lock:
+            pending = self._pending_accesses
+            self._pending_accesses = {}
+        if len(pending) == 0:
+            return
+        with self.batch_writes():
+            self._get_connection().executemany(
+                'UPDATE ' + self.table_name + ' '
+                'SET access_time = max(access_time, ?), '
+                'access_count = access_count + ? '
+                'WHERE entry_hash = ?',
+                [
+                    (access_time, count, key)
+                    for key, (access_time, count) in pending.items()
+                ],
+            )
+
+    def _register_exit_flush(self):
+        """write buffered access updates at interpreter exit"""
+        import atexit
+        import weakref
+
+        cache_ref = weakref.ref(self)
+
+        def flush_at_exit():
+            cache = cache_ref()
+            if cache is not None and os.path.isfile(cache.db_path):
+                cache.flush()
+
+        atexit.register(flush_at_exit)
+
+    def close(self):
+        """write buffered updates and close connections of all threads"""
+        self.flush()
+        with self._all_connections_lock:
+            connections = self._all_connections
+            self._all_connections = []
+            self._generation += 1
+        for connection in connections:
+            connection.close()
+        self._connections.connection = None
+
+    #
+    # # crud operations
+    #
+
+    def _get_entry_key(self, entry_hash):
+        """return key used to store entry in database"""
+        if isinstance(entry_hash, (str, bytes)):
+            return entry_hash
+        else:
+            return str(entry_hash)
+
+    def _get_upsert_sql(self):
+        """return sql that inserts or overwrites row of (key, data, now)"""
+        return (
+            'INSERT INTO ' + self.table_name + ' '
+            'VALUES (?1, ?2, ?3, ?3, 0) '
+            'ON CONFLICT(entry_hash) DO UPDATE SET '
+            'entry_data = excluded.entry_data, '
+            'creation_time = excluded.creation_time, '
+            'access_time = excluded.access_time'
+        )
+
+    def _save(self, entry_hash, entry_data):
+        key = self._get_entry_key(entry_hash)
+        data = pickle.dumps(entry_data, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.batch_writes():
+            exists = self._exists(entry_hash)
+            self._execute(self._get_upsert_sql(), (key, data, time.time()))
+        if not exists:
+            self._n_entries += 1
+
+    def _save_many(self, entries):
+        keys = [self._get_entry_key(entry_hash) for entry_hash in entries]
+        now = time.time()
+        rows = [
+            (
+                key,
+                pickle.dumps(entry_data, protocol=pickle.HIGHEST_PROTOCOL),
+                now,
+            )
+            for key, entry_data in zip(keys, entries.values())
+        ]
+        with self.batch_writes():
+            n_existing = len(self._select_keys('entry_hash', keys))
+            self._get_connection().executemany(self._get_upsert_sql(), rows)
+        self._n_entries += len(keys) - n_existing
+
+    def _exists(self, entry_hash):
+        cursor = self._execute(
+            'SELECT 1 FROM ' + self.table_name + ' WHERE entry_hash = ?',
+            (self._get_entry_key(entry_hash),),
+        )
+        return cursor.fetchone() is not None
+
+    def _get_all(self):
+        cursor = self._execute('SELECT entry_hash FROM ' + self.table_name)
+        return [row[0] for row in cursor]
+
+    def _get_size(self):
+        return self._n_entries
+
+    def _rescan(self):
+        cursor = self._execute('SELECT COUNT(*) FROM ' + self.table_name)
+        self._n_entries = cursor.fetchone()[0]
+
+    def _load(self, entry_hash):
+        entry_data = self._try_load(entry_hash, base_cache.MISSING)
+        if entry_data is base_cache.MISSING:
+            raise Exception('entry does not exist in cache')
+        return entry_data
+
+    def _try_load(self, entry_hash, default):
+        key = self._get_entry_key(entry_hash)
+        cursor = self._execute(
+            'SELECT entry_data FROM '
+            + self.table_name
+            + ' WHERE entry_hash = ?',
+            (key,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return default
+        if self._track_access:
+            self._record_accesses([key])
+        return pickle.loads(row[0])
+
+    def _load_many(self, entry_hashes):
+        keys = {
+            self._get_entry_key(entry_hash): entry_hash
+            for entry_hash in entry_hashes
+        }
+        rows = self._select_keys('entry_hash, entry_data', list(keys.keys()))
+        if self._track_access and len(rows) > 0:
+            self._record_accesses([row[0] for row in rows])
+        return {keys[row[0]]: pickle.loads(row[1]) for row in rows}
+
+    def _record_accesses(self, keys):
+        """buffer access updates, writing them once enough accumulate"""
+        now = time.time()
+        with self._pending_lock:
+            pending = self._pending_accesses
+            for key in keys:
+                access_time, count = pending.get(key, (now, 0))
+                pending[key] = (now, count + 1)
+            should_flush = len(pending) >= _access_flush_size
+        if should_flush:
+            self.flush()
+
+    def _select_column(self, column, entry_hash):
+        """return value of column of entry, raising KeyError if missing"""
+        if column != 'creation_time':
+            self.flush()
+        cursor = self._execute(
+            'SELECT '
+            + column
+            + ' FROM '
+            + self.table_name
+            + ' WHERE entry_hash = ?',
+            (self._get_entry_key(entry_hash),),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise KeyError(entry_hash)
+        return row[0]
+
+    def _select_all_column(self, column):
+        """return dict mapping keys of all entries to value of column"""
+        if column != 'creation_time':
+            self.flush()
+        cursor = self._execute(
+            'SELECT entry_hash, ' + column + ' FROM ' + self.table_name
+        )
+        return dict(cursor.fetchall())
+
+    def _select_keys(self, columns, keys, chunk_size=500):
+        """select columns of rows whose entry_hash is in keys"""
+        rows = []
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            cursor = self._execute(
+                'SELECT '
+                + columns
+                + ' FROM '
+                + self.table_name
+                + ' WHERE entry_hash IN ('
+                + ', '.join('?' * len(chunk))
+                + ')',
+                chunk,
+            )
+            rows.extend(cursor)
+        return rows
+
+    def _weigh(self, entry_hash, entry_data):
+        cursor = self._execute(
+            'SELECT length(entry_data) FROM '
+            + self.table_name
+            + ' WHERE entry_hash = ?',
+            (self._get_entry_key(entry_hash),),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return 0
+        else:
+            return row[0]
+
+    def _delete(self, entry_hash):
+        key = self._get_entry_key(entry_hash)
+        with self._pending_lock:
+            self._pending_accesses.pop(key, None)
+        cursor = self._execute(
+            'DELETE FROM ' + self.table_name + ' WHERE entry_hash = ?', (key,)
+        )
+        self._n_entries -= max(cursor.rowcount, 0)
+
+    def _delete_many(self, entry_hashes):
+        keys = [self._get_entry_key(entry_hash) for entry_hash in entry_hashes]
+        with self._pending_lock:
+            for key in keys:
+                self._pending_accesses.pop(key, None)
+        with self.batch_writes():
+            cursor = self._get_connection().executemany(
+                'DELETE FROM ' + self.table_name + ' WHERE entry_hash = ?',
+                [(key,) for key in keys],
+            )
+        self._n_entries -= max(cursor.rowcount, 0)
+
+    def _delete_all(self):
+        with self._pending_lock:
+            self._pending_accesses.clear()
+        self._execute('DELETE FROM ' + self.table_name)
+        self._n_entries = 0
+
+    #
+    # # metadata stored in sql
+    #
+
+    def get_entry_creation_time(self, entry_hash):
+        """get creation time of an individual entry"""
+        if not self.track_creation_times:
+            raise Exception('not tracking entry creation times')
+        return self._select_column('creation_time', entry_hash)
+
+    def get_all_entry_creation_times(self, must_exist=True):
+        """get creation times of all entries"""
+        if not self.track_creation_times:
+            raise Exception('not tracking entry creation times')
+        return self._select_all_column('creation_time')
+
+    def get_entry_age(self, entry_hash):
+        """get age of an individual entry"""
+        return time.time() - self.get_entry_creation_time(entry_hash)
+
+    def get_all_entry_ages(self, must_exist=True):
+        """get ages of all entries"""
+        now = time.time()
+        return {
+            entry_hash: now - creation_time
+            for entry_hash, creation_time in (
+                self.get_all_entry_creation_times().items()
+            )
+        }
+
+    def get_entry_access_time(self, entry_hash):
+        """get access time of an individual entry"""
+        if not self.track_access_times:
+            raise Exception('not tracking entry access times')
+        return self._select_column('access_time', entry_hash)
+
+    def get_all_entry_access_times(self, must_exist=True):
+        """get access times for all entries"""
+        if not self.track_access_times:
+            raise Exception('not tracking entry access times')
+        return self._select_all_column('access_time')
+
+    def get_entry_access_count(self, entry_hash):
+        """get access count for an individual entry"""
+        if not self.track_access_counts:
+            raise Exception('not tracking entry access counts')
+        return self._select_column('access_count', entry_hash)
+
+    def get_all_entry_access_counts(self, must_exist=True):
+        """get access counts for all entries"""
+        if not self.track_access_counts:
+            raise Exception('not tracking entry access counts')
+        return self._select_all_column('access_count')
+
+    #
+    # # eviction performed in sql
+    #
+
+    def entry_too_old(self, entry_hash):
+        """return whether entry_hash satisfies ttl and delete it if too old"""
+        if self.ttl is None:
+            return False
+        cursor = self._execute(
+            'SELECT creation_time FROM '
+            + self.table_name
+            + ' WHERE entry_hash = ?',
+            (self._get_entry_key(entry_hash),),
+        )
+        row = cursor.fetchone()
+        if row is not None and time.time() - row[0] >= self.ttl:
+            self._evict_old_entry(entry_hash)
+            return True
+        else:
+            return False
+
+    def evict_expired(self, max_evictions=None):
+        """remove entries whose age exceeds ttl, oldest first"""
+        if self.ttl is None:
+            return 0
+        sql = (
+            'SELECT entry_hash FROM '
+            + self.table_name
+            + ' WHERE creation_time <= ? ORDER BY creation_time ASC'
+        )
+        parameters = [time.time() - self.ttl]
+        if max_evictions is not None:
+            sql += ' LIMIT ?'
+            parameters.append(max_evictions)
+        with self.lock:
+            entry_hashes = [row[0] for row in self._execute(sql, parameters)]
+            self._evict_many(entry_hashes, 'n_ttl_evictions')
+        return len(entry_hashes)
+
+    def _track_expiry(self, entry_hash):
+        # expiry is tracked by the indexed creation_time column
+        pass
+
+    def evict_to_size(self, target_size):
+        """remove items from cache until cache reaches target size"""
+        with self.lock:
+            n_to_evict = self.get_cache_size() - target_size
+            if n_to_evict < 1:
+                return
+            entry_hashes = self.eviction_engine.get_evictions(n_to_evict)
+            self._evict_many(entry_hashes, 'n_size_evictions')
+
+    def evict_to_bytes(self, target_bytes, keep=()):
+        """remove items from cache until total weight reaches target bytes"""
+        if not isinstance(self.eviction_engine, SQLiteEvictionEngine):
+            return super().evict_to_bytes(target_bytes, keep=keep)
+        with self.lock:
+            n_excess = self.total_bytes - target_bytes
+            if n_excess <= 0:
+                return
+
+            # select entries in eviction order until enough bytes are freed
+            self.flush()
+            keep = {self._get_entry_key(entry_hash) for entry_hash in keep}
+            cursor = self._execute(
+                'SELECT entry_hash FROM '
+                + self.table_name
+                + ' ORDER BY '
+                + self.eviction_engine.ordering
+            )
+            entry_hashes = []
+            n_freed = 0
+            for (entry_hash,) in cursor:
+                if entry_hash in keep:
+                    continue
+                entry_hashes.append(entry_hash)
+                n_freed += self.entry_weights.get(entry_hash, 0)
+                if n_freed >= n_excess:
+                    break
+            cursor.close()
+
+            self._evict_many(entry_hashes, 'n_size_evictions')
+
+    def _evict_many(self, entry_hashes, stat_name):
+        """delete multiple entries in one transaction and track stats"""
+        if len(entry_hashes) == 0:
+            return
+        if self.verbose:
+            print('[cache]', self.cache_name, 'evicting', len(entry_hashes))
+        self._delete_many(entry_hashes)
+        if self.entry_weights is not None:
+            for entry_hash in entry_hashes:
+                self._track_eviction_delete(entry_hash)
+        if self._stats is not None:
+            self._stats['n_deletes'] += len(entry_hashes)
+            self._stats[stat_name] += len(entry_hashes)
+
+    #
+    # # introspection
+    #
+
+    def _print_save_summary(self, entry_hash):
+        print('[cache]', self.cache_name, 'saving to cache', self.db_path)
+
+    def _print_load_summary(self, entry_hash):
+        print('[cache]', self.cache_name, 'loading from cache', self.db_path)
+
+
+class SQLiteEvictionEngine(eviction_engines.EvictionEngine):
+    """eviction engine that selects evictions using indexed sqlite columns
+
+    creation times, access times, and access counts are updated by the crud
+    methods of SQLiteCache, so no in-memory bookkeeping is needed
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.ordering = _eviction_orderings[cache.max_size_policy]
+
+    def add(self, entry_hash):
+        pass
+
+    def access(self, entry_hash):
+        pass
+
+    def discard(self, entry_hash):
+        pass
+
+    def get_evictions(self, n):
+        """return hashes of next n entries to evict"""
+        self.cache.flush()
+        cursor = self.cache._execute(
+            'SELECT entry_hash FROM '
+            + self.cache.table_name
+            + ' ORDER BY '
+            + self.ordering
+            + ' LIMIT ?',
+            (n,),
+        )
+        return [row[0] for row in cursor]
+
+    def get_eviction(self):
+        evictions = self.get_evictions(1)
+        if len(evictions) == 0:
+            return None
+        else:
+            return evictions[0]
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return self.cache._get_size()
+
+    def __contains__(self, entry_hash):
+        return self.cache._exists(entry_hash)
+
+    def __iter__(self):
+        return iter(self.cache._get_all())
@@ -0,0 +1,368 @@
+"""class specifying a cache that serves hot entries from memory over another cache"""
+
+import time
+
+from . import base_cache
+from . import memory_cache
+
+
+class TieredCache(base_cache.BaseCache):
+    """a TieredCache stores entries in a bounded MemoryCache over another cache
+
+    entries are hashed once by the TieredCache and stored under that hash in
+    both tiers, the l1 tier serves hot entries from memory and the l2 tier,
+    a DiskCache by default, persists entries across restarts and processes
+    """
+
+    _async_offload = True
+
+    def __init__(
+        self,
+        l2_cache=None,
+        l2_cachetype='disk',
+        l2_kwargs=None,
+        l1_max_size=1000,
+        l1_max_bytes=None,
+        l1_kwargs=None,
+        write_mode='through',
+        promote=True,
+        **super_kwargs
+    ):
+        """initialize a TieredCache
+
+        for complete list of cache configuration options refer to BaseCache
+
+        ## Tiered Cache Options
+        - l2_cache: BaseCache instance used as l2 tier, if None one is created
+        - l2_cachetype: cachetype of l2 tier created if l2_cache is None
+        - l2_kwargs: dict of kwargs used to create l2 tier, e.g. cache_dir
+        - l1_max_size: int maximum number of entries of l1 tier
+        - l1_max_bytes: int maximum total bytes of entries of l1 tier
+        - l1_kwargs: dict of other kwargs used to create l1 tier
+        - write_mode: str of when saved entries are written to l2 tier
+            - 'through': entries are written to both tiers when saved
+            - 'back': entries are written to l2 tier when evicted from l1
+              tier, or when flush() is called
+        - promote: bool of whether entries loaded from l2 are saved to l1
+        - super_kwargs: kwargs passed on to BaseCache.__init__()
+            - ttl, max_size, and max_bytes apply to entries of both tiers,
+              entries of l2 take their creation times from l2 if it tracks
+              them, otherwise from when they are first seen
+
+        entries of l2 are listed once when the cache is created, entries that
+        other instances later save to or delete from l2 are picked up as they
+        are loaded, or by calling rescan()
+        """
+        if write_mode not in ['through', 'back']:
+            raise Exception('write_mode must be \'through\' or \'back\'')
+        self.write_mode = write_mode
+        self.promote = promote
+        self._dirty = set()
+
+        # hashes of entries stored in either tier, kept in insertion order
+        self._entries = {}
+
+        # create l1 tier
+        if l1_kwargs is None:
+            l1_kwargs = {}
+        l1_kwargs = dict(l1_kwargs)
+        l1_kwargs.setdefault('max_size', l1_max_size)
+        l1_kwargs.setdefault('max_bytes', l1_max_bytes)
+        self.l1 = _L1Cache(on_delete=self._on_l1_delete, **l1_kwargs)
+
+        # create l2 tier
+        if l2_cache is None:
+            from . import cachetype_utils
+
+            if l2_kwargs is None:
+                l2_kwargs = {}
+            l2_kwargs = dict(l2_kwargs)
+            if super_kwargs.get('ttl') is not None:
+                l2_kwargs.setdefault('track_creation_times', True)
+            CacheClass = cachetype_utils.get_cache_class(l2_cachetype)
+            l2_cache = CacheClass(**l2_kwargs)
+        elif l2_kwargs is not None:
+            raise Exception('cannot specify both l2_cache and l2_kwargs')
+        self.l2 = l2_cache
+
+        # hashes of tiers must be usable as keys of l2 tier
+        hash_mode = super_kwargs.get('hash_mode')
+        if hash_mode is None and super_kwargs.get('f_hash') is None:
+            super_kwargs['hash_mode'] = 'json_digest'
+
+        # run BaseCache init
+        super().__init__(**super_kwargs)
+
+        # track hits of each tier
+        if self._stats is not None:
+            self._stats['n_l1_hits'] = 0
+            self._stats['n_l2_hits'] = 0
+
+        # register entries already stored in l2
+        with self.lock:
+            for entry_hash in self.l2.get_all_entry_hashes():
+                self._register_l2_entry(entry_hash)
+
+        if write_mode == 'back':
+            self._register_exit_flush()
+
+    #
+    # # write back
+    #
+
+    def flush(self):
+        """write entries that are only stored in l1 tier to l2 tier"""
+        with self.lock:
+
+            # read l1 entries directly so that l1 access order is unchanged
+            with self.l1.lock:
+                entries = {
+                    entry_hash: self.l1.cache[entry_hash]
+                    for entry_hash in self._dirty
+                    if entry_hash in self.l1.cache
+                }
+            self._dirty.clear()
+            if len(entries) > 0:
+                self.l2.save_many(entries)
+
+    def close(self):
+        """write pending entries to l2 tier and close l2 tier"""
+        self.flush()
+        close = getattr(self.l2, 'close', None)
+        if close is not None:
+            close()
+
+    def _on_l1_delete(self, entry_hash, entry_data):
+        """write entry evicted from l1 tier to l2 tier if not yet written"""
+        if entry_hash in self._dirty:
+            self._dirty.discard(entry_hash)
+            self.l2.save_entry(entry_hash, entry_data)
+
+    def _register_exit_flush(self):
+        """write pending entries at interpreter exit if cache still exists"""
+        import atexit
+        import weakref
+
+        cache_ref = weakref.ref(self)
+
+        def flush_at_exit():
+            cache = cache_ref()
+            if cache is not None:
+                cache.flush()
+
+        atexit.register(flush_at_exit)
+
+    #
+    # # crud operations
+    #
+
+    def _save(self, entry_hash, entry_data):
+        self._entries[entry_hash] = None
+        if self.write_mode == 'back':
+            self._dirty.add(entry_hash)
+        self.l1.save_entry(entry_hash, entry_data)
+        if self.write_mode == 'through':
+            self.l2.save_entry(entry_hash, entry_data)
+
+    def _save_many(self, entries):
+        self._entries.update(dict.fromkeys(entries))
+        if self.write_mode == 'back':
+            self._dirty.update(entries.keys())
+        self.l1.save_many(entries)
+        if self.write_mode == 'through':
+            self.l2.save_many(entries)
+
+    def _exists(self, entry_hash):
+        if self.l1.exists_in_cache(entry_hash):
+            return True
+        elif self.l2.exists_in_cache(entry_hash):
+            self._register_l2_entry(entry_hash)
+            return True
+        else:
+            self._entries.pop(entry_hash, None)
+            return False
+
+    def _register_l2_entry(self, entry_hash):
+        """track l2 entry that was saved by another cache instance"""
+        self._entries[entry_hash] = None
+        engine = self.eviction_engine
+        if engine is not None and entry_hash not in engine:
+            with self._structure_lock:
+                engine.add(entry_hash)
+        if self.track_creation_times:
+            if entry_hash not in self.entry_creation_times:
+                creation_time = None
+                if self.l2.track_creation_times:
+                    try:
+                        creation_time = self.l2.get_entry_creation_time(
+                            entry_hash
+                        )
+                    except KeyError:
+                        pass
+                if creation_time is None:
+                    creation_time = time.time()
+                self.entry_creation_times[entry_hash] = creation_time
+                self._track_expiry(entry_hash)
+
+    def _get_all(self):
+        return list(self._entries.keys())
+
+    def _get_size(self):
+        return len(self._entries)
+
+    def _rescan(self):
+        self.l2.rescan()
+        self._entries = dict.fromkeys(
+            self.l1.get_all_entry_hashes() + self.l2.get_all_entry_hashes()
+        )
+
+    def _load(self, entry_hash):
+        entry_data = self._try_load(entry_hash, base_cache.MISSING)
+        if entry_data is base_cache.MISSING:
+            raise Exception('entry does not exist in cache')
+        return entry_data
+
+    def _try_load(self, entry_hash, default):
+
+        # load from l1 tier
+        entry_data = self.l1.load_entry(entry_hash, default=base_cache.MISSING)
+        if entry_data is not base_cache.MISSING:
+            if self._stats is not None:
+                self._stats['n_l1_hits'] += 1
+            return entry_data
+
+        # load from l2 tier
+        entry_data = self.l2.load_entry(entry_hash, default=base_cache.MISSING)
+        if entry_data is base_cache.MISSING:
+            self._entries.pop(entry_hash, None)
+            return default
+        if self._stats is not None:
+            self._stats['n_l2_hits'] += 1
+        self._register_l2_entry(entry_hash)
+        if self.promote:
+            self.l1.save_entry(entry_hash, entry_data)
+        return entry_data
+
+    def _load_many(self, entry_hashes):
+        entries = self.l1.load_many(entry_hashes)
+        n_l1_hits = len(entries)
+        missing = [
+            entry_hash
+            for entry_hash in entry_hashes
+            if entry_hash not in entries
+        ]
+        if len(missing) > 0:
+            l2_entries = self.l2.load_many(missing)
+            for entry_hash in missing:
+                if entry_hash in l2_entries:
+                    self._register_l2_entry(entry_hash)
+                else:
+                    self._entries.pop(entry_hash, None)
+            if self.promote and len(l2_entries) > 0:
+                self.l1.save_many(l2_entries)
+            entries.update(l2_entries)
+        if self._stats is not None:
+            self._stats['n_l1_hits'] += n_l1_hits
+            self._stats['n_l2_hits'] += len(entries) - n_l1_hits
+        return entries
+
+    #
+    # # async operations
+    #
+
+    async def async_load_entry(
+        self,
+        entry_hash=None,
+        args=None,
+        kwargs=None,
+        verbose=None,
+        must_exist=False,
+        default=None,
+    ):
+        """load entry data from cache without blocking the event loop
+
+        entries stored in l1 tier are loaded directly, only lookups that reach
+        l2 tier are run in self.async_executor, see load_entry() for inputs
+        """
+        if entry_hash is None and (args is not None or kwargs is not None):
+            if args is None:
+                args = []
+            if kwargs is None:
+                kwargs = {}
+            entry_hash = self.compute_entry_hash(args=args, kwargs=kwargs)
+        if entry_hash is not None and self._in_l1(entry_hash):
+            return self.load_entry(
+                entry_hash=entry_hash,
+                verbose=verbose,
+                must_exist=must_exist,
+                default=default,
+            )
+        return await super().async_load_entry(
+            entry_hash=entry_hash,
+            verbose=verbose,
+            must_exist=must_exist,
+            default=default,
+        )
+
+    async def async_exists(self, entry_hash=None, args=None, kwargs=None):
+        """return whether entry exists in cache without blocking the event loop
+
+        entries stored in l1 tier are checked directly, see exists_in_cache()
+        """
+        if entry_hash is None and (args is not None or kwargs is not None):
+            if args is None:
+                args = []
+            if kwargs is None:
+                kwargs = {}
+            entry_hash = self.compute_entry_hash(args=args, kwargs=kwargs)
+        if entry_hash is not None and self._in_l1(entry_hash):
+            return self.exists_in_cache(entry_hash=entry_hash)
+        return await super().async_exists(entry_hash=entry_hash)
+
+    def _in_l1(self, entry_hash):
+        """return whether entry is in l1 tier and can be used without io
+
+        expired entries are excluded, because evicting them deletes from l2
+        """
+        if not self.l1._exists(entry_hash):
+            return False
+        if self.ttl is not None:
+            creation_time = self.entry_creation_times.get(entry_hash)
+            if creation_time is None:
+                return False
+            if time.time() - creation_time >= self.ttl:
+                return False
+        return True
+
+    def _delete(self, entry_hash):
+        self._entries.pop(entry_hash, None)
+        self._dirty.discard(entry_hash)
+        self.l1.delete_entry(entry_hash)
+        self.l2.delete_entry(entry_hash)
+
+    def _delete_many(self, entry_hashes):
+        for entry_hash in entry_hashes:
+            self._entries.pop(entry_hash, None)
+        self._dirty.difference_update(entry_hashes)
+        self.l1.delete_many(entry_hashes)
+        self.l2.delete_many(entry_hashes)
+
+    def _delete_all(self):
+        self._entries.clear()
+        self._dirty.clear()
+        self.l1.delete_all_entries()
+        self.l2.delete_all_entries()
+
+
+class _L1Cache(memory_cache.MemoryCache):
+    """MemoryCache that reports entries as they are deleted or evicted"""
+
+    def __init__(self, on_delete, **super_kwargs):
+        self._on_delete = on_delete
+        super().__init__(**super_kwargs)
+
+    def _delete(self, entry_hash):
+        entry_data = self.cache.get(entry_hash, base_cache.MISSING)
+        if entry_data is not base_cache.MISSING:
+            self._on_delete(entry_hash, entry_data)
+        super()._delete(entry_hash)
@@ -1,6 +1,12 @@
+import marshal
+
 
 json_compatible_types = (int, float, str, list, dict, type(None))
 
+# subclasses of these types, such as IntEnum, are converted to canonical form
+_json_scalar_types = {int, float, str, bool, type(None)}
+_marshal_dumps = marshal.dumps
+
 
 #
 # # hash functions
@@ -8,29 +14,93 @@ json_compatible_types = (int, float, str, list, dict, type(None))
 
 
 def compute_hash_json(*args, **kwargs):
-    """compute json hash of given args and kwargs"""
-
-    # prehash any objects
-    for a, arg in enumerate(args):
-        if not isinstance(arg, json_compatible_types):
-            if not isinstance(args, list):
-                args = list(args)
-            args[a] = hash(arg)
-    for name, value in list(kwargs.items()):
-        if not isinstance(value, json_compatible_types):
-            kwargs[name] = hash(value)
+    """compute json hash of given args and kwargs
+
+    objects that are not json serializable are converted to their canonical
+    form, see get_canonical_form(), including objects nested in lists and dicts
+    """
+
+    # convert any objects to canonical form
+    args = [_get_json_canonical_form(arg) for arg in args]
+    kwargs = {
+        name: _get_json_canonical_form(value) for name, value in kwargs.items()
+    }
 
     # compute hash of data
     hash_data = ({'args': args, 'kwargs': kwargs},)
 
+    return _dumps_json(hash_data)
+
+
+def compute_hash_native(*args, **kwargs):
+    """return args and kwargs as a tuple key, like functools.lru_cache()
+
+    keys are only valid within the current process, and equal values of
+    different types (e.g. 1 and 1.0) give equal keys, if any arg is not
+    hashable, falls back to compute_hash_json()
+    """
+    if kwargs:
+        key = args + (_kwargs_mark,) + tuple(sorted(kwargs.items()))
+    else:
+        key = args
+    try:
+        hash(key)
+    except TypeError:
+        return compute_hash_json(*args, **kwargs)
+    return key
+
+
+_kwargs_mark = object()
+
+
+def _dumps_json(data):
+    """serialize data to sorted json bytes"""
     try:
         import orjson
 
-        return orjson.dumps(hash_data, option=orjson.OPT_SORT_KEYS)
+        return orjson.dumps(
+            data,
+            default=_json_default,
+            option=orjson.OPT_SORT_KEYS
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+            | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
     except ImportError:
         import json
 
-        return json.dumps(hash_data, sort_keys=True)
+        return json.dumps(data, sort_keys=True, default=_json_default).encode()
+
+
+def _get_json_canonical_form(value):
+    """return value with nested objects converted to tagged canonical forms
+
+    tuples, enums, and other objects that json would serialize like lists or
+    scalars are tagged, so that they give different hashes than those values
+    """
+    value_type = type(value)
+    if value_type in _json_scalar_types:
+        return value
+    elif isinstance(value, list):
+        return [_get_json_canonical_form(item) for item in value]
+    elif isinstance(value, dict):
+        return {
+            key: _get_json_canonical_form(item) for key, item in value.items()
+        }
+    else:
+        return _json_default(value)
+
+
+def _json_default(value):
+    """convert object that is not json serializable to json serializable"""
+    canonical_form = get_canonical_form(value)
+    if canonical_form is not None:
+        type_name, canonical_value = canonical_form
+        return {
+            '__toolcache_type__': type_name,
+            'value': _get_json_canonical_form(canonical_value),
+        }
+    else:
+        return hash(value)
 
 
 def compute_hash_json_digest(*args, **kwargs):
@@ -41,6 +111,400 @@ def compute_hash_json_digest(*args, **kwargs):
     return hashlib.md5(as_json).hexdigest()
 
 
+def compute_hash_fast(*args, **kwargs):
+    """compute hex digest of given args and kwargs without serializing to json
+
+    args are encoded to bytes using marshal, and the bytes are fed to a fast
+    non-cryptographic hash, xxhash if it is installed, otherwise blake2b
+
+    dicts and sets are encoded with sorted items so that hashes are stable
+    across processes, other objects are encoded using their canonical form
+    (see get_canonical_form()) or else fall back to their hash()
+    """
+    # kwargs names are unique, so sorting items never compares values
+    call = (args, sorted(kwargs.items()))
+    if _scalar_types.issuperset(map(type, args)) and _scalar_types.issuperset(
+        map(type, kwargs.values())
+    ):
+        data = _marshal_dumps(call, 2)
+    else:
+        data = _encode_fast(call)
+
+    digest = _fast_digest
+    if digest is None:
+        digest = _load_fast_digest()
+    return digest(data)
+
+
+_fast_digest = None
+
+
+def _load_fast_digest():
+    """return function that computes 128 bit hex digest of bytes"""
+    global _fast_digest
+
+    try:
+        import xxhash
+
+        _fast_digest = xxhash.xxh3_128_hexdigest
+    except (ImportError, AttributeError):
+        import hashlib
+
+        def _fast_digest(data):
+            return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    return _fast_digest
+
+
+def _new_hasher():
+    """return streaming hasher with update() and hexdigest() methods"""
+    try:
+        import xxhash
+
+        return xxhash.xxh3_128()
+    except (ImportError, AttributeError):
+        import hashlib
+
+        return hashlib.blake2b(digest_size=16)
+
+
+_scalar_types = frozenset([int, float, str, bytes, bool, type(None)])
+
+
+def _encode_fast(value):
+    """encode value as bytes, equal values of builtin types give equal bytes
+
+    encodings are self-delimiting so that they can be concatenated, sequences
+    of scalars are encoded by marshal version 2, which never emits references,
+    other containers are walked and tagged with bytes that are not marshal
+    type codes
+    """
+
+    value_type = type(value)
+    if value_type in _scalar_types:
+        return _marshal_dumps(value, 2)
+    elif value_type is tuple or value_type is list:
+        # marshal encodes dicts and sets in iteration order and any object
+        # with a buffer as plain bytes, so only use it for scalar contents
+        if _scalar_types.issuperset(map(type, value)):
+            return _marshal_dumps(value, 2)
+        items = [_encode_fast(item) for item in value]
+        tag = b'\x01' if value_type is tuple else b'\x02'
+    elif value_type is dict:
+        items = sorted(
+            _encode_fast(key) + _encode_fast(item)
+            for key, item in value.items()
+        )
+        tag = b'\x03'
+    elif value_type is set or value_type is frozenset:
+        items = sorted(_encode_fast(item) for item in value)
+        tag = b'\x04' if value_type is set else b'\x05'
+    else:
+        canonical_form = get_canonical_form(value)
+        if canonical_form is not None:
+            type_name, canonical_value = canonical_form
+            return (
+                b'\x07'
+                + _marshal_dumps(type_name, 2)
+                + _encode_fast(canonical_value)
+            )
+        return b'\x06%d;' % hash(value)
+
+    return tag + b'%d;' % len(items) + b''.join(items)
+
+
+#
+# # canonical forms
+#
+
+_hash_functions = {}
+_resolved_hash_functions = {}
+
+# types of optional dependencies are looked up in sys.modules, so that they
+# are matched without importing their modules, and are matched by their
+# public names because their defining modules differ across versions
+_optional_hash_functions = {
+    'numpy': {
+        'ndarray': lambda value: compute_array_hash(value),
+        'generic': lambda value: [value.dtype.str, value.item()],
+    },
+    'pandas': {
+        'DataFrame': lambda value: compute_dataframe_hash(value),
+        'Series': lambda value: compute_series_hash(value),
+        'Index': lambda value: compute_index_hash(value),
+    },
+}
+
+
+def register_hash_function(cls, f):
+    """register function that converts instances of cls to a canonical form
+
+    canonical forms are used to hash objects that are not json serializable,
+    they should be composed of json serializable values or of other objects
+    that have canonical forms, and should be equal for equal objects
+
+    registered functions also apply to subclasses of cls, objects can instead
+    define a __toolcache_hash__() method that returns their canonical form
+
+    ## Inputs
+    - cls: type whose instances f converts
+    - f: function that takes instance of cls and returns canonical form
+    """
+    _load_builtin_hash_functions()
+    _hash_functions[cls] = f
+    _resolved_hash_functions.clear()
+
+
+def get_canonical_form(value):
+    """return (type_name, canonical_value) of value, or None if unsupported
+
+    canonical values are stable across processes, unlike hash() of objects
+    """
+    cls = type(value)
+    try:
+        f = _resolved_hash_functions[cls]
+    except KeyError:
+        f = _resolve_hash_function(cls)
+    if f is None:
+        return None
+    return cls.__module__ + '.' + cls.__qualname__, f(value)
+
+
+def _resolve_hash_function(cls):
+    """find function that computes canonical form of instances of cls"""
+    import dataclasses
+
+    _load_builtin_hash_functions()
+
+    f = None
+    hook = getattr(cls, '__toolcache_hash__', None)
+    if hook is not None:
+        f = hook
+    else:
+        for base in cls.__mro__:
+            if base in _hash_functions:
+                f = _hash_functions[base]
+                break
+        else:
+            f = _resolve_optional_hash_function(cls)
+        if f is None:
+            if dataclasses.is_dataclass(cls):
+                f = _get_dataclass_canonical_form
+            elif issubclass(cls, tuple) and hasattr(cls, '_fields'):
+                f = _get_namedtuple_canonical_form
+
+    _resolved_hash_functions[cls] = f
+    return f
+
+
+def _resolve_optional_hash_function(cls):
+    """find hash function of cls among types of imported optional modules"""
+    import sys
+
+    for module_name, functions in _optional_hash_functions.items():
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        for type_name, f in functions.items():
+            optional_type = getattr(module, type_name, None)
+            if isinstance(optional_type, type) and issubclass(
+                cls, optional_type
+            ):
+                return f
+    return None
+
+
+def _load_builtin_hash_functions():
+    if len(_hash_functions) > 0:
+        return
+
+    import datetime
+    import decimal
+    import enum
+    import pathlib
+    import uuid
+
+    _hash_functions.update(
+        {
+            tuple: list,
+            set: _get_set_canonical_form,
+            frozenset: _get_set_canonical_form,
+            bytes: bytes.hex,
+            bytearray: bytearray.hex,
+            complex: lambda value: [value.real, value.imag],
+            datetime.datetime: datetime.datetime.isoformat,
+            datetime.date: datetime.date.isoformat,
+            datetime.time: datetime.time.isoformat,
+            datetime.timedelta: lambda value: [
+                value.days,
+                value.seconds,
+                value.microseconds,
+            ],
+            decimal.Decimal: lambda value: str(value.normalize()),
+            enum.Enum: lambda value: value.value,
+            pathlib.PurePath: pathlib.PurePath.as_posix,
+            uuid.UUID: str,
+        }
+    )
+
+
+def _get_set_canonical_form(value):
+    return sorted(value, key=_dumps_json)
+
+
+def _get_dataclass_canonical_form(value):
+    import dataclasses
+
+    return {
+        field.name: getattr(value, field.name)
+        for field in dataclasses.fields(value)
+    }
+
+
+def _get_namedtuple_canonical_form(value):
+    return dict(zip(value._fields, value))
+
+
+#
+# # array hashing
+#
+
+
+def compute_array_hash(
+    array, approximate=False, n_samples=256, sample_size=4096
+):
+    """compute hex digest of the dtype, shape, and contents of numpy array
+
+    contiguous arrays are hashed through the buffer protocol without copying,
+    other arrays are copied to contiguous blocks of bounded size
+
+    to use approximate hashing in caches, register it as the hash function:
+    `register_hash_function(np.ndarray, lambda a: compute_array_hash(a, True))`
+
+    ## Inputs
+    - array: numpy array
+    - approximate: bool of whether to only hash n_samples evenly spaced chunks
+      of array, much faster for large arrays, but changes to the contents of
+      unsampled chunks will not change the hash
+    - n_samples: int number of chunks hashed when approximate
+    - sample_size: int number of bytes in each chunk hashed when approximate
+    """
+    import numpy as np
+
+    hasher = _new_hasher()
+    hasher.update(
+        _encode_fast([array.dtype.descr, array.shape, approximate])
+    )
+
+    # pointers of object arrays are not stable, hash their elements instead
+    if array.dtype.hasobject:
+        hasher.update(_encode_fast(['O', array.tolist()]))
+        return hasher.hexdigest()
+
+    # hash layout of memory rather than strides, because non-contiguous
+    # arrays are hashed after copying their blocks into C order
+    if array.flags.c_contiguous:
+        hasher.update(b'C')
+        flat = array.reshape(-1).view(np.uint8)
+    elif array.flags.f_contiguous:
+        hasher.update(b'F')
+        flat = array.T.reshape(-1).view(np.uint8)
+    else:
+        hasher.update(b'C')
+        flat = None
+
+    if flat is not None:
+        if approximate and flat.nbytes > 2 * n_samples * sample_size:
+            step = (flat.nbytes - sample_size) // max(n_samples - 1, 1)
+            for start in range(0, n_samples * step, step):
+                hasher.update(flat[start:start + sample_size])
+        else:
+            hasher.update(flat)
+
+    else:
+        # copy at most block_size bytes at a time, split along first axis
+        block_size = 2 ** 24
+        row_size = max(array[:1].nbytes, 1)
+        rows_per_block = max(block_size // row_size, 1)
+        if approximate and len(array) > 2 * n_samples:
+            indices = np.linspace(0, len(array) - 1, n_samples).astype(int)
+            blocks = [array[indices]]
+        else:
+            blocks = (
+                array[start:start + rows_per_block]
+                for start in range(0, len(array), rows_per_block)
+            )
+        for block in blocks:
+            block = np.ascontiguousarray(block)
+            hasher.update(block.reshape(-1).view(np.uint8))
+
+    return hasher.hexdigest()
+
+
+def compute_series_hash(series, approximate=False):
+    """compute hex digest of the name, index, and values of pandas Series
+
+    ## Inputs
+    - series: pandas Series
+    - approximate: bool of whether to hash samples of large arrays
+    """
+    hasher = _new_hasher()
+    hasher.update(_encode_fast(series.name))
+    index_hash = compute_index_hash(series.index, approximate=approximate)
+    hasher.update(index_hash.encode())
+    hasher.update(_compute_pandas_values_hash(series, approximate))
+    return hasher.hexdigest()
+
+
+def compute_dataframe_hash(dataframe, approximate=False):
+    """compute hex digest of the index and each column of pandas DataFrame
+
+    columns backed by numpy arrays are hashed without copying
+
+    ## Inputs
+    - dataframe: pandas DataFrame
+    - approximate: bool of whether to hash samples of large arrays
+    """
+    hasher = _new_hasher()
+    hasher.update(_encode_fast(list(dataframe.shape)))
+    index_hash = compute_index_hash(dataframe.index, approximate=approximate)
+    hasher.update(index_hash.encode())
+    for name, column in dataframe.items():
+        hasher.update(_encode_fast(name))
+        hasher.update(_compute_pandas_values_hash(column, approximate))
+    return hasher.hexdigest()
+
+
+def compute_index_hash(index, approximate=False):
+    """compute hex digest of pandas Index
+
+    ## Inputs
+    - index: pandas Index
+    - approximate: bool of whether to hash samples of large arrays
+    """
+    hasher = _new_hasher()
+    hasher.update(_encode_fast([type(index).__name__, list(index.names)]))
+    hasher.update(_compute_pandas_values_hash(index, approximate))
+    return hasher.hexdigest()
+
+
+def _compute_pandas_values_hash(obj, approximate):
+    """hash values of Series or Index, return digest as bytes"""
+    import numpy as np
+
+    dtype = obj.dtype
+    if isinstance(dtype, np.dtype) and not dtype.hasobject:
+        # to_numpy() returns a view of numpy-backed data
+        values = obj.to_numpy()
+    else:
+        # object and extension dtypes are hashed with one uint64 per element
+        import pandas as pd
+
+        values = pd.util.hash_pandas_object(obj, index=False).to_numpy()
+    value_hash = compute_array_hash(values, approximate=approximate)
+    return (str(dtype) + ':' + value_hash).encode()
+
+
 #
 # # function utils
 #
@@ -91,6 +555,69 @@ def get_function_input_hash(
     return f_hash(*args_by_names['varargs'], **args_by_names['kwargs'])
 
 
+def compile_function_input_hash(
+    f_hash, argspec, include_args=None, exclude_args=None
+):
+    """return function(args, kwargs) that hashes a function's inputs
+
+    the returned function is equivalent to get_function_input_hash() but the
+    argument names, defaults, and included or excluded names of the signature
+    are computed once instead of during every call
+
+    ## Inputs
+    - f_hash: hash function that takes same arguments as f
+    - argspec: argspec of function as returned by inspect.getfullargspec(f)
+    - include_args: list of str names of args to include in hash
+    - exclude_args: list of str names of args to exclude from hash
+    """
+
+    if include_args is not None and exclude_args is not None:
+        raise Exception(
+            'should specify at most one of'
+            'hash_include_args or hash_exclude_args'
+        )
+
+    # positional args override kwargs, which override defaults
+    arg_names = tuple(argspec.args)
+    n_args = len(arg_names)
+    defaults = {}
+    if argspec.defaults is not None:
+        n_defaults = len(argspec.defaults)
+        defaults.update(zip(arg_names[n_args - n_defaults:], argspec.defaults))
+    if argspec.kwonlydefaults is not None:
+        defaults.update(argspec.kwonlydefaults)
+
+    if include_args is not None:
+        include_args = tuple(include_args)
+
+        def hash_function_inputs(args, kwargs):
+            bound = defaults.copy()
+            bound.update(kwargs)
+            bound.update(zip(arg_names, args))
+            return f_hash(**{name: bound[name] for name in include_args})
+
+    elif exclude_args is not None:
+        exclude_args = tuple(exclude_args)
+
+        def hash_function_inputs(args, kwargs):
+            bound = defaults.copy()
+            bound.update(kwargs)
+            bound.update(zip(arg_names, args))
+            for name in exclude_args:
+                bound.pop(name, None)
+            return f_hash(*args[n_args:], **bound)
+
+    else:
+
+        def hash_function_inputs(args, kwargs):
+            bound = defaults.copy()
+            bound.update(kwargs)
+            bound.update(zip(arg_names, args))
+            return f_hash(*args[n_args:], **bound)
+
+    return hash_function_inputs
+
+
 def _get_args_by_names(argspec, args, kwargs):
     """given the raw args and kwargs of a function call, return args by names
 
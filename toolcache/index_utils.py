@@ -0,0 +1,318 @@
+"""persistent index of metadata of entries stored as files
+
+the index is a sqlite database, so updates are incremental and crash-safe,
+and an index left behind by a crashed process is detected and rebuilt
+"""
+
+import contextlib
+import os
+import threading
+import time
+
+
+_index_version = 1
+
+# access updates are buffered and written in batches of this size
+_access_flush_size = 1000
+
+# ids of sessions opened by this process
+_open_sessions = set()
+
+
+class MetadataIndex:
+    """index of creation time, access time, access count, and size of entries
+
+    each open index registers a session in the database, sessions of processes
+    that exited without closing their index mark the index as stale, because
+    their last changes to the entry files might not be recorded
+    """
+
+    def __init__(self, path, layout):
+        """open index stored at path
+
+        ## Inputs
+        - path: str path of sqlite database file
+        - layout: dict describing file layout of entries, an index created for
+          a different layout is stale
+        """
+        self.path = path
+        self.layout = {key: str(value) for key, value in layout.items()}
+        self._connections = threading.local()
+        self._all_connections = []
+        self._all_connections_lock = threading.Lock()
+        self._generation = 0
+        self._pending_lock = threading.Lock()
+        self._pending_accesses = {}
+        self._session_id = None
+
+    def _get_connection(self):
+        """return connection to database, one connection is used per thread
+
+        connections of every thread are registered so that close() can close
+        them, a thread whose connection was closed opens a new one
+        """
+        connection = getattr(self._connections, 'connection', None)
+        if (
+            connection is None
+            or self._connections.generation != self._generation
+        ):
+            import sqlite3
+
+            connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            connection.execute('PRAGMA journal_mode=wal')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with self._all_connections_lock:
+                self._all_connections.append(connection)
+                self._connections.generation = self._generation
+            self._connections.connection = connection
+            self._connections.transaction_depth = 0
+        return connection
+
+    def _execute(self, sql, parameters=()):
+        return self._get_connection().execute(sql, parameters)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """group updates made inside context into a single transaction"""
+        connection = self._get_connection()
+        if self._connections.transaction_depth == 0:
+            connection.execute('BEGIN IMMEDIATE')
+        self._connections.transaction_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._connections.transaction_depth -= 1
+            if self._connections.transaction_depth == 0:
+                connection.execute('ROLLBACK')
+            raise
+        else:
+            self._connections.transaction_depth -= 1
+            if self._connections.transaction_depth == 0:
+                connection.execute('COMMIT')
+
+    #
+    # # opening and closing
+    #
+
+    def open(self, columns):
+        """open session and return stored metadata of entries
+
+        ## Inputs
+        - columns: list of metadata columns to load, a subset of
+          ['creation_time', 'access_time', 'access_count', 'size']
+
+        ## Returns
+        - dict mapping entry names to tuples of column values, or None if the
+          index is missing, unreadable, or stale and must be rebuilt
+        """
+        import sqlite3
+
+        try:
+            with self.transaction():
+                self._create_tables()
+                stale = self._is_stale()
+                self._begin_session()
+            if stale:
+                return None
+            sql = 'SELECT ' + ', '.join(['entry_name'] + columns) + ' FROM entries'
+            return {row[0]: row[1:] for row in self._execute(sql)}
+        except sqlite3.DatabaseError:
+            self._reset()
+            return None
+
+    def _create_tables(self):
+        self._execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'entry_name TEXT PRIMARY KEY, '
+            'creation_time REAL, '
+            'access_time REAL, '
+            'access_count INTEGER, '
+            'size INTEGER)'
+        )
+        self._execute(
+            'CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value)'
+        )
+        self._execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'session_id TEXT PRIMARY KEY, pid INTEGER, hostname TEXT)'
+        )
+
+    def _is_stale(self):
+        """return whether index does not reflect current entry files"""
+        metadata = dict(self._execute('SELECT key, value FROM metadata'))
+        expected = dict(self.layout, version=str(_index_version))
+        if metadata != expected:
+            return True
+
+        # sessions of exited processes might not have recorded all changes
+        sessions = self._execute('SELECT session_id, pid, hostname FROM sessions')
+        dead_sessions = [
+            session_id
+            for session_id, pid, hostname in sessions.fetchall()
+            if not _session_is_alive(session_id, pid, hostname)
+        ]
+        if len(dead_sessions) > 0:
+            self._execute(
+                'DELETE FROM sessions WHERE session_id IN ('
+                + ', '.join('?' for session_id in dead_sessions)
+                + ')',
+                dead_sessions,
+            )
+            return True
+        return False
+
+    def _begin_session(self):
+        import socket
+        import uuid
+
+        self._session_id = uuid.uuid4().hex
+        _open_sessions.add(self._session_id)
+        self._execute(
+            'INSERT INTO sessions VALUES (?, ?, ?)',
+            (self._session_id, os.getpid(), socket.gethostname()),
+        )
+
+    def _reset(self):
+        """replace unreadable database with an empty one"""
+        self.close()
+        for suffix in ['', '-wal', '-shm']:
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                pass
+        with self.transaction():
+            self._create_tables()
+            self._begin_session()
+
+    def close(self):
+        """write pending updates, end session, and close connections"""
+        import sqlite3
+
+        try:
+            self.flush()
+            if self._session_id is not None:
+                self._execute(
+                    'DELETE FROM sessions WHERE session_id = ?',
+                    (self._session_id,),
+                )
+        except sqlite3.Error:
+            pass
+        _open_sessions.discard(self._session_id)
+        self._session_id = None
+
+        # close connections of all threads
+        with self._all_connections_lock:
+            connections = self._all_connections
+            self._all_connections = []
+            self._generation += 1
+        for connection in connections:
+            connection.close()
+        self._connections.connection = None
+
+    #
+    # # updates
+    #
+
+    def rebuild(self, records):
+        """replace indexed entries with records
+
+        ## Inputs
+        - records: dict mapping entry names to tuples of (creation_time,
+          access_time, access_count, size)
+        """
+        with self._pending_lock:
+            self._pending_accesses.clear()
+        with self.transaction():
+            self._execute('DELETE FROM entries')
+            self._get_connection().executemany(
+                'INSERT INTO entries VALUES (?, ?, ?, ?, ?)',
+                [(name,) + tuple(record) for name, record in records.items()],
+            )
+            self._execute('DELETE FROM metadata')
+            self._get_connection().executemany(
+                'INSERT INTO metadata VALUES (?, ?)',
+                list(dict(self.layout, version=str(_index_version)).items()),
+            )
+
+    def record_saves(self, entry_names, now=None):
+        """record that entries were written at time now"""
+        if now is None:
+            now = time.time()
+        with self.transaction():
+            self._get_connection().executemany(
+                'INSERT INTO entries VALUES (?1, ?2, ?2, 0, NULL) '
+                'ON CONFLICT(entry_name) DO UPDATE SET '
+                'creation_time = ?2, access_time = ?2, access_count = 0, '
+                'size = NULL',
+                [(entry_name, now) for entry_name in entry_names],
+            )
+
+    def record_access(self, entry_name, now=None):
+        """record that entry was loaded at time now
+
+        access updates are buffered until enough accumulate or flush() is called
+        """
+        if now is None:
+            now = time.time()
+        with self._pending_lock:
+            access_time, count = self._pending_accesses.get(entry_name, (now, 0))
+            self._pending_accesses[entry_name] = (now, count + 1)
+            should_flush = len(self._pending_accesses) >= _access_flush_size
+        if should_flush:
+            self.flush()
+
+    def record_size(self, entry_name, size):
+        """record size in bytes of entry file"""
+        self._execute(
+            'UPDATE entries SET size = ? WHERE entry_name = ?', (size, entry_name)
+        )
+
+    def record_delete(self, entry_name):
+        """record that entry was deleted"""
+        self._execute('DELETE FROM entries WHERE entry_name = ?', (entry_name,))
+
+    def clear(self):
+        """record that all entries were deleted"""
+        with self._pending_lock:
+            self._pending_accesses.clear()
+        self._execute('DELETE FROM entries')
+
+    def flush(self):
+        """write buffered access updates"""
+        with self._pending_lock:
+            pending = self._pending_accesses
+            self._pending_accesses = {}
+        if len(pending) == 0:
+            return
+        with self.transaction():
+            self._get_connection().executemany(
+                'UPDATE entries '
+                'SET access_time = ?, access_count = access_count + ? '
+                'WHERE entry_name = ?',
+                [
+                    (access_time, count, entry_name)
+                    for entry_name, (access_time, count) in pending.items()
+                ],
+            )
+
+
+def _session_is_alive(session_id, pid, hostname):
+    """return whether session might still belong to a running process
+
+    processes on other hosts and processes on windows are assumed to be alive
+    """
+    import socket
+
+    if hostname != socket.gethostname() or os.name == 'nt':
+        return True
+    if pid == os.getpid():
+        return session_id in _open_sessions
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
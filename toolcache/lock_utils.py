@@ -0,0 +1,122 @@
+"""locks that coordinate independent processes using lock files"""
+
+import os
+import threading
+
+
+class FileLock:
+    """reentrant lock that is held across processes using a lock file
+
+    uses fcntl.flock() on posix and msvcrt.locking() on windows, unlike
+    multiprocessing.RLock() this works between processes that were not forked
+    from a common parent, such as separate gunicorn workers or cron jobs
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+            try:
+                _lock_fd(fd)
+            except BaseException:
+                os.close(fd)
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return True
+
+    def release(self):
+        if self._depth == 0:
+            raise RuntimeError('cannot release un-acquired lock')
+        self._depth -= 1
+        if self._depth == 0:
+            fd = self._fd
+            self._fd = None
+            try:
+                _unlock_fd(fd)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class ShardedFileLocks:
+    """set of FileLocks where each entry hash maps to one of n_shards locks"""
+
+    def __init__(self, lock_dir, n_shards=256):
+        self.lock_dir = lock_dir
+        self.n_shards = n_shards
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def get_lock(self, entry_name):
+        """return lock of shard that entry_name belongs to"""
+        import zlib
+
+        shard = zlib.crc32(entry_name.encode()) % self.n_shards
+        lock = self._locks.get(shard)
+        if lock is None:
+            with self._locks_lock:
+                lock = self._locks.get(shard)
+                if lock is None:
+                    path = os.path.join(self.lock_dir, '%03d.lock' % shard)
+                    lock = self._locks[shard] = FileLock(path)
+        return lock
+
+
+try:
+    import fcntl
+
+    def _lock_fd(fd):
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock_fd(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+except ImportError:
+    import msvcrt
+
+    import time
+
+    # seconds to wait for a lock held by another process before raising
+    _lock_timeout = 600
+
+    def _lock_fd(fd):
+        # LK_NBLCK fails immediately if lock is held, so retry with backoff
+        os.lseek(fd, 0, os.SEEK_SET)
+        deadline = time.monotonic() + _lock_timeout
+        delay = 0.001
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise Exception(
+                        'could not acquire file lock within '
+                        + str(_lock_timeout)
+                        + ' seconds'
+                    )
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+
+    def _unlock_fd(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
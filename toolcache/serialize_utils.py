@@ -0,0 +1,314 @@
+"""serializers and compressors used to store cache entries as bytes
+
+serialized entries begin with a small header that records their serializer
+and compression, so that entries stored in different formats can be loaded
+from the same location
+"""
+
+import struct
+
+
+_header_magic = b'\xfftc'
+_header_size = len(_header_magic) + 2
+_buffers_header = struct.Struct('<IQ')
+_buffer_length = struct.Struct('<Q')
+
+# out-of-band buffers are aligned within files so that mapped arrays are aligned
+_buffer_alignment = 64
+
+
+#
+# # serialization
+#
+
+
+def serialize(data, file_format='pickle', compression=None, threshold=0):
+    """serialize data into a list of bytes-like chunks that begin with header
+
+    ## Inputs
+    - data: data to serialize
+    - file_format: str name of registered serializer
+    - compression: str name of compressor, one of 'zstd', 'lz4', 'zlib', or
+      None for no compression
+    - threshold: int minimum number of serialized bytes to compress
+
+    ## Returns
+    - list of bytes-like chunks, to be written consecutively
+    """
+    serializer_code, dumps, loads = get_serializer(file_format)
+    chunks = dumps(data)
+
+    # compress data that exceeds threshold
+    compressor_code = 0
+    if compression is not None:
+        size = sum(memoryview(chunk).nbytes for chunk in chunks)
+        if size >= threshold:
+            compressor_code, compress, decompress = get_compressor(compression)
+            chunks = [compress(b''.join(chunks))]
+
+    header = _header_magic + bytes([serializer_code, compressor_code])
+    return [header] + chunks
+
+
+def deserialize(data):
+    """deserialize bytes-like data that was created by serialize()
+
+    data without a header is treated as pickle or json data written by
+    previous versions of toolcache
+
+    ## Inputs
+    - data: bytes-like object, a writable bytearray allows numpy arrays of
+      pickled entries to be loaded without copies, and an mmap causes them to
+      be loaded as read-only views of the mapped file
+    """
+    view = memoryview(data)
+    if view[: len(_header_magic)] != _header_magic:
+        return _load_legacy(view)
+
+    serializer_code = view[len(_header_magic)]
+    compressor_code = view[len(_header_magic) + 1]
+    body = view[_header_size:]
+    if compressor_code != 0:
+        name = _compressors_by_code.get(compressor_code)
+        if name is None:
+            raise Exception('unknown compressor code: ' + str(compressor_code))
+        code, compress, decompress = get_compressor(name)
+        body = memoryview(decompress(body))
+
+    name = _serializers_by_code.get(serializer_code)
+    if name is None:
+        raise Exception('unknown serializer code: ' + str(serializer_code))
+    code, dumps, loads = _serializers[name]
+    return loads(body)
+
+
+def _load_legacy(view):
+    """load data that was saved as plain pickle or json"""
+    if len(view) > 0 and view[0] == 0x80:
+        import pickle
+
+        return pickle.loads(view)
+    else:
+        return _json_loads(view)
+
+
+#
+# # serializer registry
+#
+
+
+_serializers = {}
+_serializers_by_code = {}
+
+
+def register_serializer(name, code, dumps, loads):
+    """register serializer that can be used as a file_format of DiskCache
+
+    ## Inputs
+    - name: str name of serializer
+    - code: int in [1, 255] that identifies serializer in headers of entries,
+      codes below 64 are reserved for serializers of toolcache
+    - dumps: function that takes data and returns list of bytes-like chunks
+    - loads: function that takes memoryview of serialized data, returns data
+    """
+    if not isinstance(code, int) or not 0 < code < 256:
+        raise Exception('serializer code must be an int in [1, 255]')
+    existing = _serializers_by_code.get(code)
+    if existing is not None and existing != name:
+        raise Exception('serializer code already used by ' + existing)
+    _serializers[name] = (code, dumps, loads)
+    _serializers_by_code[code] = name
+
+
+def get_serializer(name):
+    """return (code, dumps, loads) of registered serializer"""
+    try:
+        return _serializers[name]
+    except KeyError:
+        raise Exception('unknown file format: ' + str(name))
+
+
+def get_serializer_names():
+    """return list of names of registered serializers"""
+    return list(_serializers.keys())
+
+
+def _pickle_dumps(data):
+    """pickle data using out-of-band buffers if protocol 5 is available
+
+    buffers, such as the data of numpy arrays or arrow tables, are written as
+    separate aligned chunks instead of being copied into the pickle
+    """
+    import pickle
+
+    if pickle.HIGHEST_PROTOCOL < 5:
+        pickled = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        return get_pickle_buffer_chunks(pickled, [])
+
+    buffers = []
+    pickled = pickle.dumps(data, protocol=5, buffer_callback=buffers.append)
+    return get_pickle_buffer_chunks(pickled, buffers, offset=_header_size)
+
+
+def _pickle_loads(view):
+    """load data pickled by _pickle_dumps(), using views for each buffer
+
+    buffers are copied if view is read-only, unless view is of a memory map
+    """
+    import mmap
+
+    copy = view.readonly and not isinstance(view.obj, mmap.mmap)
+    return load_pickle_buffers(view, offset=_header_size, copy=copy)
+
+
+def get_pickle_buffer_chunks(pickled, buffers, offset=0):
+    """return chunks of a protocol 5 pickle followed by its out-of-band buffers
+
+    layout is n_buffers, pickle length, length of each buffer, pickle, then
+    each buffer preceded by the padding that aligns it within the file
+
+    ## Inputs
+    - pickled: bytes of pickle
+    - buffers: list of PickleBuffer collected by the pickle's buffer_callback
+    - offset: int position in file at which the chunks will be written
+
+    ## Returns
+    - list of bytes-like chunks, to be written consecutively
+    """
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    chunks = [_buffers_header.pack(len(raw_buffers), len(pickled))]
+    for raw_buffer in raw_buffers:
+        chunks.append(_buffer_length.pack(raw_buffer.nbytes))
+    chunks.append(pickled)
+    position = offset + sum(len(chunk) for chunk in chunks)
+    for raw_buffer in raw_buffers:
+        padding = _get_padding(position)
+        chunks.append(bytes(padding))
+        chunks.append(raw_buffer)
+        position += padding + raw_buffer.nbytes
+    return chunks
+
+
+def load_pickle_buffers(view, offset=0, copy=False):
+    """load data written as chunks of get_pickle_buffer_chunks()
+
+    ## Inputs
+    - view: memoryview of chunks
+    - offset: int position in file at which view begins
+    - copy: bool of whether to copy buffers into bytearrays instead of
+      passing views of view to the loaded data
+    """
+    import pickle
+
+    n_buffers, pickle_length = _buffers_header.unpack_from(view, 0)
+    position = _buffers_header.size
+    lengths = []
+    for b in range(n_buffers):
+        lengths.append(_buffer_length.unpack_from(view, position)[0])
+        position += _buffer_length.size
+    pickled = view[position : position + pickle_length]
+    position += pickle_length
+    if n_buffers == 0:
+        return pickle.loads(pickled)
+
+    buffers = []
+    for length in lengths:
+        position += _get_padding(offset + position)
+        buffer = view[position : position + length]
+        if copy:
+            buffer = bytearray(buffer)
+        buffers.append(buffer)
+        position += length
+    return pickle.loads(pickled, buffers=buffers)
+
+
+def _get_padding(position):
+    """return number of bytes needed to align buffer at position"""
+    return -position % _buffer_alignment
+
+
+def _json_dumps(data):
+    try:
+        import orjson
+
+        return [orjson.dumps(data)]
+    except ImportError:
+        import json
+
+        return [json.dumps(data).encode()]
+
+
+def _json_loads(view):
+    try:
+        import orjson
+
+        return orjson.loads(view)
+    except ImportError:
+        import json
+
+        return json.loads(bytes(view))
+
+
+def _msgpack_dumps(data):
+    import msgpack
+
+    return [msgpack.packb(data, use_bin_type=True)]
+
+
+def _msgpack_loads(view):
+    import msgpack
+
+    return msgpack.unpackb(view, raw=False)
+
+
+register_serializer('pickle', 1, _pickle_dumps, _pickle_loads)
+register_serializer('json', 2, _json_dumps, _json_loads)
+register_serializer('msgpack', 3, _msgpack_dumps, _msgpack_loads)
+
+
+#
+# # compressors
+#
+
+
+_compressors_by_code = {1: 'zstd', 2: 'lz4', 3: 'zlib'}
+_compressor_codes = {name: code for code, name in _compressors_by_code.items()}
+
+
+def get_compressor(name):
+    """return (code, compress, decompress) of compressor
+
+    zstd requires the zstandard package and lz4 requires the lz4 package
+    """
+    code = _compressor_codes.get(name)
+    if code is None:
+        raise Exception('unknown compression: ' + str(name))
+
+    if name == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception('zstd compression requires zstandard package')
+
+        def compress(data):
+            return zstandard.ZstdCompressor().compress(data)
+
+        def decompress(data):
+            return zstandard.ZstdDecompressor().decompress(data)
+
+    elif name == 'lz4':
+        try:
+            import lz4.frame
+        except ImportError:
+            raise Exception('lz4 compression requires lz4 package')
+
+        compress = lz4.frame.compress
+        decompress = lz4.frame.decompress
+
+    else:
+        import zlib
+
+        compress = zlib.compress
+        decompress = zlib.decompress
+
+    return code, compress, decompress
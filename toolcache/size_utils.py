@@ -0,0 +1,89 @@
+"""functions for estimating the number of bytes used by cache entries"""
+
+import sys
+import types
+
+
+_atomic_types = (int, float, complex, bool, str, bytes, type(None))
+_opaque_types = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+)
+
+
+def estimate_size(value):
+    """estimate number of bytes of memory used by value and its contents
+
+    containers and object attributes are traversed, objects that are referenced
+    multiple times are counted once, numpy arrays and other objects with an
+    nbytes attribute are sized by their data buffers, and pandas objects are
+    sized using their memory_usage()
+
+    ## Inputs
+    - value: object to be sized
+
+    ## Returns
+    - int number of bytes
+    """
+
+    seen = set()
+    stack = [value]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += _get_shallow_size(item, stack)
+    return total
+
+
+def _get_shallow_size(item, stack):
+    """return size of item, adding items that it references to stack"""
+
+    cls = type(item)
+    if cls in _atomic_types:
+        return sys.getsizeof(item)
+
+    # containers
+    if cls is dict or isinstance(item, dict):
+        stack.extend(item.keys())
+        stack.extend(item.values())
+        return sys.getsizeof(item)
+    if isinstance(item, (list, tuple, set, frozenset)):
+        stack.extend(item)
+        return sys.getsizeof(item)
+
+    # pandas objects, including contents of object columns
+    if cls.__module__.startswith('pandas') and hasattr(item, 'memory_usage'):
+        memory_usage = item.memory_usage(deep=True)
+        if hasattr(memory_usage, 'sum'):
+            memory_usage = memory_usage.sum()
+        return int(memory_usage)
+
+    # buffers such as numpy arrays, views do not own their data buffers
+    nbytes = getattr(item, 'nbytes', None)
+    if isinstance(nbytes, int):
+        dtype = getattr(item, 'dtype', None)
+        if getattr(dtype, 'hasobject', False):
+            stack.extend(item.flat)
+        return max(sys.getsizeof(item), nbytes)
+
+    # objects with attributes, classes, modules, and functions are not entered
+    size = sys.getsizeof(item)
+    if isinstance(item, _opaque_types):
+        return size
+    attributes = getattr(item, '__dict__', None)
+    if isinstance(attributes, dict):
+        stack.append(attributes)
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = [slots]
+        for slot in slots:
+            if slot not in ('__dict__', '__weakref__') and hasattr(item, slot):
+                stack.append(getattr(item, slot))
+    return size
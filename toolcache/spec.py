@@ -8,5 +8,7 @@ if typing.TYPE_CHECKING:
     from . import cachetypes
 
 
-    CommonCachetypeName = Literal['disk', 'memory', 'null']
+    CommonCachetypeName = Literal[
+        'disk', 'memory', 'null', 'sqlite', 'log', 'tiered'
+    ]
     CachetypeSpec = typing.Union[CommonCachetypeName, 'cachetypes.BaseCache']